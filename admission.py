@@ -0,0 +1,190 @@
+# admission.py
+# Admission control and load shedding for catch_all.
+# - Token buckets: one global, one per session (bounded LRU), so a flood from
+#   one scammer or from everyone gets a 429 instead of unbounded queueing.
+# - WorkQueue replaces FastAPI BackgroundTasks: a bounded set of keyed jobs run
+#   by a fixed pool of workers. Jobs for the same (kind, session) coalesce; when
+#   full, stale optional work is dropped first.
+# - Degraded mode (with hysteresis) when the queues fill up: the handler skips
+#   the LLM and optional work, answers from the local sentence builder, and
+#   reports what it shed.
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+import metrics
+
+logger = logging.getLogger("uvicorn")
+
+# --- CONFIGURATION ---
+GLOBAL_RATE = float(os.environ.get("ADMIT_RATE", "500"))          # requests/second, all sessions
+GLOBAL_BURST = float(os.environ.get("ADMIT_BURST", "1000"))
+SESSION_RATE = float(os.environ.get("ADMIT_SESSION_RATE", "5"))   # requests/second, one session
+SESSION_BURST = float(os.environ.get("ADMIT_SESSION_BURST", "20"))
+QUEUE_SIZE = int(os.environ.get("WORK_QUEUE_SIZE", "5000"))       # background jobs
+WORKERS = int(os.environ.get("WORK_WORKERS", "8"))
+DEGRADE_AT = 0.8          # queue fill that switches degraded mode on ...
+RECOVER_AT = 0.5          # ... and the fill it has to drop below to switch off again
+MAX_PAYLOADS = 100        # per coalesced job; the oldest are dropped beyond this
+
+# --- 1. TOKEN BUCKETS ---
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = time.monotonic()
+
+    def take(self, now=None, n=1):
+        now = now or time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens < n: return False
+        self.tokens -= n
+        return True
+
+class Admission:
+    def __init__(self, rate=GLOBAL_RATE, burst=GLOBAL_BURST, session_rate=SESSION_RATE,
+                 session_burst=SESSION_BURST, max_sessions=10000):
+        self.bucket = TokenBucket(rate, burst)
+        self.session_rate = session_rate
+        self.session_burst = session_burst
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()   # sid -> TokenBucket, LRU
+        self.degraded = False
+        self.degraded_since = None
+        self.shed = {}                   # what -> count, for stats and /metrics
+
+    def note_shed(self, what, n=1):
+        self.shed[what] = self.shed.get(what, 0) + n
+
+    def admit(self, sid):
+        """False if the request is over the global or this session's rate."""
+        now = time.monotonic()
+        bucket = self._sessions.get(sid)
+        if bucket is None:
+            bucket = self._sessions[sid] = TokenBucket(self.session_rate, self.session_burst)
+            if len(self._sessions) > self.max_sessions: self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(sid)
+        # Session first, so one noisy scammer doesn't spend everyone's global tokens
+        if not bucket.take(now):
+            self.note_shed("rate_limited_session")
+            return False
+        if not self.bucket.take(now):
+            self.note_shed("rate_limited_global")
+            return False
+        return True
+
+    def update(self, pressure):
+        """Feed in the current queue fill (0..1); returns whether we are degraded."""
+        if not self.degraded and pressure >= DEGRADE_AT:
+            self.degraded, self.degraded_since = True, time.monotonic()
+            logger.warning(f"⚠️ Degraded mode ON (queue fill {pressure:.0%})")
+        elif self.degraded and pressure < RECOVER_AT:
+            logger.info(f"✅ Degraded mode OFF after {time.monotonic() - self.degraded_since:.1f}s")
+            self.degraded, self.degraded_since = False, None
+        return self.degraded
+
+    def stats(self):
+        return {"degraded": self.degraded, "trackedSessions": len(self._sessions), "shed": dict(self.shed)}
+
+# --- 2. THE BOUNDED WORK QUEUE ---
+class _Job:
+    __slots__ = ("fn", "payloads", "optional")
+
+    def __init__(self, fn, payload, optional):
+        self.fn = fn
+        self.payloads = [payload]
+        self.optional = optional
+
+class WorkQueue:
+    def __init__(self, admission, maxsize=QUEUE_SIZE, workers=WORKERS):
+        self.admission = admission
+        self.maxsize = maxsize
+        self.workers = workers
+        self._jobs = OrderedDict()   # (kind, key) -> _Job, oldest first
+        self._wake = None
+        self._tasks = []
+        self._stopping = False
+        self.running = 0
+        self.done = 0
+        self.coalesced = 0
+
+    @property
+    def depth(self):
+        return len(self._jobs)
+
+    @property
+    def pressure(self):
+        return len(self._jobs) / self.maxsize
+
+    async def start(self):
+        if self._tasks: return
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self):
+        """Finish what is queued, then stop the workers."""
+        if not self._tasks: return
+        self._stopping = True
+        self._wake.set()
+        await asyncio.gather(*self._tasks)
+        self._tasks = []
+
+    def submit(self, kind, key, fn, payload, optional=False, merge=True):
+        """Queue fn(key, payloads). A job already queued for (kind, key) absorbs the payload
+        (merge=True appends, merge=False keeps only the newest). Returns False if shed."""
+        job = self._jobs.get((kind, key))
+        if job is not None:
+            self.coalesced += 1
+            if not merge: job.payloads[:] = [payload]
+            else:
+                job.payloads.append(payload)
+                if len(job.payloads) > MAX_PAYLOADS:
+                    del job.payloads[0]
+                    self.admission.note_shed(f"{kind}_overflow")
+            return True
+
+        if len(self._jobs) >= self.maxsize and not self._drop_stale_optional(optional):
+            self.admission.note_shed(kind)
+            return False
+        self._jobs[(kind, key)] = _Job(fn, payload, optional)
+        if self._wake: self._wake.set()
+        return True
+
+    def _drop_stale_optional(self, incoming_optional):
+        # Overflow policy: the oldest optional job makes room; optional work never evicts required work
+        if incoming_optional: return False
+        for jkey, job in self._jobs.items():
+            if job.optional:
+                del self._jobs[jkey]
+                self.admission.note_shed(jkey[0])
+                return True
+        return False
+
+    async def _worker(self):
+        while True:
+            if not self._jobs:
+                if self._stopping: return
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            (kind, key), job = self._jobs.popitem(last=False)
+            self.running += 1
+            try:
+                await job.fn(key, job.payloads)
+            except Exception as e:
+                logger.error(f"Background {kind} for {key} failed: {e}")
+                metrics.swallowed(f"work.{kind}")
+            finally:
+                self.running -= 1
+                self.done += 1
+
+    def stats(self):
+        return {"depth": len(self._jobs), "running": self.running, "done": self.done,
+                "coalesced": self.coalesced, "max": self.maxsize}
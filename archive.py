@@ -0,0 +1,164 @@
+# archive.py
+# Tiered retention: idle sessions leave the hot SQLite file for compressed segments.
+# - compact() finds sessions with no message for `idle_hours`, writes their
+#   messages and evidence as JSONL to an append-only, month-partitioned gzip
+#   segment (archive/YYYY-MM/<db>.jsonl.gz), one gzip member per session, then
+#   deletes those rows and runs an incremental vacuum.
+# - archive_index (schema.py) records segment, byte offset and length of every
+#   member, so reading one archived session is a seek plus one small decompress.
+# - The session row stays in SQLite; if the scammer comes back, new messages go
+#   to the hot tables as usual and the readers merge both tiers.
+#
+#   python archive.py [--db honeypot.db] [--idle-hours 72]
+import argparse
+import gzip
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from functools import lru_cache
+import schema
+import shards
+
+logger = logging.getLogger("uvicorn")
+
+DB_NAME = "honeypot.db"
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", "archive")           # relative to the database file
+IDLE_HOURS = float(os.environ.get("ARCHIVE_IDLE_HOURS", "72"))
+BATCH = 200               # sessions per delete transaction
+VACUUM_STEP = 1000        # pages freed per incremental_vacuum call, so the write lock is held briefly
+
+def archive_root(db_path):
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), ARCHIVE_DIR)
+
+# --- 1. WRITING SEGMENTS ---
+def _member(sid, messages, evidence):
+    # One self-contained gzip member: JSONL, messages in id order, then evidence
+    lines = [json.dumps({"kind": "message", "id": i, "session_id": sid, "role": r, "message": m, "timestamp": t,
+                         "label": label}) for i, r, m, t, label in messages]
+    lines += [json.dumps({"kind": "evidence", "id": i, "session_id": sid, "type": ty, "value": v, "timestamp": t})
+              for i, ty, v, t in evidence]
+    return gzip.compress(("\n".join(lines) + "\n").encode(), compresslevel=6)
+
+def _idle_sessions(conn, cutoff):
+    # Last activity per session; sessions with hot messages only (archived-only ones have nothing to move)
+    return conn.execute("SELECT session_id, MAX(timestamp) FROM messages GROUP BY session_id "
+                        "HAVING MAX(timestamp) < ? ORDER BY 2", (cutoff,)).fetchall()
+
+def compact(path=DB_NAME, idle_hours=IDLE_HOURS, batch=BATCH):
+    """Archive every session idle for idle_hours. Returns (sessions, messages, evidence) moved."""
+    schema.migrate(path)
+    root = archive_root(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    cutoff = (datetime.now() - timedelta(hours=idle_hours)).strftime("%Y-%m-%d %H:%M:%S")
+    conn = sqlite3.connect(path, isolation_level=None, timeout=30)
+    moved = [0, 0, 0]
+    try:
+        idle = _idle_sessions(conn, cutoff)
+        for start in range(0, len(idle), batch):
+            chunk = idle[start:start + batch]
+            index_rows, last_ids, files = [], [], {}
+            for sid, last_seen in chunk:
+                messages = conn.execute("SELECT id, role, message, timestamp, scam_label FROM messages WHERE session_id=? ORDER BY id",
+                                        (sid,)).fetchall()
+                evidence = conn.execute("SELECT id, type, value, timestamp FROM evidence WHERE session_id=? ORDER BY id",
+                                        (sid,)).fetchall()
+                segment = f"{(last_seen or cutoff)[:7]}/{stem}.jsonl.gz"   # partitioned by month of last activity
+                f = files.get(segment)
+                if f is None:
+                    os.makedirs(os.path.join(root, os.path.dirname(segment)), exist_ok=True)
+                    f = files[segment] = open(os.path.join(root, segment), "ab")
+                data = _member(sid, messages, evidence)
+                offset = f.tell()
+                f.write(data)
+                hard = sum(ty != "Suspicious Keyword" for _, ty, _, _ in evidence)
+                index_rows.append((sid, segment, offset, len(data), len(messages), len(evidence), hard,
+                                   messages[-1][0] if messages else 0))
+                last_ids.append(evidence[-1][0] if evidence else 0)
+            # Segments are on disk before any row is deleted; a crash in between only leaves unreferenced bytes
+            for f in files.values():
+                f.flush()
+                os.fsync(f.fileno())
+                f.close()
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("INSERT OR REPLACE INTO archive_index (session_id, segment, offset, length, messages, "
+                                 "evidence, hard_evidence, last_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", index_rows)
+                for row, last_evidence in zip(index_rows, last_ids):
+                    # Only rows that made it into the member; anything the API added since stays hot
+                    conn.execute("DELETE FROM messages WHERE session_id=? AND id<=?", (row[0], row[7]))
+                    conn.execute("DELETE FROM evidence WHERE session_id=? AND id<=?", (row[0], last_evidence))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            moved[0] += len(index_rows)
+            moved[1] += sum(r[4] for r in index_rows)
+            moved[2] += sum(r[5] for r in index_rows)
+            logger.info(f"archive: {path}: {moved[0]}/{len(idle)} sessions archived")
+        vacuum(conn)
+    finally:
+        conn.close()
+    return tuple(moved)
+
+def vacuum(conn):
+    """Give the freed pages back to the filesystem, a few at a time."""
+    # Each step is its own short transaction, so the API's writer gets in between
+    while conn.execute("PRAGMA freelist_count").fetchone()[0]:
+        conn.execute(f"PRAGMA incremental_vacuum({VACUUM_STEP})").fetchall()
+
+# --- 2. READING IT BACK ---
+@lru_cache(maxsize=256)
+def _read_member(file, offset, length):
+    # Members are never rewritten, so caching them by position is safe
+    with open(file, "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+    return [json.loads(line) for line in gzip.decompress(data).decode().splitlines() if line]
+
+def _db_path(conn):
+    # The file behind conn, so readers only need the connection they already have
+    return next(row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main")
+
+def records(conn, sid):
+    """Every archived record of sid, oldest archive first. [] if it was never archived."""
+    rows = conn.execute("SELECT segment, offset, length FROM archive_index WHERE session_id=? ORDER BY rowid",
+                        (sid,)).fetchall()
+    if not rows: return []
+    root = archive_root(_db_path(conn))
+    out = []
+    for segment, offset, length in rows:
+        try:
+            out += _read_member(os.path.join(root, segment), offset, length)
+        except OSError as e:
+            logger.error(f"archive: {segment} unreadable for {sid}: {e}")
+    return out
+
+def load_messages(conn, sid):
+    """[(id, role, message, timestamp)] archived for sid, in id order."""
+    return [(r["id"], r["role"], r["message"], r["timestamp"]) for r in records(conn, sid) if r["kind"] == "message"]
+
+def load_labels(conn, sid):
+    """[(message, scam_label)] of the archived scammer messages of sid the LLM check judged."""
+    return [(r["message"], r["label"]) for r in records(conn, sid)
+            if r["kind"] == "message" and r["role"] == "scammer" and r.get("label") is not None]
+
+def load_evidence(conn, sid):
+    """[(type, value)] archived for sid, first sighting first."""
+    return [(r["type"], r["value"]) for r in records(conn, sid) if r["kind"] == "evidence"]
+
+def is_archived(conn, sid):
+    return conn.execute("SELECT 1 FROM archive_index WHERE session_id=? LIMIT 1", (sid,)).fetchone() is not None
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    ap = argparse.ArgumentParser(description="Move idle sessions out of the hot database into compressed segments.")
+    ap.add_argument("--db", default=DB_NAME)
+    ap.add_argument("--idle-hours", type=float, default=IDLE_HOURS)
+    ap.add_argument("--batch", type=int, default=BATCH, help="sessions per delete transaction")
+    args = ap.parse_args()
+    for path in shards.shard_paths(args.db):
+        sessions, msgs, ev = compact(path, args.idle_hours, args.batch)
+        print(f"✅ {path}: archived {sessions} sessions ({msgs} messages, {ev} evidence rows)")
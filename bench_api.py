@@ -0,0 +1,186 @@
+# bench_api.py
+# In-process load / replay benchmark for the honeypot API.
+# Drives main.app through ASGI (no sockets), replays synthetic multi-turn scam
+# conversations, and writes machine-readable results so catch_all regressions
+# can be compared between commits. The GUVI callback goes to a local stub
+# server and the LLM is the local fake backend (or off).
+#
+#   python bench_api.py --sessions 200 --turns 8 --concurrency 50 --out bench.json
+#   python bench_api.py --compare bench.json          # run again and diff
+#
+# Background work (extract_evidence, confirm_scam) runs on admission.py's
+# workers, so latencies are the reply path only; workQueueMax shows the backlog.
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- 1. SYNTHETIC SCAMMERS ---
+OPENERS = [
+    "Dear customer your {bank} account will be BLOCKED today due to pending KYC.",
+    "This is Inspector Sharma from cyber police, a case is filed against your number.",
+    "Congratulations! You won Rs {amount} lottery, pay processing charge to claim.",
+    "Your electricity connection will be cut tonight. Call {phone} urgently.",
+]
+FOLLOW_UPS = [
+    "Share the OTP code sent to your mobile to verify.",
+    "Transfer Rs {amount} to {upi} immediately or police will arrest you.",
+    "Send money to account {account} IFSC SBIN0001234 now.",
+    "Click http://{bank}-kyc-update.in/login and enter your PIN.",
+    "Why are you not answering? This is urgent madam.",
+    "Call me on {phone}, I am the bank manager.",
+    "ok",
+]
+
+def conversation(rng, turns):
+    fill = lambda t: t.format(bank=rng.choice(["sbi", "hdfc", "icici"]), amount=rng.randint(499, 99999),
+                              phone=f"9{rng.randint(100000000, 999999999)}",
+                              upi=f"refund{rng.randint(1, 999)}@okaxis",
+                              account=str(rng.randint(10 ** 11, 10 ** 12)))
+    yield fill(rng.choice(OPENERS))
+    for _ in range(turns - 1):
+        yield fill(rng.choice(FOLLOW_UPS))
+
+# --- 2. LOCAL CALLBACK STUB ---
+class CallbackStub(BaseHTTPRequestHandler):
+    received = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        CallbackStub.received += 1
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+def start_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CallbackStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# --- 3. THE RUN ---
+def pct(values, p):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(p * len(values)))], 2) if values else None
+
+async def run(args):
+    import httpx
+    import main
+
+    rng = random.Random(args.seed)
+    latencies, errors, rejected, degraded = [], 0, 0, 0
+    backlog = {"storageQueueMax": 0, "outboxQueueMax": 0, "workQueueMax": 0, "tasksMax": 0}
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def session(client, n):
+        nonlocal errors, rejected, degraded
+        sid = f"bench-{args.seed}-{n}"
+        for text in conversation(rng, args.turns):
+            async with slots:
+                start = time.perf_counter()
+                resp = await client.post("/api/chat", json={"sessionId": sid, "message": {"sender": "scammer", "text": text}})
+                latencies.append((time.perf_counter() - start) * 1000)
+                if resp.status_code == 429: rejected += 1
+                elif resp.status_code != 200 or resp.json().get("status") != "success": errors += 1
+                elif resp.headers.get("X-Sentinel-Shed"): degraded += 1
+
+    async def sample(stop):
+        while not stop.is_set():
+            backlog["storageQueueMax"] = max(backlog["storageQueueMax"], main.storage.depth)
+            backlog["outboxQueueMax"] = max(backlog["outboxQueueMax"], main.outbox.stats()["queueDepth"])
+            backlog["workQueueMax"] = max(backlog["workQueueMax"], main.work.depth)
+            backlog["tasksMax"] = max(backlog["tasksMax"], len(asyncio.all_tasks()))
+            await asyncio.sleep(0.01)
+
+    async with main.lifespan(main.app):
+        rows_before = main.storage.stats["rows"]
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            stop = asyncio.Event()
+            sampler = asyncio.create_task(sample(stop))
+            start = time.perf_counter()
+            await asyncio.gather(*(session(client, n) for n in range(args.sessions)))
+            elapsed = time.perf_counter() - start
+            backlog["storageQueueAtEnd"] = main.storage.depth
+            backlog["outboxQueueAtEnd"] = main.outbox.stats()["queueDepth"]
+            backlog["workQueueAtEnd"] = main.work.depth
+            stop.set()
+            await sampler
+        await main.work.close()   # let queued evidence land before counting rows
+        await main.storage.flush()
+        rows = main.storage.stats["rows"] - rows_before
+        shed = main.admission.stats()["shed"]
+
+    requests_ = len(latencies)
+    return {
+        "requests": requests_,
+        "errors": errors,
+        "rejected": rejected,
+        "degraded": degraded,
+        "shed": shed,
+        "seconds": round(elapsed, 3),
+        "throughputRps": round(requests_ / elapsed, 1),
+        "latencyMs": {"p50": pct(latencies, 0.5), "p95": pct(latencies, 0.95),
+                      "p99": pct(latencies, 0.99), "max": pct(latencies, 1.0)},
+        "rowsWrittenPerRequest": round(rows / requests_, 2) if requests_ else None,
+        "backlog": backlog,
+        "callbacksReceived": CallbackStub.received,
+    }
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)), text=True).strip()
+    except Exception:
+        return None
+
+def compare(old, new):
+    print(f"{'metric':<22}{'before':>12}{'after':>12}")
+    for label, get in [("throughput rps", lambda r: r["throughputRps"]),
+                       ("p50 ms", lambda r: r["latencyMs"]["p50"]),
+                       ("p95 ms", lambda r: r["latencyMs"]["p95"]),
+                       ("p99 ms", lambda r: r["latencyMs"]["p99"]),
+                       ("rows / request", lambda r: r["rowsWrittenPerRequest"])]:
+        print(f"{label:<22}{get(old['results']):>12}{get(new['results']):>12}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="In-process load benchmark for catch_all.")
+    ap.add_argument("--sessions", type=int, default=200)
+    ap.add_argument("--turns", type=int, default=6)
+    ap.add_argument("--concurrency", type=int, default=50)
+    ap.add_argument("--llm", choices=["fake", "off"], default="off")
+    ap.add_argument("--llm-latency", type=float, default=0.05, help="seconds per fake LLM call")
+    ap.add_argument("--shards", type=int, default=1, help="STORAGE_SHARDS for the run")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", default="bench_output.json")
+    ap.add_argument("--compare", help="previous results file to diff against")
+    args = ap.parse_args()
+
+    # Everything the app reads at import time has to be set before importing main
+    stub = start_stub()
+    os.environ["GUVI_CALLBACK_URL"] = f"http://127.0.0.1:{stub.server_port}/callback"
+    os.environ["CALLBACK_WINDOW"] = "0.5"
+    os.environ["SENTINEL_LLM_BACKEND"] = args.llm
+    os.environ["FAKE_LLM_LATENCY"] = str(args.llm_latency)
+    os.environ["STORAGE_SHARDS"] = str(args.shards)
+    out = os.path.abspath(args.out)
+    baseline = json.load(open(args.compare)) if args.compare else None
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(tempfile.mkdtemp(prefix="sentinel-bench-"))   # fresh honeypot.db (or shards)
+
+    results = asyncio.run(run(args))
+    report = {"commit": git_commit(), "config": vars(args), "results": results}
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"📄 written to {out}")
+    if baseline: compare(baseline, report)
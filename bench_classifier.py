@@ -0,0 +1,75 @@
+# bench_classifier.py
+# Accuracy/latency report: the local scam classifier vs the keyword scoring
+# (textengine.is_scam, what the handler used on its own before).
+# - Evaluated on the held-out sessions of classifier.split(), so the model
+#   never saw them; by default it is trained on the other sessions right here.
+#   --model scores a saved model instead (only fair if it wasn't trained --all).
+# - Only held-out messages of the audit sample (classifier.sampled) and the hand
+#   labels are scored: the other LLM labels exist because the keywords missed
+#   the message, so the keywords would score zero recall on them by construction.
+# - "model (sure)" is the serving setup: answers outside LOW..HIGH, the rest
+#   would go to the LLM; coverage is the share of LLM calls it saves.
+#
+#   python bench_classifier.py [--db honeypot.db] [--labels labels.jsonl] [--model scam_model.npy]
+import argparse
+import time
+import classifier
+import shards
+import textengine
+
+def scores(predicted, actual):
+    """(accuracy, precision, recall, f1) over the messages with a prediction."""
+    pairs = [(p, a) for p, a in zip(predicted, actual) if p is not None]
+    tp = sum(p and a for p, a in pairs)
+    fp = sum(p and not a for p, a in pairs)
+    fn = sum(not p and a for p, a in pairs)
+    accuracy = sum(p == a for p, a in pairs) / len(pairs) if pairs else 0.0
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return accuracy, precision, recall, f1
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat): result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default=shards.DB_NAME)
+    ap.add_argument("--labels", help="extra hand-labelled messages, JSON lines of {text, scam}")
+    ap.add_argument("--model", help="evaluate this saved model instead of training one")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    train_set, test = classifier.split(classifier.load_examples(args.db, args.labels))
+    hand = f"{args.labels}:" if args.labels else None
+    test = [e for e in test if classifier.sampled(e[1]) or (hand and str(e[0]).startswith(hand))]
+    if not test: raise SystemExit("❌ No held-out audit-sample messages; collect some traffic (or pass --labels) first")
+    texts = [t for _, t, _ in test]
+    actual = [y for _, _, y in test]
+
+    if args.model:
+        model = classifier.Model.load(args.model)
+    else:
+        start = time.perf_counter()
+        model = classifier.train([t for _, t, _ in train_set], [y for _, _, y in train_set])
+        print(f"🧮 trained on {len(train_set)} messages in {time.perf_counter() - start:.1f}s")
+    print(f"📊 {len(test)} held-out messages (audit sample 1 in {classifier.LABEL_SAMPLE}"
+          f"{' + hand labels' if hand else ''}), {sum(actual)} scam")
+
+    keyword, keyword_sec = timed(lambda: [textengine.is_scam(a) for a in textengine.analyze_many(texts)], args.repeat)
+    probs, batch_sec = timed(lambda: model.predict(texts), args.repeat)
+    _, single_sec = timed(lambda: [model.predict([t]) for t in texts], 1)
+    best = [p >= 0.5 for p in probs]
+    sure = [True if p >= classifier.HIGH else False if p <= classifier.LOW else None for p in probs]
+    coverage = sum(v is not None for v in sure) / len(sure)
+
+    n = len(texts)
+    print(f"{'method':<16}{'accuracy':>9}{'precision':>10}{'recall':>8}{'f1':>7}{'us/msg':>9}")
+    for name, predicted, sec in (("keywords", keyword, keyword_sec), ("model @0.5", best, batch_sec),
+                                 ("model (sure)", sure, batch_sec)):
+        acc, prec, rec, f1 = scores(predicted, actual)
+        print(f"{name:<16}{acc:>9.3f}{prec:>10.3f}{rec:>8.3f}{f1:>7.3f}{sec / n * 1e6:>9.1f}")
+    print(f"model (sure) covers {coverage:.1%} of messages (band {classifier.LOW}..{classifier.HIGH}); "
+          f"one message at a time costs {single_sec / n * 1e6:.1f} us/msg")
@@ -0,0 +1,80 @@
+# bench_textengine.py
+# Micro-benchmark: per-message cost of the old multi-pass analysis vs textengine.
+# Run: python bench_textengine.py [--repeat 200]
+import argparse
+import re
+import time
+import textengine
+
+# --- 1. THE OLD PIPELINE (analyze_intent + extract_evidence + logic.extract_intel) ---
+def legacy_analyze_intent(text):
+    text = text.lower()
+    scores = {"police_threat": 0, "account_lock": 0, "money_demand": 0, "otp_demand": 0, "general_confusion": 0}
+    if any(w in text for w in ["police", "jail", "arrest", "court", "lawyer", "case"]): scores["police_threat"] += 5
+    if any(w in text for w in ["block", "lock", "suspend", "close", "deactivate"]): scores["account_lock"] += 5
+    if any(w in text for w in ["money", "transfer", "pay", "rupee", "amount", "charge"]): scores["money_demand"] += 4
+    if any(w in text for w in ["otp", "code", "pin", "verify", "number"]): scores["otp_demand"] += 4
+    if "urgent" in text:
+        scores["account_lock"] += 2
+        scores["police_threat"] += 1
+    best = max(scores, key=scores.get)
+    return best if scores[best] else "general_confusion"
+
+def legacy_extract_evidence(text):
+    extracted = []
+    for u in re.findall(r'[a-zA-Z0-9\.\-_]+@[a-zA-Z]+', text): extracted.append(("UPI ID", u))
+    phones = re.findall(r'(?<!\d)[6-9]\d{9}(?!\d)', text)
+    for p in phones: extracted.append(("Phone Number", p))
+    for acc in re.findall(r'\d{9,18}', text):
+        if acc not in phones: extracted.append(("Bank Account", acc))
+    for k in ["urgent", "blocked", "sbi", "hdfc", "otp", "police", "jail", "verify"]:
+        if k in text.lower(): extracted.append(("Suspicious Keyword", k.upper()))
+    return extracted
+
+def legacy_extract_intel(text):
+    data = {
+        "upiIds": re.findall(r"[\w\.-]+@[\w\.-]+", text),
+        "phishingLinks": re.findall(r"https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+", text),
+        "phoneNumbers": re.findall(r"(?:\+91|0)?[6-9]\d{9}", text),
+        "bankAccounts": re.findall(r"\b\d{9,18}\b", text),
+        "suspiciousKeywords": [],
+    }
+    if "blocked" in text.lower() or "urgent" in text.lower():
+        data["suspiciousKeywords"].append("Urgency")
+    return data
+
+def legacy(text):
+    return legacy_analyze_intent(text), legacy_extract_evidence(text), legacy_extract_intel(text)
+
+def engine(text):
+    a = textengine.analyze(text)
+    return a.intent, textengine.as_rows(a), textengine.as_intel(a)
+
+# --- 2. SAMPLE TEXTS ---
+SCAM = ("Dear customer your SBI account will be BLOCKED today. URGENT: complete KYC verify at "
+        "http://sbi-kyc-update.in/login or police case will be filed. Pay Rs 4999 processing charge "
+        "to refund.desk@okaxis or call 9876543210. Share the OTP code sent to your number. "
+        "Transfer amount to A/C 123456789012 IFSC SBIN0001234. ")
+SAMPLES = {
+    "short": "Your account is blocked. Click http://bit.ly/scam-link",
+    "pasted_1k": (SCAM * 3)[:1000],
+    "pasted_10k": (SCAM * 30)[:10000],
+    "benign_10k": ("hello how are you doing today, the weather is nice and we had lunch. " * 150)[:10000],
+}
+
+def bench(fn, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat): fn(text)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    print(f"{'sample':<12}{'chars':>8}{'legacy us':>12}{'engine us':>12}{'speedup':>9}")
+    for name, text in SAMPLES.items():
+        old = bench(legacy, text, args.repeat)
+        new = bench(engine, text, args.repeat)
+        assert legacy_analyze_intent(text) == textengine.analyze(text).intent
+        print(f"{name:<12}{len(text):>8}{old:>12.1f}{new:>12.1f}{old / new:>8.1f}x")
@@ -0,0 +1,203 @@
+# bulk_analyze.py
+# Offline bulk analysis of exported scam-chat corpora with the live engine.
+# - Streams a JSONL or CSV corpus record by record (never loads the whole file).
+# - Fans chunks out over a process pool; at most --inflight chunks exist at once,
+#   so memory stays flat however big the dump is.
+# - Every finished chunk lands in ONE transaction: intent counts, deduplicated
+#   evidence and the resume checkpoint together, so a killed run resumes exactly
+#   where it stopped without double counting.
+# - Same scanner as the API (textengine.analyze = analyze_intent + extract_evidence).
+#
+#   python bulk_analyze.py dump.jsonl [--out bulk_analysis.db] [--workers 8] [--chunk 5000]
+#   python bulk_analyze.py dump.csv --text-field body --session-field chat_id
+import argparse
+import csv
+import io
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+import textengine
+
+OUT_DB = "bulk_analysis.db"
+CHUNK = 5000
+TEXT_FIELDS = ("text", "message", "body", "content")
+SESSION_FIELDS = ("sessionId", "session_id", "chat_id", "conversation_id")
+
+TABLES = [
+    '''CREATE TABLE IF NOT EXISTS bulk_progress
+       (corpus TEXT PRIMARY KEY, records INTEGER, updated TEXT DEFAULT (datetime('now', 'localtime')))''',
+    '''CREATE TABLE IF NOT EXISTS bulk_intents
+       (corpus TEXT, intent TEXT, messages INTEGER, PRIMARY KEY (corpus, intent))''',
+    '''CREATE TABLE IF NOT EXISTS bulk_evidence
+       (corpus TEXT, session_id TEXT, type TEXT, value TEXT, UNIQUE (corpus, session_id, value))''',
+]
+
+# --- 1. STREAMING THE CORPUS ---
+def _pick(record, wanted, fallbacks):
+    if wanted: return record.get(wanted)
+    for key in fallbacks:
+        if record.get(key) is not None: return record[key]
+    return None
+
+def _text(value):
+    # {"message": {"text": ...}} is the honeypot's own payload shape
+    if isinstance(value, dict): value = value.get("text")
+    return "" if value is None else str(value)
+
+def read_corpus(path, text_field=None, session_field=None, progress=None):
+    """Yield (session_id, text) per record. progress[0] tracks bytes read."""
+    with open(path, "rb") as f:
+        raw_lines = _counting(f, progress)
+        if path.lower().endswith(".csv"):
+            for row in csv.DictReader(io.TextIOWrapper(_LineReader(raw_lines), encoding="utf-8", newline="")):
+                yield str(_pick(row, session_field, SESSION_FIELDS) or ""), _text(_pick(row, text_field, TEXT_FIELDS))
+            return
+        for raw in raw_lines:
+            if not raw.strip(): continue
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                record = {"text": raw.decode("utf-8", "replace")}   # a bare line of text is a message too
+            if not isinstance(record, dict): record = {"text": record}
+            yield str(_pick(record, session_field, SESSION_FIELDS) or ""), _text(_pick(record, text_field, TEXT_FIELDS))
+
+def _counting(f, progress):
+    for raw in f:
+        if progress is not None: progress[0] += len(raw)
+        yield raw
+
+class _LineReader(io.RawIOBase):
+    # Lets csv read from the counting byte-line generator
+    def __init__(self, lines):
+        self.lines = lines
+        self.pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        while not self.pending:
+            self.pending = next(self.lines, b"")
+            if not self.pending: return 0
+        n = min(len(buf), len(self.pending))
+        buf[:n] = self.pending[:n]
+        self.pending = self.pending[n:]
+        return n
+
+def chunked(records, size, skip=0):
+    """Lists of up to size records, after dropping the first `skip` (already done)."""
+    chunk = []
+    for i, record in enumerate(records):
+        if i < skip: continue
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk: yield chunk
+
+# --- 2. THE WORKER (runs in the pool) ---
+def analyze_chunk(chunk):
+    """(intent counts, {(session_id, type, value)}) for one chunk."""
+    intents = Counter()
+    evidence = set()
+    for (sid, _), analysis in zip(chunk, textengine.analyze_many(text for _, text in chunk)):
+        intents[analysis.intent] += 1
+        for type_, value in textengine.as_rows(analysis):
+            evidence.add((sid, type_, value))
+    return intents, evidence
+
+# --- 3. WRITING RESULTS ---
+def open_out(path):
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    for sql in TABLES: conn.execute(sql)
+    return conn
+
+def done_records(conn, corpus):
+    row = conn.execute("SELECT records FROM bulk_progress WHERE corpus=?", (corpus,)).fetchone()
+    return row[0] if row else 0
+
+def save_chunk(conn, corpus, records, intents, evidence):
+    # Counts, evidence and the checkpoint commit together or not at all
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany("INSERT INTO bulk_intents (corpus, intent, messages) VALUES (?, ?, ?) "
+                         "ON CONFLICT(corpus, intent) DO UPDATE SET messages = messages + excluded.messages",
+                         [(corpus, intent, n) for intent, n in intents.items()])
+        conn.executemany("INSERT OR IGNORE INTO bulk_evidence (corpus, session_id, type, value) VALUES (?, ?, ?, ?)",
+                         [(corpus, sid, type_, value) for sid, type_, value in evidence])
+        conn.execute("INSERT INTO bulk_progress (corpus, records) VALUES (?, ?) ON CONFLICT(corpus) "
+                     "DO UPDATE SET records=excluded.records, updated=datetime('now', 'localtime')", (corpus, records))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def summary(conn, corpus):
+    intents = conn.execute("SELECT intent, messages FROM bulk_intents WHERE corpus=? ORDER BY messages DESC",
+                           (corpus,)).fetchall()
+    evidence = conn.execute("SELECT type, COUNT(*), COUNT(DISTINCT value) FROM bulk_evidence WHERE corpus=? "
+                            "GROUP BY type ORDER BY 2 DESC", (corpus,)).fetchall()
+    return {"intents": dict(intents), "evidence": {t: {"rows": n, "distinctValues": d} for t, n, d in evidence}}
+
+# --- 4. THE RUN ---
+def run(path, out=OUT_DB, workers=None, chunk=CHUNK, inflight=None, text_field=None, session_field=None,
+        restart=False, log=sys.stderr):
+    corpus = os.path.abspath(path)
+    conn = open_out(out)
+    if restart:
+        for table in ("bulk_progress", "bulk_intents", "bulk_evidence"):
+            conn.execute(f"DELETE FROM {table} WHERE corpus=?", (corpus,))
+    done = done_records(conn, corpus)
+    if done: print(f"↩️  resuming after {done} records", file=log)
+
+    workers = workers or os.cpu_count() or 1
+    inflight = inflight or 2 * workers
+    total_bytes = os.path.getsize(path) or 1
+    progress = [0]
+    started, processed = time.time(), 0
+    records = read_corpus(path, text_field, session_field, progress)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()   # (future, records in chunk), in submission order
+        chunks = chunked(records, chunk, skip=done)
+        while True:
+            # Keep the pool busy but never hold more than `inflight` chunks in memory
+            while len(pending) < inflight:
+                batch = next(chunks, None)
+                if batch is None: break
+                pending.append((pool.submit(analyze_chunk, batch), len(batch)))
+            if not pending: break
+            # Results are committed in order, so the checkpoint is always a clean prefix
+            future, n = pending.popleft()
+            intents, evidence = future.result()
+            done += n
+            processed += n
+            save_chunk(conn, corpus, done, intents, evidence)
+            rate = processed / max(time.time() - started, 1e-9)
+            print(f"\r⏳ {done} records  {100 * progress[0] / total_bytes:5.1f}% read  {rate:,.0f} rec/s",
+                  end="", file=log, flush=True)
+    print(file=log)
+    result = summary(conn, corpus)
+    conn.close()
+    return done, result
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Run a JSONL/CSV scam-chat corpus through the honeypot's analysis engine.")
+    ap.add_argument("corpus", help=".jsonl (one JSON object or text per line) or .csv with a header row")
+    ap.add_argument("--out", default=OUT_DB, help="results database (intent counts, evidence, checkpoints)")
+    ap.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    ap.add_argument("--chunk", type=int, default=CHUNK, help="records per chunk / per transaction")
+    ap.add_argument("--inflight", type=int, default=None, help="max chunks in memory (default: 2 x workers)")
+    ap.add_argument("--text-field", help=f"field holding the message (default: first of {', '.join(TEXT_FIELDS)})")
+    ap.add_argument("--session-field", help=f"field holding the chat id (default: first of {', '.join(SESSION_FIELDS)})")
+    ap.add_argument("--restart", action="store_true", help="forget earlier progress for this corpus")
+    args = ap.parse_args()
+
+    total, result = run(args.corpus, args.out, args.workers, args.chunk, args.inflight,
+                        args.text_field, args.session_field, args.restart)
+    print(json.dumps(result, indent=2))
+    print(f"✅ {total} records analysed, results in {args.out}")
@@ -0,0 +1,122 @@
+# campaigns.py
+# Cross-session evidence index: which sessions shared the same UPI ID, phone,
+# bank account or link, and which sessions form one scam campaign.
+# - evidence_index (schema.py) maps a normalized identifier to every session
+#   that produced it, with first/last seen. It is upserted in the same write as
+#   the evidence rows, so it never needs a rebuild.
+# - Lookups are primary-key / index seeks; only campaigns() reads the whole
+#   index, and it is meant for the dashboard or offline use.
+# - Every query takes one connection; with shards (see shards.py) callers fan
+#   out with storage.read_all() and merge with the helpers at the bottom.
+import re
+import textengine
+
+_KIND = {label: kind for kind, label in textengine.EVIDENCE_LABELS.items()}
+
+# --- 1. NORMALIZATION ---
+def normalize(type_, value):
+    """Index key for an evidence row, or None if it isn't an identifier (keywords)."""
+    kind = _KIND.get(type_, type_)
+    value = str(value).strip()
+    if kind == "keyword" or not value: return None
+    if kind == "phone":
+        value = re.sub(r"\D", "", value)[-10:]      # +91 98765 43210 == 09876543210 == 9876543210
+    elif kind == "account":
+        value = re.sub(r"\D", "", value)
+    elif kind == "link":
+        value = re.sub(r"^[a-z]+://", "", value.lower())
+        value = value.removeprefix("www.").rstrip("/")
+    else:
+        value = value.lower()
+    return f"{kind}:{value}" if value else None
+
+UPSERT = ("INSERT INTO evidence_index (key, session_id, type, value, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?) "
+          "ON CONFLICT(key, session_id) DO UPDATE SET last_seen=MAX(last_seen, excluded.last_seen)")
+
+def index_rows(sid, rows, timestamp):
+    """UPSERT params for (type, value) evidence rows seen in session sid at timestamp."""
+    out = []
+    for type_, value in rows:
+        key = normalize(type_, value)
+        if key: out.append((key, sid, type_, value, timestamp, timestamp))
+    return out
+
+# --- 2. LOOKUPS (one shard) ---
+def lookup(conn, type_, value):
+    """[(session_id, first_seen, last_seen)] of every session that produced this identifier."""
+    key = normalize(type_, value)
+    if not key: return []
+    return conn.execute("SELECT session_id, first_seen, last_seen FROM evidence_index WHERE key=? ORDER BY first_seen",
+                        (key,)).fetchall()
+
+def session_keys(conn, sid):
+    """{key: value} of the identifiers session sid produced."""
+    return dict(conn.execute("SELECT key, value FROM evidence_index WHERE session_id=?", (sid,)).fetchall())
+
+def other_sessions(conn, keys, sid):
+    """{key: number of sessions other than sid} for the given keys."""
+    if not keys: return {}
+    keys = list(keys)
+    marks = ",".join("?" * len(keys))
+    return dict(conn.execute(f"SELECT key, COUNT(*) FROM evidence_index WHERE key IN ({marks}) AND session_id != ? "
+                             "GROUP BY key", keys + [sid]).fetchall())
+
+def edges(conn):
+    """Every (key, session_id, first_seen, last_seen) on this shard, for campaigns()."""
+    return conn.execute("SELECT key, session_id, first_seen, last_seen FROM evidence_index ORDER BY key").fetchall()
+
+# --- 3. MERGING ACROSS SHARDS ---
+def merge_counts(parts):
+    total = {}
+    for part in parts:
+        for key, n in part.items(): total[key] = total.get(key, 0) + n
+    return total
+
+def also_seen(keys, counts):
+    """[(value, other sessions)] for a session's {key: value}, given merged other_sessions counts."""
+    return [(value, counts[key]) for key, value in keys.items() if counts.get(key)]
+
+def describe(linked):
+    return " ".join(f"{value} also seen in {n} other session{'s' if n > 1 else ''}." for value, n in linked)
+
+def campaigns(parts, min_sessions=2):
+    """Cluster sessions that share any identifier (union-find over the index).
+    parts: edges() from every shard. Biggest campaigns first."""
+    parent = {}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]   # path halving
+            x = parent[x]
+        return x
+
+    def union(a, b):
+        ra, rb = find(a), find(b)
+        if ra != rb: parent[rb] = ra
+
+    first_of_key, key_sessions, keys_of, seen = {}, {}, {}, {}
+    for rows in parts:
+        for key, sid, first, last in rows:
+            parent.setdefault(sid, sid)
+            if key in first_of_key: union(first_of_key[key], sid)
+            else: first_of_key[key] = sid
+            key_sessions[key] = key_sessions.get(key, 0) + 1
+            keys_of.setdefault(sid, set()).add(key)
+            lo, hi = seen.get(sid, (first, last))
+            seen[sid] = (min(lo, first), max(hi, last))
+
+    groups = {}
+    for sid in parent: groups.setdefault(find(sid), []).append(sid)
+    out = []
+    for sids in groups.values():
+        if len(sids) < min_sessions: continue
+        keys = set().union(*(keys_of[s] for s in sids))
+        # Only identifiers that actually link sessions; one-off values are noise here
+        shared = sorted(k for k in keys if key_sessions[k] > 1)
+        out.append({
+            "sessions": sorted(sids),
+            "identifiers": shared,
+            "firstSeen": min(seen[s][0] for s in sids),
+            "lastSeen": max(seen[s][1] for s in sids),
+        })
+    return sorted(out, key=lambda c: -len(c["sessions"]))
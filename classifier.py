@@ -0,0 +1,217 @@
+# classifier.py
+# Local scam classifier: hashed word n-grams and a linear model, in NumPy.
+# - Features are the simcache.normalize words (links, UPI IDs and numbers
+#   masked) and their bigrams, hashed with a sign bit into DIM buckets and
+#   L2-normalized per message.
+# - predict(texts) scores a whole batch at once: the features of every message
+#   go into flat arrays and one bincount sums them per message (a sparse
+#   matrix-vector product; a dense messages x DIM matrix would be mostly zeros).
+# - The weights are one float32 .npy file (DIM weights, then the bias) opened
+#   with mmap_mode="r": loading reads nothing up front, and uvicorn workers
+#   share the pages.
+# - verdicts() answers True/False where the model is sure and None in between
+#   (LOW..HIGH); only those go to the LLM. Without a model file everything is None.
+# - Trained offline from honeypot.db on the scammer messages the LLM check
+#   judged (messages.scam_label), plus optional hand labels. Not the session's
+#   is_scam flag: the keywords and this model raise it too, so the model would
+#   learn its own verdicts, and it marks every turn of a scam chat as scam.
+#   Sessions are split 80/20 by id for evaluation.
+# - Those labels alone only cover what the keywords and this model were unsure
+#   about. sampled() picks 1 in LABEL_SAMPLE scammer messages (by a hash of the
+#   text, whatever anything said about it) for the LLM check as well, so
+#   bench_classifier.py has a test set the keyword verdict didn't filter.
+#
+#   python classifier.py [--db honeypot.db] [--labels labels.jsonl] [--all]
+#   python bench_classifier.py    # accuracy/latency against the keyword scoring
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+import archive
+import shards
+import simcache
+
+logger = logging.getLogger("uvicorn")
+
+# --- CONFIGURATION ---
+MODEL_FILE = os.environ.get("SCAM_MODEL_FILE", "scam_model.npy")
+LOW = float(os.environ.get("SCAM_MODEL_LOW", "0.1"))     # at or below: safe, no LLM call
+HIGH = float(os.environ.get("SCAM_MODEL_HIGH", "0.9"))   # at or above: scam, no LLM call
+DIM_BITS = 18             # 2^18 buckets: 1 MB of weights, few collisions for chat vocabulary
+HOLDOUT = 5               # one session in HOLDOUT is kept out of training for evaluation
+LABEL_SAMPLE = int(os.environ.get("SCAM_LABEL_SAMPLE", "50"))   # 1 message in N is LLM-labelled regardless; 0 = off
+
+# --- 1. FEATURES ---
+def _hashes(text):
+    words = simcache.normalize(text)
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    return [zlib.crc32(f.encode()) for f in features]
+
+def _sparse(texts, dim):
+    """(rows, cols, values) of the texts' feature matrix; the top hash bit is the sign."""
+    import numpy as np   # first use only: it is a tenth of a second at import
+    hashes, lengths = [], []
+    for text in texts:
+        h = _hashes(text)
+        hashes += h
+        lengths.append(len(h))
+    h = np.array(hashes, dtype=np.uint32)
+    lengths = np.array(lengths, dtype=np.int64)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    signs = np.where(h >> 31, -1.0, 1.0).astype(np.float32)
+    values = signs / np.sqrt(np.maximum(lengths, 1)).astype(np.float32)[rows]
+    return rows, (h & (dim - 1)).astype(np.int64), values
+
+# --- 2. THE MODEL ---
+class Model:
+    def __init__(self, params):
+        # params: DIM weights followed by the bias, DIM a power of two
+        self.params = params
+        self.dim = len(params) - 1
+        if self.dim & (self.dim - 1): raise ValueError(f"model has {self.dim} weights, not a power of two")
+
+    @classmethod
+    def load(cls, path=MODEL_FILE):
+        import numpy as np
+        return cls(np.load(path, mmap_mode="r"))
+
+    def save(self, path=MODEL_FILE):
+        import numpy as np
+        tmp = f"{path}.tmp.npy"
+        np.save(tmp, np.asarray(self.params, dtype=np.float32))
+        os.replace(tmp, path)
+
+    def logits(self, texts):
+        import numpy as np
+        rows, cols, values = _sparse(texts, self.dim)
+        return np.bincount(rows, weights=self.params[cols] * values, minlength=len(texts)) + float(self.params[-1])
+
+    def predict(self, texts):
+        """Scam probability of every text, in one pass."""
+        import numpy as np
+        return 1.0 / (1.0 + np.exp(-self.logits(texts)))
+
+def train(texts, labels, dim_bits=DIM_BITS, steps=300, rate=0.05, l2=1e-5):
+    """Logistic regression, full-batch Adam; classes are weighted to count equally."""
+    import numpy as np
+    dim = 1 << dim_bits
+    y = np.asarray(labels, dtype=np.float64)
+    rows, cols, values = _sparse(texts, dim)
+    positives = max(y.sum(), 1)
+    negatives = max(len(y) - y.sum(), 1)
+    weight = np.where(y > 0, len(y) / (2 * positives), len(y) / (2 * negatives)) / len(y)
+    params = np.zeros(dim + 1)
+    m, v = np.zeros(dim + 1), np.zeros(dim + 1)
+    for t in range(1, steps + 1):
+        z = np.bincount(rows, weights=params[cols] * values, minlength=len(y)) + params[-1]
+        error = (1.0 / (1.0 + np.exp(-z)) - y) * weight
+        grad = np.empty(dim + 1)
+        grad[:-1] = np.bincount(cols, weights=error[rows] * values, minlength=dim) + l2 * params[:-1]
+        grad[-1] = error.sum()
+        m = 0.9 * m + 0.1 * grad
+        v = 0.999 * v + 0.001 * grad * grad
+        params -= rate * (m / (1 - 0.9 ** t)) / (np.sqrt(v / (1 - 0.999 ** t)) + 1e-8)
+    return Model(params.astype(np.float32))
+
+# --- 3. SERVING ---
+_model = None
+_loaded = False
+_lock = threading.Lock()
+counts = {"scam": 0, "safe": 0, "unsure": 0}
+
+def get_model():
+    """The model in MODEL_FILE, loaded on first use; None if there is none."""
+    global _model, _loaded
+    if _loaded: return _model
+    with _lock:
+        if not _loaded:
+            if os.path.exists(MODEL_FILE):
+                try:
+                    _model = Model.load(MODEL_FILE)
+                    logger.info(f"🧮 Scam classifier loaded from {MODEL_FILE} ({_model.dim} features)")
+                except Exception as e:
+                    logger.error(f"Scam classifier {MODEL_FILE} unusable: {e}")
+            _loaded = True
+    return _model
+
+def verdicts(texts):
+    """True (scam) / False (safe) per text where the model is sure, None where the LLM should decide."""
+    model = get_model()
+    if model is None or not texts: return [None] * len(texts)
+    out = []
+    for p in model.predict(texts):
+        verdict = True if p >= HIGH else False if p <= LOW else None
+        counts["scam" if verdict else "safe" if verdict is False else "unsure"] += 1
+        out.append(verdict)
+    return out
+
+def verdict(text):
+    return verdicts([text])[0]
+
+def stats():
+    model = get_model() if _loaded else None
+    return {"loaded": model is not None, "features": model.dim if model else None,
+            "band": [LOW, HIGH], **counts}
+
+# --- 4. TRAINING DATA ---
+def sampled(text):
+    """Whether text is in the audit sample: LLM-labelled even when the keywords or the model settled it."""
+    return LABEL_SAMPLE > 0 and zlib.crc32(str(text).encode()) % LABEL_SAMPLE == 0
+
+def _held_out(sid):
+    return zlib.crc32(str(sid).encode()) % HOLDOUT == 0
+
+def load_examples(db=shards.DB_NAME, labels=None):
+    """[(session id, text, is_scam)] of every LLM-labelled scammer message, archived ones included, then the hand labels."""
+    examples = []
+    for path in shards.shard_paths(db):
+        if not os.path.exists(path): continue
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] < 4:
+                raise SystemExit(f"❌ {path} predates message labels; run python schema.py on it first")
+            examples += [(sid, text, bool(label)) for sid, text, label in conn.execute(
+                "SELECT session_id, message, scam_label FROM messages WHERE role='scammer' AND scam_label IS NOT NULL ORDER BY id")]
+            for (sid,) in conn.execute("SELECT DISTINCT session_id FROM archive_index"):
+                examples += [(sid, text, bool(label)) for text, label in archive.load_labels(conn, sid)]
+        finally:
+            conn.close()
+    if labels:
+        with open(labels, encoding="utf-8") as f:
+            for n, line in enumerate(f):
+                if line.strip():
+                    row = json.loads(line)
+                    examples.append((f"{labels}:{n}", row["text"], bool(row["scam"])))
+    return examples
+
+def split(examples):
+    """(train, test), by session so no conversation is on both sides."""
+    train_, test = [], []
+    for example in examples:
+        (test if _held_out(example[0]) else train_).append(example)
+    return train_, test
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    ap = argparse.ArgumentParser(description="Train the local scam classifier from the honeypot database.")
+    ap.add_argument("--db", default=shards.DB_NAME)
+    ap.add_argument("--labels", help="extra hand-labelled messages, JSON lines of {text, scam}")
+    ap.add_argument("--out", default=MODEL_FILE)
+    ap.add_argument("--steps", type=int, default=300)
+    ap.add_argument("--all", action="store_true", help="train on the held-out sessions too")
+    args = ap.parse_args()
+
+    examples = load_examples(args.db, args.labels)
+    train_set = examples if args.all else split(examples)[0]
+    if not train_set or len({y for _, _, y in train_set}) < 2:
+        raise SystemExit(f"❌ Need scam and non-scam messages to train; found {len(train_set)} messages")
+    start = time.perf_counter()
+    model = train([t for _, t, _ in train_set], [y for _, _, y in train_set], steps=args.steps)
+    model.save(args.out)
+    scams = sum(y for _, _, y in train_set)
+    print(f"✅ {args.out}: trained on {len(train_set)} messages ({scams} scam) in {time.perf_counter() - start:.1f}s"
+          + ("" if args.all else f"; {len(examples) - len(train_set)} held out for bench_classifier.py"))
@@ -0,0 +1,108 @@
+# context.py
+# Bounded rolling conversation context for the LLM scam check (main.confirm_scam).
+# Each session keeps a token-budgeted sliding window of recent turns plus a
+# compact summary of everything that fell out of it. Contexts are cached
+# between turns and only fetch messages newer than the last rowid they saw,
+# so prompt size and per-turn DB work stay flat however long the scammer talks.
+import os
+from collections import Counter, OrderedDict, deque
+import archive
+import textengine
+
+TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "600"))
+COLD_LOAD = 40        # rows fetched when a context is (re)built from SQLite
+MAX_NOTES = 6         # evidence values remembered in the summary
+
+def estimate_tokens(text):
+    # ~4 characters per token is close enough for budgeting
+    return len(text) // 4 + 1
+
+class ConversationContext:
+    def __init__(self, token_budget=TOKEN_BUDGET):
+        self.token_budget = token_budget
+        self.window = deque()       # (sender, text, tokens)
+        self.tokens = 0
+        self.last_id = 0
+        # --- the running summary of older turns ---
+        self.older = 0
+        self.intents = Counter()
+        self.notes = []
+
+    def add(self, rowid, sender, text):
+        if rowid <= self.last_id: return   # already seen (overlapping refreshes)
+        self.last_id = rowid
+        tokens = estimate_tokens(text)
+        self.window.append((sender, text, tokens))
+        self.tokens += tokens
+        # Always keep the newest message, even if it alone is over budget
+        while self.tokens > self.token_budget and len(self.window) > 1:
+            self._fold(*self.window.popleft())
+
+    def _fold(self, sender, text, tokens):
+        self.tokens -= tokens
+        self.older += 1
+        if sender != "scammer": return
+        analysis = textengine.analyze(text)
+        if analysis.intent != "general_confusion": self.intents[analysis.intent] += 1
+        for kind, value in analysis.evidence:
+            if kind != "keyword" and value not in self.notes and len(self.notes) < MAX_NOTES:
+                self.notes.append(value)
+
+    def summary(self):
+        if not self.older: return ""
+        parts = [f"{self.older} earlier messages"]
+        if self.intents:
+            parts.append("scammer kept pushing " + ", ".join(i for i, _ in self.intents.most_common(3)))
+        if self.notes:
+            parts.append("they shared " + ", ".join(self.notes))
+        return "; ".join(parts) + "."
+
+    def history(self):
+        """[{sender, text}] for the prompt: the summary first, then the window."""
+        out = [{"sender": "earlier", "text": self.summary()}] if self.older else []
+        out += [{"sender": s, "text": t} for s, t, _ in self.window]
+        return out
+
+def _fetch_new(conn, sid, last_id):
+    return conn.execute("SELECT id, role, message FROM messages WHERE session_id=? AND id>? ORDER BY id",
+                        (sid, last_id)).fetchall()
+
+def _fetch_cold(conn, sid):
+    # Only the tail; everything older is just counted into the summary
+    rows = conn.execute("SELECT id, role, message FROM messages WHERE session_id=? ORDER BY id DESC LIMIT ?",
+                        (sid, COLD_LOAD)).fetchall()
+    older = 0
+    if len(rows) == COLD_LOAD:
+        older = conn.execute("SELECT COUNT(*) FROM messages WHERE session_id=? AND id<?", (sid, rows[-1][0])).fetchone()[0]
+        older += conn.execute("SELECT COALESCE(SUM(messages), 0) FROM archive_index WHERE session_id=?", (sid,)).fetchone()[0]
+    else:
+        # Not enough hot rows: top the tail up from the archive (see archive.py)
+        archived = [(i, role, message) for i, role, message, _ in archive.load_messages(conn, sid)]
+        need = COLD_LOAD - len(rows)
+        older = max(0, len(archived) - need)
+        rows += archived[older:][::-1]
+    return rows[::-1], older
+
+class ContextStore:
+    """LRU of per-session contexts, refreshed incrementally from SQLite."""
+    def __init__(self, storage, max_sessions=2000, token_budget=TOKEN_BUDGET):
+        self.storage = storage
+        self.max_sessions = max_sessions
+        self.token_budget = token_budget
+        self._items = OrderedDict()
+
+    async def get(self, sid):
+        ctx = self._items.get(sid)
+        if ctx is None:
+            ctx = ConversationContext(self.token_budget)
+            rows, ctx.older = await self.storage.shard(sid).read(_fetch_cold, sid)
+        else:
+            rows = await self.storage.shard(sid).read(_fetch_new, sid, ctx.last_id)
+        for rowid, sender, text in rows:
+            ctx.add(rowid, sender, text)
+
+        self._items[sid] = ctx
+        self._items.move_to_end(sid)
+        while len(self._items) > self.max_sessions:
+            self._items.popitem(last=False)
+        return ctx
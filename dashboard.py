@@ -3,7 +3,11 @@ import streamlit as st
 import database
 import pandas as pd
 import time
+import os
 import logic
+import textengine
+from dashboard_data import DashboardData
+from events import LiveFeed
 
 st.set_page_config(page_title="🛡️ SENTINEL NODE", layout="wide", page_icon="🛡️")
 
@@ -34,15 +38,76 @@ with st.sidebar:
     if st.button("🔄 Refresh Feed"):
         st.rerun()
 
+# --- DATA LAYER ---
+# One long-lived read connection; reads are cached until the API commits, totals refresh on a timer (see dashboard_data.py)
+@st.cache_resource
+def get_data():
+    database.init_db()
+    return DashboardData(database.PATHS)
+
+# New messages and evidence are pushed by the API over SSE (see events.py); SQLite is only
+# read to catch up when the stream can't vouch for what happened (first view, reconnects)
+API_URL = os.environ.get("SENTINEL_API_URL", "http://localhost:8000")
+
+@st.cache_resource
+def get_feed():
+    return LiveFeed(API_URL.rstrip("/") + "/events")
+
+PAGE_SIZE = 50
+
+def load_chat(data, feed, sid):
+    # Keep the rendered chat and intel in session_state and only add what we haven't shown yet
+    chat = st.session_state.get("chat")
+    if not chat or chat["sid"] != sid:
+        chat = {"sid": sid, "last_id": 0, "rows": [], "intel": {}, "cursor": None}
+    events = feed.since(sid, chat["cursor"])
+    if events is None:
+        cursor = feed.cursor()   # before the reads, so nothing falls in between
+        new_rows = data.messages_since(sid, chat["last_id"])
+        chat["intel"] = {key: list(values) for key, values in data.intel(sid).items()}
+        chat["cursor"] = cursor
+    else:
+        new_rows = []
+        for event_id, kind, event in events:
+            if kind == "message" and event["id"] > chat["last_id"]:
+                new_rows.append((event["id"], event["role"], event["message"], event["timestamp"]))
+            elif kind == "evidence":
+                values = chat["intel"].setdefault(textengine.LABEL_TO_INTEL.get(event["type"], event["type"]), [])
+                if event["value"] not in values: values.append(event["value"])
+            chat["cursor"] = event_id
+    if new_rows:
+        chat["rows"].extend(new_rows)
+        chat["last_id"] = new_rows[-1][0]
+    st.session_state["chat"] = chat
+    return chat
+
+def live_intercepts(data, feed, sid):
+    chat = load_chat(data, feed, sid)
+    st.caption("🟢 live" if feed.connected else "⚪ offline - showing the database, use Refresh Feed")
+
+    # Chat Log
+    for _, sender, text, _ in chat["rows"]:
+        if sender == 'scammer':
+            st.error(f"👹 {text}")
+        else:
+            st.success(f"🤖 {text}")
+
+    # Intel Box
+    st.warning("🧠 Extracted Intelligence")
+    st.json(chat["intel"])
+
 # --- MAIN DASHBOARD ---
 try:
-    df = database.get_all_sessions_df()
+    data = get_data()
+    feed = get_feed()
+    metrics = data.metrics()
     
-    # Top Metrics
+    # Top Metrics (computed in SQL)
     col1, col2, col3 = st.columns(3)
-    col1.metric("Active Threads", len(df))
-    col2.metric("Scam Detection Rate", "99.2%")
-    col3.metric("Intel Extracted", "High")
+    col1.metric("Active Threads", metrics["sessions"])
+    rate = metrics["detectionRate"]
+    col2.metric("Scam Detection Rate", f"{rate:.1%}" if rate is not None else "-")
+    col3.metric("Intel Extracted", metrics["hardEvidence"], f"{metrics['sessionsWithIntel']} sessions")
     
     st.markdown("---")
     
@@ -51,26 +116,32 @@ try:
     
     with c1:
         st.subheader("🎭 Active Personas")
-        if not df.empty:
-            st.bar_chart(df['persona_id'].value_counts())
+        personas = data.persona_counts()
+        if personas:
+            st.bar_chart(pd.Series(personas))
             
     with c2:
         st.subheader("📡 Live Intercepts")
-        if not df.empty:
-            sids = df['session_id'].unique()
+        if metrics["sessions"]:
+            pages = (metrics["sessions"] - 1) // PAGE_SIZE + 1
+            page = st.number_input("Page", min_value=1, max_value=pages, value=1) - 1
+            sids = [row[0] for row in data.sessions_page(page, PAGE_SIZE)]
             selected = st.selectbox("Select Threat Channel", sids)
-            
-            # Chat Log
-            msgs = database.get_messages_df(selected)
-            for _, row in msgs.iterrows():
-                if row['sender'] == 'scammer':
-                    st.error(f"👹 {row['text']}")
-                else:
-                    st.success(f"🤖 {row['text']}")
-            
-            # Intel Box
-            st.warning("🧠 Extracted Intelligence")
-            st.json(database.get_intel_raw(selected))
+
+            # Re-rendered on its own every 2s while the stream is up; no table reads
+            st.fragment(live_intercepts, run_every=2 if feed.connected else None)(data, feed, selected)
+            for value, n in data.linked(selected):
+                st.caption(f"🔗 {value} also seen in {n} other session{'s' if n > 1 else ''}")
+
+    # Campaigns: sessions linked by a shared UPI ID / phone / account / link
+    found = data.campaigns()
+    if found:
+        st.markdown("---")
+        st.subheader(f"🕸️ Linked Campaigns ({len(found)})")
+        for c in found[:10]:
+            with st.expander(f"{len(c['sessions'])} sessions · {', '.join(c['identifiers'][:3])}"):
+                st.write(f"First seen {c['firstSeen']} · last seen {c['lastSeen']}")
+                st.write(c["sessions"])
 
 except Exception as e:
     st.info("System Standing By... Waiting for Hostile Traffic.")
\ No newline at end of file
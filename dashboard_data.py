@@ -0,0 +1,167 @@
+# dashboard_data.py
+# Read-side data layer for the Streamlit war room.
+# - One read-only connection per shard, kept for the life of the dashboard process.
+# - Per-session reads and session pages are cached and only recomputed when
+#   PRAGMA data_version says another connection (the API) has committed
+#   something since. Under load the API commits all the time, so the whole-table
+#   aggregates run on a timer instead: metrics and persona counts at most every
+#   AGGREGATE_REFRESH seconds, campaigns (the whole evidence index) every
+#   CAMPAIGN_REFRESH seconds.
+# - Session lists are paginated; chat logs are fetched incrementally by rowid.
+# - Aggregates and session lists fan out over every shard and are merged here;
+#   per-session queries go straight to the shard that owns the session.
+# - Sessions moved to the archive (see archive.py) are read back transparently.
+# - Every query is parameterized.
+import heapq
+import os
+import sqlite3
+import threading
+import time
+import archive
+import campaigns
+import shards
+import textengine
+
+DB_NAME = "honeypot.db"
+AGGREGATE_REFRESH = float(os.environ.get("AGGREGATE_REFRESH", "5"))  # seconds
+CAMPAIGN_REFRESH = float(os.environ.get("CAMPAIGN_REFRESH", "60"))   # seconds
+
+class DashboardData:
+    def __init__(self, paths=None, aggregate_refresh=AGGREGATE_REFRESH, campaign_refresh=CAMPAIGN_REFRESH):
+        paths = paths or shards.shard_paths(DB_NAME)
+        self.paths = [paths] if isinstance(paths, str) else list(paths)
+        self.ring = shards.HashRing(self.paths)
+        self.conns = {}
+        for path in self.paths:
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute("PRAGMA query_only=1")
+            self.conns[path] = conn
+        self._lock = threading.Lock()   # Streamlit reruns can overlap
+        self._version = None
+        self._cache = {}
+        self.aggregate_refresh = aggregate_refresh
+        self.campaign_refresh = campaign_refresh
+        self._timed = {}                # key -> (monotonic time, value) of the timer-refreshed aggregates
+        self.hits = 0
+        self.misses = 0
+
+    def _query(self, sql, params=(), path=None):
+        with self._lock:
+            return self.conns[path or self.paths[0]].execute(sql, params).fetchall()
+
+    def _query_all(self, sql, params=()):
+        """One result list per shard."""
+        return [self._query(sql, params, path) for path in self.paths]
+
+    def _cached(self, key, compute):
+        # data_version only changes when ANOTHER connection commits
+        version = tuple(rows[0][0] for rows in self._query_all("PRAGMA data_version"))
+        if version != self._version:
+            self._version = version
+            self._cache.clear()
+        if key not in self._cache:
+            self.misses += 1
+            self._cache[key] = compute()
+        else:
+            self.hits += 1
+        return self._cache[key]
+
+    def _every(self, key, seconds, compute):
+        # Whole-table reads: at most once per `seconds`, however often the API commits
+        done = self._timed.get(key)
+        if done is None or time.monotonic() - done[0] >= seconds:
+            self.misses += 1
+            done = self._timed[key] = (time.monotonic(), compute())
+        else:
+            self.hits += 1
+        return done[1]
+
+    # --- 1. AGGREGATES (on a timer) ---
+    def metrics(self):
+        def compute():
+            sessions = scams = evidence = hard = with_intel = 0
+            for path in self.paths:
+                s, sc = self._query("SELECT COUNT(*), COALESCE(SUM(is_scam), 0) FROM sessions", path=path)[0]
+                e, h = self._query(
+                    "SELECT COUNT(*), COALESCE(SUM(type != ?), 0) FROM evidence", ("Suspicious Keyword",), path)[0]
+                # Archived evidence only survives as counts in archive_index
+                ae, ah = self._query("SELECT COALESCE(SUM(evidence), 0), COALESCE(SUM(hard_evidence), 0) "
+                                     "FROM archive_index", path=path)[0]
+                e, h = e + ae, h + ah
+                # A session lives on one shard, so per-shard distinct counts add up
+                w = self._query(
+                    "SELECT COUNT(*) FROM (SELECT session_id FROM evidence WHERE type != ? "
+                    "UNION SELECT session_id FROM archive_index WHERE hard_evidence > 0)", ("Suspicious Keyword",), path)[0][0]
+                sessions, scams, evidence, hard, with_intel = sessions + s, scams + sc, evidence + e, hard + h, with_intel + w
+            return {
+                "sessions": sessions,
+                "detectionRate": scams / sessions if sessions else None,
+                "evidence": evidence,
+                "hardEvidence": hard,              # UPI IDs, phones, accounts, links
+                "sessionsWithIntel": with_intel,
+            }
+        return self._every("metrics", self.aggregate_refresh, compute)
+
+    def persona_counts(self):
+        def compute():
+            counts = {}
+            for rows in self._query_all("SELECT COALESCE(persona, 'unknown'), COUNT(*) FROM sessions GROUP BY persona"):
+                for persona, n in rows: counts[persona] = counts.get(persona, 0) + n
+            return dict(sorted(counts.items(), key=lambda kv: -kv[1]))
+        return self._every("personas", self.aggregate_refresh, compute)
+
+    def sessions_page(self, page=0, page_size=50):
+        """[(session_id, persona, last_intent, start_time)] newest first."""
+        def compute():
+            # Each shard returns its own newest rows (idx_sessions_start, no sort); merging them gives the global page
+            end = (page + 1) * page_size
+            parts = self._query_all(
+                "SELECT id, persona, last_intent, start_time FROM sessions ORDER BY start_time DESC, rowid DESC LIMIT ?",
+                (end,))
+            merged = heapq.merge(*parts, key=lambda row: row[3] or "", reverse=True)
+            return list(merged)[page * page_size:end]
+        return self._cached(("sessions", page, page_size), compute)
+
+    # --- 2. PER-SESSION (incremental) ---
+    def messages_since(self, session_id, after_id=0, limit=500):
+        """[(id, role, message, timestamp)] newer than after_id, oldest first."""
+        path = self.ring.node_for(session_id)
+        # Ids survive archiving and always grow, so archived rows simply come first
+        rows = [r for r in self._call(path, archive.load_messages, session_id) if r[0] > after_id][:limit]
+        return rows + self._query(
+            "SELECT id, role, message, timestamp FROM messages WHERE session_id=? AND id>? ORDER BY id LIMIT ?",
+            (session_id, after_id, limit - len(rows)), path)
+
+    def intel(self, session_id):
+        return self._cached(("intel", session_id), lambda: self._intel(session_id))
+
+    def _intel(self, session_id):
+        path = self.ring.node_for(session_id)
+        data = {key: [] for key in textengine.INTEL_KEYS.values()}
+        seen = set()
+        for type_, value in self._call(path, archive.load_evidence, session_id) + self._query(
+                "SELECT type, value FROM evidence WHERE session_id=? ORDER BY id", (session_id,), path):
+            if value in seen: continue
+            seen.add(value)
+            data.setdefault(textengine.LABEL_TO_INTEL.get(type_, type_), []).append(value)
+        return data
+
+    def linked(self, session_id):
+        """[(value, other sessions)] for identifiers this session shares with others (index seeks only)."""
+        def compute():
+            keys = self._call(self.ring.node_for(session_id), campaigns.session_keys, session_id)
+            if not keys: return []
+            counts = campaigns.merge_counts(self._call(path, campaigns.other_sessions, list(keys), session_id)
+                                            for path in self.paths)
+            return campaigns.also_seen(keys, counts)
+        return self._cached(("linked", session_id), compute)
+
+    # --- 3. CAMPAIGNS (whole index, refreshed on a timer) ---
+    def campaigns(self, min_sessions=2):
+        return self._every(("campaigns", min_sessions), self.campaign_refresh, lambda: campaigns.campaigns(
+            [self._call(path, campaigns.edges) for path in self.paths], min_sessions))
+
+    def _call(self, path, fn, *args):
+        # fn(conn, *args) from archive.py / campaigns.py on one shard's connection
+        with self._lock:
+            return fn(self.conns[path], *args)
@@ -1,95 +1,107 @@
 # database.py
 import sqlite3
-import json
-import pandas as pd
+import threading
+from datetime import datetime
+import archive
+import campaigns
+import schema
+import shards
+import textengine
 
 DB_NAME = "honeypot.db"
+# Same shard layout and session routing as the API (see shards.py)
+PATHS = shards.shard_paths(DB_NAME)
+_ring = shards.HashRing(PATHS)
+
+_init_lock = threading.Lock()
+_initialized = False
 
 def init_db():
-    conn = sqlite3.connect(DB_NAME, check_same_thread=False)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS sessions 
-                 (session_id TEXT PRIMARY KEY, is_scam BOOLEAN, msg_count INTEGER, persona_id TEXT)''')
-    c.execute('''CREATE TABLE IF NOT EXISTS messages 
-                 (session_id TEXT, sender TEXT, text TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-    c.execute('''CREATE TABLE IF NOT EXISTS intelligence 
-                 (session_id TEXT PRIMARY KEY, data TEXT)''')
-    conn.commit()
-    conn.close()
+    # Same versioned schema as the API (see schema.py). Runs once, on first use
+    # rather than on import, so importing this module stays cheap
+    global _initialized
+    with _init_lock:
+        if _initialized: return
+        for path in PATHS:
+            schema.migrate(path)
+        _initialized = True
+
+# One connection per thread and shard, opened once and reused (instead of reconnecting per call)
+_local = threading.local()
 
-# Init on load
-init_db()
+def _conn(session_id=None, path=None):
+    path = path or _ring.node_for(session_id)
+    conns = _local.__dict__.setdefault("conns", {})
+    if path not in conns:
+        init_db()
+        conns[path] = sqlite3.connect(path, check_same_thread=False)
+    return conns[path]
 
 # --- CORE FUNCTIONS ---
 def create_session(session_id, persona_id):
-    conn = sqlite3.connect(DB_NAME, check_same_thread=False)
-    c = conn.cursor()
-    c.execute("INSERT OR IGNORE INTO sessions VALUES (?, ?, ?, ?)", (session_id, False, 0, persona_id))
-    empty_intel = json.dumps({"bankAccounts": [], "upiIds": [], "phishingLinks": [], "phoneNumbers": [], "suspiciousKeywords": []})
-    c.execute("INSERT OR IGNORE INTO intelligence VALUES (?, ?)", (session_id, empty_intel))
+    conn = _conn(session_id)
+    conn.execute("INSERT OR IGNORE INTO sessions (id, persona) VALUES (?, ?)", (session_id, persona_id))
     conn.commit()
-    conn.close()
 
 def get_session(session_id):
-    conn = sqlite3.connect(DB_NAME, check_same_thread=False)
-    c = conn.cursor()
-    c.execute("SELECT * FROM sessions WHERE session_id=?", (session_id,))
-    row = c.fetchone()
-    conn.close()
+    conn = _conn(session_id)
+    row = conn.execute("SELECT id, is_scam, persona FROM sessions WHERE id=?", (session_id,)).fetchone()
     if row:
-        return {"session_id": row[0], "is_scam": row[1], "msg_count": row[2], "persona_id": row[3]}
+        msg_count = conn.execute("SELECT COUNT(*) FROM messages WHERE session_id=?", (session_id,)).fetchone()[0]
+        msg_count += conn.execute("SELECT COALESCE(SUM(messages), 0) FROM archive_index WHERE session_id=?",
+                                  (session_id,)).fetchone()[0]
+        return {"session_id": row[0], "is_scam": row[1], "msg_count": msg_count, "persona_id": row[2]}
     return None
 
 def save_message(session_id, sender, text):
-    conn = sqlite3.connect(DB_NAME, check_same_thread=False)
-    c = conn.cursor()
-    c.execute("INSERT INTO messages (session_id, sender, text) VALUES (?, ?, ?)", (session_id, sender, text))
+    conn = _conn(session_id)
+    conn.execute("INSERT INTO messages (session_id, role, message) VALUES (?, ?, ?)", (session_id, sender, text))
     conn.commit()
-    conn.close()
 
 def get_history(session_id):
-    conn = sqlite3.connect(DB_NAME, check_same_thread=False)
-    c = conn.cursor()
-    c.execute("SELECT sender, text FROM messages WHERE session_id=?", (session_id,))
-    rows = c.fetchall()
-    conn.close()
+    conn = _conn(session_id)
+    # Archived turns (see archive.py) come first, then the hot ones
+    rows = [(r[1], r[2]) for r in archive.load_messages(conn, session_id)]
+    rows += conn.execute("SELECT role, message FROM messages WHERE session_id=? ORDER BY id", (session_id,)).fetchall()
     return [{"sender": r[0], "text": r[1]} for r in rows]
 
 def update_intel(session_id, new_data):
-    conn = sqlite3.connect(DB_NAME, check_same_thread=False)
-    c = conn.cursor()
-    c.execute("SELECT data FROM intelligence WHERE session_id=?", (session_id,))
-    row = c.fetchone()
-    current_data = json.loads(row[0]) if row else {}
-    
-    # Merge unique data
-    for key, val in new_data.items():
-        existing = set(current_data.get(key, []))
-        existing.update(val)
-        current_data[key] = list(existing)
-        
-    c.execute("UPDATE intelligence SET data=? WHERE session_id=?", (json.dumps(current_data), session_id))
+    # Append-only evidence rows; UNIQUE(session_id, value) drops duplicates
+    conn = _conn(session_id)
+    rows = [(textengine.INTEL_TO_LABEL.get(key, key), value) for key, values in new_data.items() for value in values]
+    conn.executemany("INSERT OR IGNORE INTO evidence (session_id, type, value) VALUES (?, ?, ?)",
+                     [(session_id, type_, value) for type_, value in rows])
+    conn.executemany(campaigns.UPSERT, campaigns.index_rows(session_id, rows, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
     conn.commit()
-    conn.close()
-    return current_data
+    return get_intel_raw(session_id)
 
 # --- FOR DASHBOARD ---
 def get_all_sessions_df():
-    conn = sqlite3.connect(DB_NAME, check_same_thread=False)
-    df = pd.read_sql_query("SELECT * FROM sessions", conn)
-    conn.close()
+    import pandas as pd   # only the DataFrame helpers need it, and it is the slowest import here
+    # Fan out over every shard
+    df = pd.concat([pd.read_sql_query("SELECT id AS session_id, is_scam, persona AS persona_id, last_intent, start_time "
+                                      "FROM sessions", _conn(path=path)) for path in PATHS], ignore_index=True)
     return df
 
 def get_messages_df(session_id):
-    conn = sqlite3.connect(DB_NAME, check_same_thread=False)
-    df = pd.read_sql_query(f"SELECT * FROM messages WHERE session_id='{session_id}'", conn)
-    conn.close()
+    import pandas as pd
+    conn = _conn(session_id)
+    df = pd.read_sql_query("SELECT session_id, role AS sender, message AS text, timestamp FROM messages "
+                           "WHERE session_id=? ORDER BY id", conn, params=(session_id,))
+    archived = archive.load_messages(conn, session_id)
+    if archived:
+        old = pd.DataFrame([(session_id, r, m, t) for _, r, m, t in archived], columns=df.columns)
+        df = pd.concat([old, df], ignore_index=True)
     return df
 
 def get_intel_raw(session_id):
-    conn = sqlite3.connect(DB_NAME, check_same_thread=False)
-    c = conn.cursor()
-    c.execute("SELECT data FROM intelligence WHERE session_id=?", (session_id,))
-    row = c.fetchone()
-    conn.close()
-    return json.loads(row[0]) if row else {}
\ No newline at end of file
+    conn = _conn(session_id)
+    data = {key: [] for key in textengine.INTEL_KEYS.values()}
+    rows = archive.load_evidence(conn, session_id)
+    rows += conn.execute("SELECT type, value FROM evidence WHERE session_id=? ORDER BY id", (session_id,)).fetchall()
+    seen = set()
+    for type_, value in rows:
+        if value in seen: continue
+        seen.add(value)
+        data.setdefault(textengine.LABEL_TO_INTEL.get(type_, type_), []).append(value)
+    return data
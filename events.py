@@ -0,0 +1,212 @@
+# events.py
+# Live intercept stream: in-process pub/sub, served as Server-Sent Events at /events.
+# - The API publishes every logged message and every new piece of evidence once
+#   it is committed, so a subscriber never sees something the database doesn't have.
+# - The last EVENT_BUFFER events are kept for replay: a client reconnecting with
+#   Last-Event-ID gets exactly what it missed. If that is no longer buffered (or
+#   the server restarted) it gets a "reset" event and reloads from SQLite.
+# - Subscribers can filter on one session. A subscriber that falls too far
+#   behind is disconnected and resumes from the buffer instead of growing a queue.
+# - One bus per process: with `uvicorn --workers N`, a stream only carries the
+#   traffic of the worker that serves it.
+# - A stream never ends by itself. uvicorn waits for open responses before the
+#   lifespan shutdown, so run it with --timeout-graceful-shutdown; close() (from
+#   the lifespan) then wakes every subscriber that is still there.
+# - LiveFeed is the client side, used by the dashboard.
+import asyncio
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+logger = logging.getLogger("uvicorn")
+
+BUFFER = int(os.environ.get("EVENT_BUFFER", "5000"))
+SUBSCRIBER_QUEUE = 1000   # events waiting for a slow client before it is cut off
+HEARTBEAT = 15            # seconds between keep-alive comments on an idle stream
+RETRY_MS = 2000           # reconnect delay advertised to EventSource clients
+
+class Event:
+    __slots__ = ("id", "kind", "session_id", "data")
+
+    def __init__(self, id, kind, session_id, data):
+        self.id = id
+        self.kind = kind
+        self.session_id = session_id
+        self.data = data
+
+    def sse(self):
+        data = json.dumps({"sessionId": self.session_id, **self.data})
+        return f"id: {self.id}\nevent: {self.kind}\ndata: {data}\n\n"
+
+# --- 1. THE BUS ---
+class _Subscription:
+    __slots__ = ("session_id", "queue", "closed")
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.queue = asyncio.Queue()
+        self.closed = False
+
+    def offer(self, event):
+        if self.closed or (self.session_id and event.session_id != self.session_id): return True
+        if self.queue.qsize() >= SUBSCRIBER_QUEUE:
+            self.close()
+            return False
+        self.queue.put_nowait(event)
+        return True
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.queue.put_nowait(None)
+
+class EventBus:
+    def __init__(self, buffer=BUFFER):
+        # Ids start from the clock, so they keep growing across restarts and an
+        # old Last-Event-ID is recognized as a gap rather than replayed wrongly
+        self.last_id = time.time_ns() // 1000
+        self._ids = itertools.count(self.last_id + 1)
+        self._buffer = deque(maxlen=buffer)
+        self._subs = set()
+        self.published = 0
+        self.lagged = 0
+
+    def publish(self, kind, session_id, **data):
+        event = Event(next(self._ids), kind, session_id, data)
+        self.last_id = event.id
+        self._buffer.append(event)
+        self.published += 1
+        for sub in list(self._subs):
+            if not sub.offer(event):
+                self._subs.discard(sub)
+                self.lagged += 1
+        return event
+
+    def replay(self, after_id, session_id=None):
+        """(buffered events after after_id, complete). complete is False if some were already evicted."""
+        if after_id >= self.last_id: return [], after_id == self.last_id
+        complete = bool(self._buffer) and self._buffer[0].id <= after_id + 1
+        return [e for e in self._buffer if e.id > after_id and (not session_id or e.session_id == session_id)], complete
+
+    async def stream(self, session_id=None, after_id=None, disconnected=None):
+        """SSE text for one client: missed events (or a reset), then live ones until it goes away."""
+        sub = _Subscription(session_id)
+        self._subs.add(sub)   # before the replay, so nothing falls in between
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            events, complete = self.replay(after_id, session_id) if after_id is not None else ([], False)
+            if not complete:
+                # Continuity from here on; anything older has to come from the database
+                events = []
+                yield Event(self.last_id, "reset", session_id, {}).sse()
+            last = self.last_id if not complete else after_id
+            for event in events:
+                yield event.sse()
+                last = event.id
+            while True:
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), HEARTBEAT)
+                except asyncio.TimeoutError:
+                    if disconnected and await disconnected(): return
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None: return   # lagged or shutting down; the client resumes from the buffer
+                if event.id <= last: continue
+                yield event.sse()
+        finally:
+            self._subs.discard(sub)
+
+    def close(self):
+        """End every open stream; clients reconnect (to another process) with Last-Event-ID."""
+        for sub in list(self._subs): sub.close()
+        self._subs.clear()
+
+    def stats(self):
+        return {"subscribers": len(self._subs), "published": self.published, "buffered": len(self._buffer),
+                "lastId": self.last_id, "lagged": self.lagged}
+
+# --- 2. THE CLIENT (dashboard side) ---
+def parse_sse(lines):
+    """(id, event, data) per SSE message from an iterable of decoded lines."""
+    id_, kind, data = None, "message", []
+    for line in lines:
+        if not line:
+            if data: yield id_, kind, "\n".join(data)
+            id_, kind, data = None, "message", []
+        elif line.startswith(":"):
+            continue
+        else:
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "id": id_ = int(value)
+            elif field == "event": kind = value
+            elif field == "data": data.append(value)
+
+class LiveFeed:
+    """Follows /events on a background thread and keeps the recent events of the most active sessions."""
+
+    def __init__(self, url, per_session=500, max_sessions=1000):
+        self.url = url
+        self.per_session = per_session
+        self.max_sessions = max_sessions
+        self.connected = False
+        self.last_id = None
+        self.continuous_since = None   # events after this id have all been received
+        self._events = OrderedDict()   # session_id -> deque of (id, kind, data), least recently active first
+        self._evicted = {}             # session_id -> newest id pushed out of its deque
+        self._forgotten = 0            # newest id of any session dropped whole to stay under max_sessions
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        import requests
+        while True:
+            try:
+                headers = {"Accept": "text/event-stream"}
+                if self.last_id is not None: headers["Last-Event-ID"] = str(self.last_id)
+                with requests.get(self.url, headers=headers, stream=True, timeout=(3, HEARTBEAT * 2)) as resp:
+                    resp.raise_for_status()
+                    self.connected = True
+                    for id_, kind, data in parse_sse(resp.iter_lines(decode_unicode=True)):
+                        self._apply(id_, kind, json.loads(data))
+            except Exception as e:
+                if self.connected: logger.warning(f"LiveFeed: {self.url} dropped: {e}")
+            self.connected = False
+            time.sleep(RETRY_MS / 1000)
+
+    def _apply(self, id_, kind, data):
+        with self._lock:
+            if kind == "reset":
+                self.continuous_since = id_
+            else:
+                sid = data.get("sessionId")
+                events = self._events.get(sid)
+                if events is None:
+                    # It may be a session dropped earlier: what it had before is gone
+                    events = self._events[sid] = deque(maxlen=self.per_session)
+                    if self._forgotten: self._evicted[sid] = self._forgotten
+                    while len(self._events) > self.max_sessions:
+                        old, dropped = self._events.popitem(last=False)
+                        self._evicted.pop(old, None)
+                        if dropped: self._forgotten = max(self._forgotten, dropped[-1][0])
+                else:
+                    self._events.move_to_end(sid)
+                if len(events) == events.maxlen: self._evicted[sid] = events[0][0]
+                events.append((id_, kind, data))
+            self.last_id = id_
+
+    def cursor(self):
+        """Current position; take it BEFORE reading the database, then follow with since()."""
+        return self.last_id
+
+    def since(self, session_id, cursor):
+        """Events of session_id after cursor, or None if the feed can't vouch for them (reload from the DB)."""
+        with self._lock:
+            if not self.connected or cursor is None or self.continuous_since is None: return None
+            evicted = self._evicted.get(session_id, 0 if session_id in self._events else self._forgotten)
+            if cursor < max(self.continuous_since, evicted): return None
+            return [e for e in self._events.get(session_id, ()) if e[0] > cursor]
@@ -0,0 +1,159 @@
+# llm.py
+# Process-wide async LLM client.
+# - ONE backend client, built on first use and reused by every call. Building the
+#   Gemini one imports google-genai (slow), so the event loop only ever builds it
+#   in a thread (get_llm_async, or the startup prewarm) and checks configured().
+# - A semaphore caps concurrent LLM calls; waiting for a slot counts against the deadline.
+# - generate() never raises: on timeout/error it returns None so callers can fall back.
+# - Per-call latency, timeout and error counts for the stats endpoint.
+#
+# SENTINEL_LLM_BACKEND=gemini (default, needs GEMINI_API_KEY) | fake (local, no network) | off
+import asyncio
+import itertools
+import logging
+import os
+import threading
+import time
+import metrics
+
+logger = logging.getLogger("uvicorn")
+
+# --- CONFIGURATION ---
+BACKEND = os.environ.get("SENTINEL_LLM_BACKEND", "gemini")
+API_KEY = os.environ.get("GEMINI_API_KEY")
+MODEL = os.environ.get("GEMINI_MODEL", "gemini-2.5-flash")
+BUDGET = float(os.environ.get("LLM_BUDGET", "1.5"))             # seconds per request
+MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "16"))
+FAKE_LATENCY = float(os.environ.get("FAKE_LLM_LATENCY", "0.05"))
+
+# --- 1. BACKENDS ---
+class GeminiBackend:
+    def __init__(self, api_key, model=MODEL):
+        # Imported here so the fake backend works without google-genai installed
+        from google import genai
+        self.client = genai.Client(api_key=api_key)
+        self.model = model
+
+    async def generate(self, prompt):
+        response = await self.client.aio.models.generate_content(model=self.model, contents=prompt)
+        return response.text
+
+class FakeBackend:
+    """Local stand-in for tests and benchmarks: answers after `latency` seconds.
+    Pass handler(prompt) -> str to script the answers."""
+    def __init__(self, latency=FAKE_LATENCY, handler=None):
+        self.latency = latency
+        self.handler = handler or _fake_answer
+        self.calls = 0
+
+    async def generate(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return self.handler(prompt)
+
+_fake_ids = itertools.count(1)
+
+def _fake_answer(prompt):
+    if prompt.startswith("Analyze intent"):
+        # Only the quoted conversation; the instructions themselves say "urgent"
+        text = prompt.split("If scam/phishing")[0].lower()
+        return "SCAM" if any(w in text for w in ("otp", "block", "pay", "police", "urgent")) else "SAFE"
+    if "different short replies" in prompt:
+        return "\n".join(f"Oh dear, which button is that? ({next(_fake_ids)})" for _ in range(8))
+    return "Oh dear, can you explain that again slowly?"
+
+# --- 2. THE SHARED CLIENT ---
+class LLMClient:
+    def __init__(self, backend, max_concurrency=MAX_CONCURRENCY, budget=BUDGET):
+        self.backend = backend
+        self.budget = budget
+        self.max_concurrency = max_concurrency
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.calls = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.in_flight = 0
+        self._latency_ms = []   # recent successful call latencies (ring of 1000)
+
+    async def _call(self, prompt):
+        async with self._slots:
+            self.in_flight += 1
+            try:
+                return await self.backend.generate(prompt)
+            finally:
+                self.in_flight -= 1
+
+    async def generate(self, prompt, timeout=None):
+        """Text from the model, or None if it failed or missed the deadline."""
+        self.calls += 1
+        start = time.perf_counter()
+        try:
+            with metrics.stage("llm"):
+                text = await asyncio.wait_for(self._call(prompt), timeout or self.budget)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            metrics.swallowed("llm.timeout")
+            return None
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"LLM call failed: {e}")
+            metrics.swallowed("llm.error")
+            return None
+        self._latency_ms.append((time.perf_counter() - start) * 1000)
+        del self._latency_ms[:-1000]
+        return text
+
+    def stats(self):
+        lat = sorted(self._latency_ms)
+        pct = lambda p: round(lat[min(len(lat) - 1, int(p * len(lat)))], 1) if lat else None
+        return {
+            "backend": type(self.backend).__name__,
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "inFlight": self.in_flight,
+            "latencyMs": {"p50": pct(0.5), "p95": pct(0.95), "max": round(lat[-1], 1) if lat else None},
+        }
+
+_client = None
+_broken = False   # the backend failed to build; not retried on every request and /metrics scrape
+_build_lock = threading.Lock()
+
+def configured():
+    """Whether there is (or will be) a client, without building one."""
+    if _client is not None: return True
+    return not _broken and (BACKEND == "fake" or (BACKEND == "gemini" and bool(API_KEY)))
+
+def current():
+    """The client if it has been built already, else None."""
+    return _client
+
+def get_llm():
+    """The process-wide client, or None if no backend is configured (or it failed to build)."""
+    global _client, _broken
+    if _client is not None: return _client
+    with _build_lock:
+        if _client is not None or _broken: return _client
+        if BACKEND == "fake":
+            _client = LLMClient(FakeBackend())
+        elif BACKEND == "gemini" and API_KEY:
+            try:
+                _client = LLMClient(GeminiBackend(API_KEY))
+            except Exception as e:
+                _broken = True
+                logger.error(f"❌ Connection Error: {e} (LLM disabled until restart)")
+                metrics.swallowed("llm.connect")
+                return None
+        else:
+            return None
+    return _client
+
+async def get_llm_async():
+    """get_llm() for coroutines: the first build runs in a thread, off the event loop."""
+    if _client is None and configured(): await asyncio.to_thread(get_llm)
+    return _client
+
+def set_llm(client):
+    """Swap the process-wide client (tests / benchmarks plug a FakeBackend in here)."""
+    global _client, _broken
+    _client, _broken = client, False
@@ -1,95 +1,92 @@
-import os
-import re
 import random
+import classifier
+import llm
+import metrics
 import personas
-from google import genai
+import simcache
+import textengine
 
 # --- CONFIGURATION ---
-# Try to get key from Environment, otherwise print warning
-API_KEY = os.environ.get("GEMINI_API_KEY")
+# Key, model, latency budget and backend come from the environment (see llm.py)
+API_KEY = llm.API_KEY
 
 # --- HELPER: CONNECT TO GOOGLE ---
-def get_client():
-    if not API_KEY:
+async def get_client():
+    """The process-wide LLM client (built once, off the event loop, and reused by every call)."""
+    client = await llm.get_llm_async()
+    if client is None:
         print("❌ ERROR: API Key is missing.")
-        return None
-    try:
-        return genai.Client(api_key=API_KEY)
-    except Exception as e:
-        print(f"❌ Connection Error: {e}")
-        return None
+    return client
 
 # --- 1. DETECT SCAM ---
-def detect_scam(text: str) -> bool:
-    client = get_client()
-    if not client: return True # Default to scam if API fails
-    
-    try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=f"Analyze intent: '{text}'. If scam/phishing/urgent money, reply SCAM. Else reply SAFE."
-        )
-        return "SCAM" in response.text.upper()
-    except:
-        return True
+# Verdicts of earlier messages; templated variants of one get its answer without a model call (see simcache.py)
+verdicts = simcache.SimCache()
+
+def build_detect_prompt(text, history=None):
+    # history: the bounded conversation before this message (see context.py)
+    chat_log = "\n".join(f"{m['sender']}: {m['text']}" for m in history or [])
+    earlier = f"Earlier in the chat:\n{chat_log}\n" if chat_log else ""
+    return f"Analyze intent: '{text}'.\n{earlier}If scam/phishing/urgent money, reply SCAM. Else reply SAFE."
+
+async def judge(text: str, timeout: float = None, classify: bool = True, history: list = None, cached: bool = True):
+    """(is_scam, source); source is "cache", "classifier", "llm" or "fallback" (no answer, counts as scam).
+    cached=False always asks the model (the audit sample needs its own answer)."""
+    fp = simcache.fingerprint(text)
+    hit = verdicts.get(fp) if cached else None
+    if hit is not None: return hit, "cache"
+    # The local model, when it is sure, saves the round trip (classify=False: the caller already asked it)
+    local = classifier.verdict(text) if classify else None
+    if local is not None: return local, "classifier"
+
+    client = await get_client()
+    if not client: return True, "fallback" # Default to scam if API fails
+
+    answer = await client.generate(build_detect_prompt(text, history), timeout)
+    if answer is None: return True, "fallback"   # not a verdict: not cached
+    verdict = "SCAM" in answer.upper()
+    # A verdict that leaned on earlier turns says nothing about the message on its own
+    if not history: verdicts.put(fp, verdict)
+    return verdict, "llm"
+
+async def detect_scam(text: str, timeout: float = None, classify: bool = True, history: list = None) -> bool:
+    return (await judge(text, timeout, classify, history))[0]
 
 # --- 2. SELECT PERSONA ---
 def select_random_persona():
     try:
         return random.choice(list(personas.CHARACTERS.keys()))
-    except:
+    except Exception:
+        metrics.swallowed("logic.select_persona")
         return "grandma"
 
-# --- 3. GENERATE REPLY (THE MISSING FUNCTION) ---
-def generate_reply(incoming_msg, history, persona_id):
-    """
-    This is the function that was missing! 
-    It generates the actual response text.
-    """
-    client = get_client()
-    
-    # 1. Fallback if API fails
-    if not client: 
-        return "I am having connection issues. Can you repeat that?"
-
-    # 2. Get Character Data
+# --- 3. GENERATE REPLY ---
+# Replies come from the pre-generated pool (replypool.py); the model only writes pool batches
+def build_pool_prompt(persona_id, intent, n):
     char = personas.CHARACTERS.get(persona_id, personas.CHARACTERS.get('grandma', {}))
-    
-    # 3. Format History
-    chat_log = "\n".join([f"{m['sender']}: {m['text']}" for m in history])
-    
-    # 4. Prompt Gemini
-    prompt = f"""
+    situation = intent.replace("_", " ")
+    return f"""
     SYSTEM: You are {char.get('name', 'Mrs. Higgins')}.
     TRAITS: {char.get('style', 'Confused')}
     STRATEGY: {char.get('strategy', 'Waste time')}
-    TASK: Reply to the scammer. Keep it short (1 sentence). Do NOT expose that you are an AI.
-    
-    CHAT LOG:
-    {chat_log}
-    Scammer: {incoming_msg}
-    Reply:
+    TASK: Write {n} different short replies (1 sentence each) to a scammer whose message is a {situation}.
+    One reply per line, no numbering. Do NOT expose that you are an AI.
     """
-    
-    try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt
-        )
-        return response.text.strip()
-    except Exception as e:
-        print(f"❌ AI Gen Error: {e}")
-        return "I am confused. Can you say that again?"
+
+async def generate_pool_replies(persona_id, intent, n, timeout=None):
+    """Up to n ready-made replies for the reply pool ([] if the model failed)."""
+    client = await get_client()
+    if not client: return []
+
+    text = await client.generate(build_pool_prompt(persona_id, intent, n), timeout)
+    if not text: return []
+    replies = []
+    for line in text.splitlines():
+        line = line.strip().lstrip("-*0123456789.) ").strip().strip('"')
+        if line and len(line) <= 200 and line not in replies:
+            replies.append(line)
+    return replies[:n]
 
 # --- 4. EXTRACT INTEL ---
 def extract_intel(text):
-    data = {
-        "upiIds": re.findall(r"[\w\.-]+@[\w\.-]+", text),
-        "phishingLinks": re.findall(r"https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+", text),
-        "phoneNumbers": re.findall(r"(?:\+91|0)?[6-9]\d{9}", text),
-        "bankAccounts": re.findall(r"\b\d{9,18}\b", text),
-        "suspiciousKeywords": []
-    }
-    if "blocked" in text.lower() or "urgent" in text.lower():
-        data["suspiciousKeywords"].append("Urgency")
-    return data
+    # Same single-pass scanner the API uses (textengine.py)
+    return textengine.as_intel(textengine.analyze(text))
@@ -1,18 +1,56 @@
-from fastapi import FastAPI, Request, BackgroundTasks
+import startup   # first, so the profiler's clock covers every import below
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import json
 import logging
-import random
-import re
-import sqlite3
-import requests
+import os
+from collections import namedtuple
 from datetime import datetime
+from admission import Admission, WorkQueue
+from context import ContextStore
+from events import EventBus
+from outbox import Outbox
+from replypool import ReplyPool
+from responses import PARTS, construct_response
+from session_cache import SessionCache
+import campaigns
+import classifier
+import schema
+import shards
+import textengine
+import llm
+import logic
+import metrics
 
 # --- CONFIGURATION ---
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("uvicorn")
+BATCH_MAX = int(os.environ.get("BATCH_MAX_ITEMS", "500"))   # items per /api/batch request
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    global warmup
+    # One-time init, timed per step (see startup.py); nothing here runs at import
+    with startup.step("init_db"): await asyncio.to_thread(init_db)
+    with startup.step("storage"): await storage.start()
+    with startup.step("outbox"): await outbox.start()
+    with startup.step("replies"): await replies.start()
+    with startup.step("work"): await work.start()
+    startup.ready()
+    # Runs once the server is accepting traffic
+    warmup = asyncio.create_task(startup.prewarm(WARMUPS))
+    yield
+    bus.close()   # open /events streams end here (see events.py)
+    await warmup
+    await work.close()
+    await replies.close()
+    await outbox.close()
+    await storage.close()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,142 +64,374 @@ app.add_middleware(
 DB_NAME = "honeypot.db"
 
 def init_db():
-    with sqlite3.connect(DB_NAME) as conn:
-        conn.execute('''CREATE TABLE IF NOT EXISTS sessions 
-                        (id TEXT PRIMARY KEY, persona TEXT, last_intent TEXT, start_time TEXT)''')
-        conn.execute('''CREATE TABLE IF NOT EXISTS messages 
-                        (id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                         session_id TEXT, role TEXT, message TEXT, timestamp TEXT)''')
-        conn.execute('''CREATE TABLE IF NOT EXISTS evidence 
-                        (id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                         session_id TEXT, type TEXT, value TEXT, timestamp TEXT)''')
-init_db()
+    # One versioned schema for the API and the dashboard (see schema.py), on every shard
+    for path in shards.shard_paths(DB_NAME):
+        schema.migrate(path)
+
+# Every write goes through the owning shard's pipeline (see storage.py / shards.py);
+# STORAGE_SHARDS=1 is a single honeypot.db
+storage = shards.open_storage(DB_NAME)
+# Hot session state (persona, counts, evidence) lives here (see session_cache.py)
+sessions = SessionCache(storage)
+# Ready-made persona replies, refilled in the background by the LLM (see replypool.py)
+replies = ReplyPool(use_llm=llm.configured)
+# Token-bounded recent turns + summary per session, for the LLM scam check (see context.py)
+contexts = ContextStore(storage)
+# Rate limits, the bounded background queue and degraded mode (see admission.py)
+admission = Admission()
+work = WorkQueue(admission)
+# Committed messages and evidence, pushed to /events subscribers (see events.py)
+bus = EventBus()
+
+def now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 # --- 2. THE LOCAL NEURAL ENGINE (Context Scoring) ---
+# Keyword weights and the single-pass scanner live in textengine.py
 def analyze_intent(text):
-    text = text.lower()
-    scores = {
-        "police_threat": 0,
-        "account_lock": 0,
-        "money_demand": 0,
-        "otp_demand": 0,
-        "general_confusion": 0
-    }
-    
-    # Weighted Scoring
-    if any(w in text for w in ["police", "jail", "arrest", "court", "lawyer", "case"]): scores["police_threat"] += 5
-    if any(w in text for w in ["block", "lock", "suspend", "close", "deactivate"]): scores["account_lock"] += 5
-    if any(w in text for w in ["money", "transfer", "pay", "rupee", "amount", "charge"]): scores["money_demand"] += 4
-    if any(w in text for w in ["otp", "code", "pin", "verify", "number"]): scores["otp_demand"] += 4
-    if "urgent" in text: 
-        scores["account_lock"] += 2  # Urgency usually implies locking
-        scores["police_threat"] += 1
-
-    # Return the highest scoring intent
-    best_intent = max(scores, key=scores.get)
-    if scores[best_intent] == 0: return "general_confusion"
-    return best_intent
+    return textengine.analyze(text).intent
 
 # --- 3. DYNAMIC SENTENCE BUILDER ---
-# This creates millions of unique responses by combining parts
-PARTS = {
-    "grandma": {
-        "police_threat": [
-            ["Oh my god,", "Beta,", "Ayyo,", "Please,"],
-            ["why police?", "I am just an old lady.", "don't hurt me.", "I am scared of police."],
-            ["I will call my son.", "I am shaking.", "My BP is high.", "I didn't do anything."]
-        ],
-        "account_lock": [
-            ["Oh no,", "Wait,", "But,", "Listen,"],
-            ["why block my account?", "I have money inside.", "don't lock it please.", "I need that account."],
-            ["I need to buy medicine.", "How will I eat?", "I will go to the branch tomorrow.", "Please keep it open."]
-        ],
-        "money_demand": [
-            ["I don't use apps.", "I have no GPay.", "Listen beta,", "I am confused."],
-            ["Can I give cash?", "I have cash at home.", "I can send by post.", "I don't know how to transfer."],
-            ["Is it safe?", "My grandson said no.", "Who are you again?", "The buttons are confusing."]
-        ],
-        "otp_demand": [
-            ["The code?", "You mean the number?", "Wait,", "Let me check."],
-            ["I can't find it.", "Is it the one on the card?", "My glasses are missing.", "It says 'Don't Share'."],
-            ["Should I tell you?", "I am reading it... wait.", "The screen went black.", "7... 5... 2... wait."]
-        ],
-        "general_confusion": [
-            ["Hello?", "Who is this?", "Can you call?", "I can't read this."],
-            ["The text is small.", "My hearing aid is broken.", "Are you the bank?", "I am tired."],
-            ["Speak louder.", "I want to sleep.", "Call my landline.", "I don't understand."]
-        ]
-    }
-}
-
-def construct_response(persona, intent):
-    # Fallback to grandma if persona missing
-    p_data = PARTS.get(persona, PARTS["grandma"])
-    
-    # Get the parts for the intent
-    options = p_data.get(intent, p_data["general_confusion"])
-    
-    # Pick one from Start, Middle, End
-    part1 = random.choice(options[0])
-    part2 = random.choice(options[1])
-    part3 = random.choice(options[2])
-    
-    return f"{part1} {part2} {part3}"
+# PARTS / construct_response live in responses.py; they seed the reply pool
 
 # --- 4. CALLBACK & EXTRACTION ---
-def send_guvi_callback(sid):
+async def build_callback_payload(sid, final=False):
+    evidence_map = { "bankAccounts": [], "upiIds": [], "phishingLinks": [], "phoneNumbers": [], "suspiciousKeywords": [] }
+    # Re-read from SQLite: with several workers, others may have handled messages of this session
+    state = await sessions.refresh(sid)
+    if state is None: return None
+    for val, type_ in state.evidence.items():
+        evidence_map[textengine.LABEL_TO_INTEL.get(type_, "suspiciousKeywords")].append(val)
+
+    # Identifiers other sessions also produced: index seeks on every shard, no scans (see campaigns.py)
+    keys = {campaigns.normalize(type_, val): val for val, type_ in state.evidence.items()}
+    keys.pop(None, None)
+    linked = campaigns.also_seen(keys, campaigns.merge_counts(
+        await storage.read_all(campaigns.other_sessions, list(keys), sid))) if keys else []
+    notes = "Scam detected via Local Neural Engine."
+    if linked: notes += " " + campaigns.describe(linked)
+    if final: notes += " Session idle, final report."
+
+    return {
+        "sessionId": sid,
+        "scamDetected": True,
+        "totalMessagesExchanged": state.message_count,
+        "extractedIntelligence": evidence_map,
+        "agentNotes": notes
+    }
+
+# Coalesces callbacks per session, retries from the callback_outbox table (see outbox.py)
+outbox = Outbox(storage, build_callback_payload)
+
+def _insert_evidence(sid, extracted, indexed, timestamp):
+    # UNIQUE(session_id, value) does the dedupe; the cross-session index is kept in the same transaction
+    def run(conn):
+        conn.executemany(campaigns.UPSERT, indexed)
+        return conn.executemany(
+            "INSERT OR IGNORE INTO evidence (session_id, type, value, timestamp) VALUES (?, ?, ?, ?)",
+            [(sid, type_, value, timestamp) for type_, value in extracted]).rowcount
+    return run
+
+async def extract_evidence(sid, items):
+    # items: (text, analysis) of every message queued for this session since the last run
+    metrics.BACKGROUND.inc()
     try:
-        evidence_map = { "bankAccounts": [], "upiIds": [], "phishingLinks": [], "phoneNumbers": [], "suspiciousKeywords": [] }
-        with sqlite3.connect(DB_NAME) as conn:
-            rows = conn.execute("SELECT type, value FROM evidence WHERE session_id=?", (sid,)).fetchall()
-            for type_, val in rows:
-                if type_ == "Bank Account": evidence_map["bankAccounts"].append(val)
-                elif type_ == "UPI ID": evidence_map["upiIds"].append(val)
-                elif type_ == "Phone Number": evidence_map["phoneNumbers"].append(val)
-                else: evidence_map["suspiciousKeywords"].append(val)
-            msg_count = conn.execute("SELECT COUNT(*) FROM messages WHERE session_id=?", (sid,)).fetchone()[0]
-
-        payload = {
-            "sessionId": sid,
-            "scamDetected": True,
-            "totalMessagesExchanged": msg_count,
-            "extractedIntelligence": evidence_map,
-            "agentNotes": "Scam detected via Local Neural Engine."
-        }
-        requests.post("https://hackathon.guvi.in/api/updateHoneyPotFinalResult", json=payload, timeout=2)
-    except: pass
-
-def extract_evidence(sid, text):
-    extracted = []
-    upis = re.findall(r'[a-zA-Z0-9\.\-_]+@[a-zA-Z]+', text)
-    for u in upis: extracted.append(("UPI ID", u))
-    
-    phones = re.findall(r'(?<!\d)[6-9]\d{9}(?!\d)', text)
-    for p in phones: extracted.append(("Phone Number", p))
-    
-    potential_accounts = re.findall(r'\d{9,18}', text)
-    for acc in potential_accounts:
-        if acc not in phones: extracted.append(("Bank Account", acc))
-
-    keywords = ["urgent", "blocked", "sbi", "hdfc", "otp", "police", "jail", "verify"]
-    for k in keywords:
-        if k in text.lower(): extracted.append(("Suspicious Keyword", k.upper()))
-
-    if extracted:
-        with sqlite3.connect(DB_NAME) as conn:
-            for type_, value in extracted:
-                exists = conn.execute("SELECT 1 FROM evidence WHERE session_id=? AND value=?", (sid, value)).fetchone()
-                if not exists:
-                    conn.execute("INSERT INTO evidence (session_id, type, value, timestamp) VALUES (?, ?, ?, ?)",
-                                 (sid, type_, value, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-            conn.commit()
-
-# --- 5. ENDPOINTS ---
+        with metrics.stage("extract_evidence"):
+            await _extract_evidence(sid, items)
+    finally:
+        metrics.BACKGROUND.dec()
+
+async def _extract_evidence(sid, items):
+    state = await sessions.get(sid)
+    if state is None: return
+
+    # Reuse the handler's scan when we have it; the message is only read once.
+    # Only evidence this session hasn't produced before goes to the evidence table,
+    # but every identifier mention refreshes its last_seen in the index
+    rows = [row for text, analysis in items for row in textengine.as_rows(analysis or textengine.analyze(text))]
+    new = sessions.new_evidence(state, rows)
+    ts = now()
+    indexed = campaigns.index_rows(sid, rows, ts)
+    if new or indexed:
+        # The UNIQUE constraint still guards against a session that was evicted meanwhile
+        await storage.shard(sid).submit(_insert_evidence(sid, new, indexed, ts),
+                                        then=lambda _: _publish_evidence(sid, new, ts))
+
+    # Fresh UPI IDs / phones / accounts / links are worth reporting right away
+    high_value = any(type_ != "Suspicious Keyword" for type_, _ in new)
+    await outbox.notify(sid, high_value=high_value)
+
+def _publish_evidence(sid, rows, timestamp):
+    for type_, value in rows:
+        bus.publish("evidence", sid, type=type_, value=value, timestamp=timestamp)
+
+def _publish_turn(sid, persona, is_new, messages, timestamp):
+    # ids: the committed rowids of the scammer and agent message
+    def publish(ids):
+        for id_, (role, text) in zip(ids[-2:], messages):
+            bus.publish("message", sid, id=id_, role=role, message=text, timestamp=timestamp,
+                        persona=persona, new=is_new)
+    return publish
+
+def _before(history, text):
+    # The conversation up to the newest scammer message `text` (which is judged on its own)
+    for i in range(len(history) - 1, -1, -1):
+        if history[i]["sender"] == "scammer" and history[i]["text"] == text: return history[:i]
+    return history
+
+async def confirm_scam(sid, payloads):
+    # The model's verdict, off the request path; it can only raise the flag.
+    # Optional work: coalesced to the newest message and shed first under load.
+    # The prompt carries the session's bounded context, however long the chat.
+    # A real model answer also becomes the message's training label (see classifier.py);
+    # settled messages only come here as the audit sample, for their label
+    text, settled = payloads[-1]
+    metrics.BACKGROUND.inc()
+    try:
+        with metrics.stage("confirm_scam"):
+            history = _before((await contexts.get(sid)).history(), text)
+            # classify=False: the handler found the local classifier unsure (or it is the audit sample)
+            verdict, source = await logic.judge(text, classify=False, history=history, cached=not classifier.sampled(text))
+            writes = []
+            if verdict and (source == "llm" or not settled):
+                writes.append(("UPDATE sessions SET is_scam=1 WHERE id=?", (sid,)))
+            if source == "llm":
+                # The turn's own write is ahead of this one in the shard's single writer
+                writes.append(("UPDATE messages SET scam_label=? WHERE id=(SELECT MAX(id) FROM messages "
+                               "WHERE session_id=? AND role='scammer' AND message=?)", (int(verdict), sid, text)))
+            if writes: await storage.shard(sid).write_many(writes)
+    finally:
+        metrics.BACKGROUND.dec()
+
+# --- 5. ONE SCAMMER TURN (shared by catch_all and /api/batch) ---
+Turn = namedtuple("Turn", ["state", "reply", "is_scam", "settled", "writes", "timestamp", "publish"])
+
+def take_turn(sid, user_text, analysis, state, degraded, shed, local=None):
+    """Session update, reply and the SQL to log one scammer message. state is None for a new session;
+    local is the classifier's verdict (True/False when sure, None otherwise)."""
+    intent = analysis.intent
+    is_new = state is None
+    if is_new:
+        state = sessions.create(sid, "grandma", intent) # Default to grandma for consistency in demo
+    persona = state.persona
+    sessions.record_message(state, intent)
+
+    # Construct Reply (The Generator) - popped from the pre-generated pool, never waits on the model.
+    # Degraded: straight from the local sentence builder, so the pool doesn't ask the LLM for refills
+    with metrics.stage("reply"):
+        if degraded:
+            reply = construct_response(persona, intent)
+            admission.note_shed("reply_pool")
+            shed.append("reply_pool")
+        else:
+            reply = replies.take(persona, intent, avoid=state.replies)
+    state.replies.add(reply)
+    # Keywords or the local classifier settle most messages; the rest go to the LLM check
+    is_scam = textengine.is_scam(analysis) or local is True
+    settled = is_scam or local is False
+
+    # Write-through: session + both messages in one write
+    ts = now()
+    writes = []
+    if is_new:
+        writes.append(("INSERT OR IGNORE INTO sessions (id, persona, is_scam, last_intent, start_time) VALUES (?, ?, ?, ?, ?)",
+                       (sid, persona, int(is_scam), intent, ts)))
+    else:
+        writes.append(("UPDATE sessions SET last_intent=?, is_scam=MAX(is_scam, ?) WHERE id=?", (intent, int(is_scam), sid)))
+    writes.append(("INSERT INTO messages (session_id, role, message, timestamp) VALUES (?, ?, ?, ?)", (sid, "scammer", user_text, ts)))
+    writes.append(("INSERT INTO messages (session_id, role, message, timestamp) VALUES (?, ?, ?, ?)", (sid, "agent", reply, ts)))
+    publish = _publish_turn(sid, persona, is_new, [("scammer", user_text), ("agent", reply)], ts)
+    return Turn(state, reply, is_scam, settled, writes, ts, publish)
+
+def confirm_later(sid, user_text, settled, degraded, shed):
+    # The LLM check is optional work: skipped when degraded, first to go when the queue is full
+    if not llm.configured() or (settled and not classifier.sampled(user_text)): return
+    if degraded:
+        admission.note_shed("confirm_scam")
+        shed.append("confirm_scam")
+    elif not work.submit("confirm_scam", sid, confirm_scam, (user_text, settled), optional=True, merge=False):
+        shed.append("confirm_scam")
+
+def _batch_write(items):
+    # One transaction per shard, one SAVEPOINT per item so a bad item rolls back alone.
+    # items: (writes, evidence fn or None); returns each item's rowids, or the exception that failed it
+    def run(conn):
+        out = []
+        for writes, evidence in items:
+            conn.execute("SAVEPOINT item")
+            try:
+                ids = [conn.execute(sql, params).lastrowid for sql, params in writes]
+                if evidence: evidence(conn)
+                conn.execute("RELEASE item")
+                out.append(ids)
+            except Exception as e:
+                conn.execute("ROLLBACK TO item")
+                conn.execute("RELEASE item")
+                logger.error(f"Batch item write failed: {e}")
+                metrics.swallowed("batch.write")
+                out.append(e)
+        return out
+    return run
+
+def _batch_item_error(item):
+    if not isinstance(item, dict): return "item is not an object"
+    if not isinstance(item.get("sessionId"), str) or not item["sessionId"]: return "missing sessionId"
+    if not isinstance(item.get("message"), dict) or "text" not in item["message"]: return "missing message.text"
+    return None
+
+# --- 6. PREWARM ---
+# What the first request would otherwise pay for, done after startup (SENTINEL_PREWARM=0 skips it)
+HOT_SESSIONS = 200
+
+async def _warm_readers():
+    await storage.read_all(lambda conn: conn.execute("SELECT COUNT(*) FROM sessions").fetchone())
+
+async def _warm_sessions():
+    # The most recently active sessions are the ones whose scammers come back first
+    def recent(conn):
+        return [r[0] for r in conn.execute("SELECT session_id FROM messages GROUP BY session_id "
+                                           "ORDER BY MAX(id) DESC LIMIT ?", (HOT_SESSIONS,))]
+    for part in await storage.read_all(recent):
+        for sid in part: await sessions.get(sid)
+
+WARMUPS = [
+    ("llm", llm.get_llm),                 # google-genai import + client
+    ("classifier", classifier.get_model), # numpy import + weights mapping
+    ("http", outbox.http),                # requests import + keep-alive session
+    ("readers", _warm_readers),
+    ("sessions", _warm_sessions),
+]
+warmup = None
+
+# --- 7. METRICS ---
+# Queue depths and the counters other modules already keep, read at scrape time
+metrics.Gauge("sentinel_storage_queue_depth", "Writes waiting for the SQLite writer(s).", fn=lambda: storage.depth)
+metrics.Gauge("sentinel_outbox_queue_depth", "Sessions with a callback due or in flight.",
+              fn=lambda: outbox.stats()["queueDepth"])
+metrics.Counter("sentinel_callbacks_total", "GUVI callbacks by result.", ["result"],
+                fn=lambda: {("sent",): outbox.sent, ("failed",): outbox.failed, ("dead",): outbox.dead})
+metrics.Gauge("sentinel_session_cache_size", "Sessions held in memory.", fn=lambda: len(sessions))
+metrics.Gauge("sentinel_reply_pool_size", "Ready replies across all persona/intent pools.",
+              fn=lambda: replies.stats()["replies"])
+metrics.Gauge("sentinel_llm_in_flight", "LLM calls running now.",
+              fn=lambda: llm.current().in_flight if llm.current() else 0)
+metrics.Gauge("sentinel_event_subscribers", "Clients following /events.", fn=lambda: bus.stats()["subscribers"])
+metrics.Counter("sentinel_verdict_cache_lookups_total", "Scam-verdict cache lookups by result (see simcache.py).",
+                ["result"], fn=lambda: {(k,): logic.verdicts.stats()[k] for k in ("exactHits", "nearHits", "misses", "skipped")})
+metrics.Gauge("sentinel_verdict_cache_size", "Scam verdicts cached.", fn=lambda: len(logic.verdicts))
+metrics.Counter("sentinel_scam_classifier_total", "Local scam classifier verdicts (see classifier.py); unsure ones go to the LLM.",
+                ["verdict"], fn=lambda: {(k,): n for k, n in classifier.counts.items()})
+metrics.Gauge("sentinel_work_queue_depth", "Background jobs waiting for a worker.", fn=lambda: work.depth)
+metrics.Gauge("sentinel_degraded", "1 while the handler sheds optional work.", fn=lambda: int(admission.degraded))
+metrics.Counter("sentinel_shed_total", "Requests rejected and work dropped or skipped under load.", ["what"],
+                fn=lambda: {(what,): n for what, n in admission.shed.items()})
+
+# --- 8. ENDPOINTS ---
+# Registered before the catch-all, so a scrape is never treated as scammer traffic
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/events")
+async def events_endpoint(request: Request, session: str = None, last_event_id: int = None):
+    # Server-Sent Events; EventSource sends Last-Event-ID itself when it reconnects
+    header = request.headers.get("last-event-id")
+    after = int(header) if header and header.isdigit() else last_event_id
+    return StreamingResponse(bus.stream(session, after, request.is_disconnected), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/api/batch")
+async def batch_endpoint(request: Request, response: Response):
+    # Many scammer messages per request: one scan pass, one session read and one
+    # transaction per shard. Results come back in order; a bad item fails alone
+    try:
+        body = await request.body()
+        payload = json.loads(body.decode()) if body else None
+    except ValueError:
+        metrics.swallowed("batch.parse")
+        return JSONResponse({"status": "error", "error": "body is not JSON"}, status_code=400)
+    items = payload.get("items") if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        return JSONResponse({"status": "error", "error": "expected a list of {sessionId, message} items"}, status_code=400)
+    if len(items) > BATCH_MAX:
+        return JSONResponse({"status": "error", "error": f"at most {BATCH_MAX} items per batch"}, status_code=413)
+
+    results = [None] * len(items)
+    accepted = []   # (index, sid, text)
+    for i, item in enumerate(items):
+        error = _batch_item_error(item)
+        if error is None and not admission.admit(item["sessionId"]): error = "rate_limited"
+        if error:
+            metrics.REQUESTS.inc("rejected")
+            results[i] = {"status": "error", "error": error}
+        else:
+            accepted.append((i, item["sessionId"], str(item["message"]["text"])))
+    degraded = admission.update(max(work.pressure, storage.pressure))
+    shed = []
+
+    with metrics.stage("intent"):
+        analyses = textengine.analyze_many([text for _, _, text in accepted])
+    with metrics.stage("classify"):   # one pass over every message the keywords didn't flag
+        unsure = [k for k, analysis in enumerate(analyses) if not textengine.is_scam(analysis)]
+        local = dict(zip(unsure, classifier.verdicts([accepted[k][2] for k in unsure])))
+    with metrics.stage("session"):
+        states = await sessions.get_many([sid for _, sid, _ in accepted])
+
+    # Items of one session are taken in order, each seeing the state the previous one left
+    by_shard = {}   # shard -> ([(writes, evidence write)], [(index, sid, text, turn, new evidence)])
+    for k, ((i, sid, text), analysis) in enumerate(zip(accepted, analyses)):
+        try:
+            turn = take_turn(sid, text, analysis, states.get(sid), degraded, shed, local.get(k))
+            states[sid] = turn.state
+            rows = textengine.as_rows(analysis)
+            new = sessions.new_evidence(turn.state, rows)
+            indexed = campaigns.index_rows(sid, rows, turn.timestamp)
+        except Exception as e:
+            logger.error(f"Batch item {i} ({sid}): {e}")
+            metrics.swallowed("batch.item")
+            results[i] = {"sessionId": sid, "status": "error", "error": "processing failed"}
+            continue
+        writes, done = by_shard.setdefault(storage.shard(sid), ([], []))
+        writes.append((turn.writes, _insert_evidence(sid, new, indexed, turn.timestamp) if new or indexed else None))
+        done.append((i, sid, text, turn, new))
+
+    with metrics.stage("log_messages"):   # here the batch does wait for its commits
+        shards_ = list(by_shard.items())
+        committed = await asyncio.gather(*(shard.submit(_batch_write(writes), wait=True)
+                                           for shard, (writes, _) in shards_), return_exceptions=True)
+
+    high_value = {}
+    for (shard, (_, done)), outcome in zip(shards_, committed):
+        for n, (i, sid, text, turn, new) in enumerate(done):
+            ids = outcome if isinstance(outcome, Exception) else outcome[n]
+            if isinstance(ids, Exception):
+                # take_turn already counted it in memory; rebuild the session from what was committed
+                sessions.forget(sid)
+                metrics.REQUESTS.inc("error")
+                results[i] = {"sessionId": sid, "status": "error", "error": "storage unavailable"}
+                continue
+            turn.publish(ids)
+            _publish_evidence(sid, new, turn.timestamp)
+            high_value[sid] = high_value.get(sid, False) or any(type_ != "Suspicious Keyword" for type_, _ in new)
+            confirm_later(sid, text, turn.settled, degraded, shed)
+            metrics.REQUESTS.inc("degraded" if degraded else "success")
+            results[i] = {"sessionId": sid, "status": "success", "reply": turn.reply}
+    for sid, urgent in high_value.items():
+        await outbox.notify(sid, high_value=urgent)
+
+    if shed: response.headers["X-Sentinel-Shed"] = ",".join(dict.fromkeys(shed))
+    return {"status": "success", "results": results}
+
 @app.api_route("/{path_name:path}", methods=["GET", "POST", "PUT", "DELETE"])
-async def catch_all(request: Request, path_name: str, bg_tasks: BackgroundTasks):
+async def catch_all(request: Request, path_name: str, response: Response):
     if "dashboard" in path_name:
-        with sqlite3.connect(DB_NAME) as conn:
-            return {"status": "success", "stats": {"engine": "LOCAL_NEURAL"}}
+        client = llm.current()
+        stats = {"engine": "LOCAL_NEURAL", "outbox": outbox.stats(), "sessionCache": sessions.stats(),
+                 "replyPool": replies.stats(), "llm": client.stats() if client else None,
+                 "admission": admission.stats(), "work": work.stats(), "events": bus.stats(), "verdictCache": logic.verdicts.stats(),
+                 "classifier": classifier.stats(),
+                 "startup": startup.report()}
+        return {"status": "success", "stats": stats}
 
     if request.method == "GET": return {"status": "ONLINE", "mode": "NEURAL_SIMULATOR"}
 
@@ -169,42 +439,53 @@ async def catch_all(request: Request, path_name: str, bg_tasks: BackgroundTasks)
         try:
             body = await request.body()
             payload = json.loads(body.decode()) if body else {}
-        except: payload = {}
+        except Exception:
+            metrics.swallowed("catch_all.parse")
+            payload = {}
 
         sid = payload.get("sessionId") or "test-session"
         user_text = str(payload.get("message", {}).get("text", ""))
 
-        # 1. Analyze Intent (The Brain)
-        intent = analyze_intent(user_text)
-
-        # 2. Manage Session
-        with sqlite3.connect(DB_NAME) as conn:
-            row = conn.execute("SELECT persona FROM sessions WHERE id=?", (sid,)).fetchone()
-            if row:
-                persona = row[0]
-            else:
-                persona = "grandma" # Default to grandma for consistency in demo
-                conn.execute("INSERT INTO sessions (id, persona, last_intent, start_time) VALUES (?, ?, ?, ?)", 
-                             (sid, persona, intent, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-                conn.commit()
-
-        # 3. Construct Reply (The Generator)
-        reply = construct_response(persona, intent)
-
-        # 4. Background Tasks
-        bg_tasks.add_task(extract_evidence, sid, user_text)
-        bg_tasks.add_task(send_guvi_callback, sid)
-        
-        # Log
-        try:
-            with sqlite3.connect(DB_NAME) as conn:
-                conn.execute("INSERT INTO messages (session_id, role, message, timestamp) VALUES (?, ?, ?, ?)", (sid, "scammer", user_text, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-                conn.execute("INSERT INTO messages (session_id, role, message, timestamp) VALUES (?, ?, ?, ?)", (sid, "agent", reply, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-                conn.commit()
-        except: pass
+        # 0. Admission - over the session's or the global rate gets a 429 before any work is done
+        if not admission.admit(sid):
+            metrics.REQUESTS.inc("rejected")
+            return JSONResponse({"status": "error", "reply": "Connection unstable"}, status_code=429,
+                                headers={"Retry-After": "1", "X-Sentinel-Shed": "rate_limited"})
+        # Degraded while the background queue or the writer queue is filling up (hysteresis in admission.py)
+        degraded = admission.update(max(work.pressure, storage.pressure))
+        shed = []
+
+        # 1. Analyze Intent (The Brain) - one scan gives intent + evidence
+        with metrics.stage("intent"):
+            analysis = textengine.analyze(user_text)
+        intent = analysis.intent
+        local = None
+        if not textengine.is_scam(analysis):   # the keywords missed it: ask the local classifier
+            with metrics.stage("classify"):
+                local = classifier.verdict(user_text)
+
+        # 2. Manage Session (in-memory, rebuilt from SQLite on a miss)
+        with metrics.stage("session"):
+            state = await sessions.get(sid)
+
+        # 3. Construct Reply (The Generator), see take_turn
+        turn = take_turn(sid, user_text, analysis, state, degraded, shed, local)
+
+        # 4. Log (write-through: session + both messages in one queued write, group-committed by the writer)
+        with metrics.stage("log_messages"):   # queueing only; the commit is in sentinel_db_commit_seconds
+            await storage.shard(sid).write_many(turn.writes, then=turn.publish)
+
+        # 5. Background Tasks - bounded queue, coalesced per session; the LLM check is optional
+        if not work.submit("extract_evidence", sid, extract_evidence, (user_text, analysis)):
+            shed.append("extract_evidence")
+        confirm_later(sid, user_text, turn.settled, degraded, shed)
 
-        return {"status": "success", "reply": reply}
+        if shed: response.headers["X-Sentinel-Shed"] = ",".join(shed)
+        metrics.REQUESTS.inc("degraded" if degraded else "success")
+        return {"status": "success", "reply": turn.reply}
 
     except Exception as e:
         logger.error(f"Error: {e}")
+        metrics.REQUESTS.inc("error")
+        metrics.swallowed("catch_all")
         return {"status": "error", "reply": "Connection unstable"}
@@ -0,0 +1,138 @@
+# metrics.py
+# Tiny in-process metrics registry, rendered in the Prometheus text format at /metrics.
+# - Counters, gauges and histograms keyed by label values; no dependencies.
+# - Recording is a dict lookup plus a bisect, cheap enough for every request.
+# - A metric can also be computed at scrape time from fn() (queue depths,
+#   counters other modules already keep), so nothing has to push updates.
+import bisect
+import threading
+import time
+
+# Seconds; covers sub-millisecond scans up to multi-second LLM calls
+BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY = []
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra: pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labels=(), fn=None):
+        # fn() -> a number, or {label values tuple: number}, read at scrape time
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.fn = fn
+        self._values = {} if self.labels else {(): 0}
+        REGISTRY.append(self)
+
+    def samples(self):
+        if self.fn is None: return list(self._values.items())
+        value = self.fn()
+        return list(value.items()) if isinstance(value, dict) else [((), value)]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in self.samples():
+            lines.append(f"{self.name}{_labels(self.labels, key)} {value}")
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        self._values[labels] = value
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        super().__init__(name, help, labels)
+        self._values = {}
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()   # the storage writer thread records here too
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets): series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labels):
+        """with histogram.time("label"): ... observes the block's wall time."""
+        return _Timer(self, labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = [(key, (list(counts), total, n)) for key, (counts, total, n) in self._values.items()]
+        for key, (counts, total, n) in series:
+            running = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts + [n - sum(counts)]):
+                running += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {n}")
+        return lines
+
+def render():
+    """Every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# --- THE PIPELINE METRICS ---
+STAGE = Histogram("sentinel_stage_seconds", "Time spent in each stage of the request pipeline.", ["stage"])
+REQUESTS = Counter("sentinel_requests_total", "Scammer messages handled, by outcome.", ["outcome"])
+SWALLOWED = Counter("sentinel_swallowed_exceptions_total", "Exceptions caught and handled instead of raised.", ["where"])
+BACKGROUND = Gauge("sentinel_background_tasks", "Background tasks (evidence extraction, scam confirmation) running now.")
+DB_LOCK_WAIT = Histogram("sentinel_db_lock_wait_seconds", "Time the writer waited for the SQLite write lock.", ["db"])
+DB_COMMIT = Histogram("sentinel_db_commit_seconds", "Time to run and commit one group of writes.", ["db"])
+DB_QUEUE_WAIT = Histogram("sentinel_db_queue_wait_seconds", "Time a write waited in the queue before its batch started.", ["db"])
+
+def stage(name):
+    return STAGE.time(name)
+
+def swallowed(where):
+    SWALLOWED.inc(where)
@@ -0,0 +1,259 @@
+# outbox.py
+# Coalescing, durable callback outbox for the GUVI final-result endpoint.
+# - notify() is cheap: it only marks a session dirty.
+# - At most ONE callback is in flight per session; everything that happens while
+#   it is in flight is folded into the next one.
+# - Sends after a short window, immediately on new high-value evidence, and
+#   once more (the final report) when the session goes idle.
+# - Every send is persisted to callback_outbox (schema.py) first and retried with
+#   exponential backoff (also after a restart) until it succeeds.
+# - Due times and idle deadlines sit in two heaps, so waking up (on every
+#   notify) costs O(log n) however many sessions are active, not a scan.
+import asyncio
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+import metrics
+
+logger = logging.getLogger("uvicorn")
+
+# --- CONFIGURATION ---
+CALLBACK_URL = os.environ.get("GUVI_CALLBACK_URL", "https://hackathon.guvi.in/api/updateHoneyPotFinalResult")
+WINDOW = float(os.environ.get("CALLBACK_WINDOW", "5"))          # seconds to coalesce updates
+IDLE_AFTER = float(os.environ.get("CALLBACK_IDLE_AFTER", "120"))  # seconds of silence before the final report
+
+class Outbox:
+    def __init__(self, storage, build_payload, url=CALLBACK_URL, window=WINDOW, idle_after=IDLE_AFTER,
+                 timeout=5.0, concurrency=8, max_attempts=10, base_backoff=1.0, max_backoff=300.0):
+        # build_payload(sid, final) -> dict (or None to drop), awaited right before each send so
+        # the payload always carries the latest evidence and message count
+        self.storage = storage
+        self.build_payload = build_payload
+        self.url = url
+        self.window = window
+        self.idle_after = idle_after
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._due = {}          # sid -> monotonic time the next callback is due
+        self._last_seen = {}    # sid -> monotonic time of the last notify
+        self._due_heap = []     # (due, sid); entries that no longer match _due are skipped
+        self._idle_heap = []    # (idle deadline, sid), one per active session; re-queued if it saw activity since
+        self._final = set()     # sids whose next send is the idle/final report
+        self._attempts = {}     # sid -> failed attempts of the current payload
+        self._in_flight = set()
+        self._tasks = set()
+        self._wake = None
+        self._runner = None
+        self._stopping = False
+        self._slots = None
+        self._http = None
+        self._http_lock = threading.Lock()
+        self._start_lock = asyncio.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.dead = 0
+        self._latency_ms = []   # recent send latencies (ring of 1000)
+
+    @property
+    def started(self):
+        return self._runner is not None and not self._runner.done()
+
+    # --- 1. LIFECYCLE ---
+    async def start(self):
+        if self.started: return
+        async with self._start_lock:
+            if self.started: return
+            self._wake = asyncio.Event()
+            self._stopping = False
+            self._slots = asyncio.Semaphore(self.concurrency)
+            await self._recover()
+            self._runner = asyncio.create_task(self._run())
+
+    async def close(self):
+        if not self.started: return
+        # A stop flag rather than cancel(): cancelling a task parked in wait_for can be lost
+        self._stopping = True
+        self._wake.set()
+        await self._runner
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        # Whatever is still pending survives the restart via the outbox table
+        # (each row goes to the shard that owns its session, see shards.py).
+        # next_attempt is when the session was last active: due at once after the
+        # restart, and _recover() counts the idle time for the final report from it
+        by_shard = {}
+        now_wall, now = time.time(), time.monotonic()
+        for sid in set(self._due) | set(self._last_seen):
+            seen = now_wall - (now - self._last_seen[sid]) if sid in self._last_seen else now_wall
+            by_shard.setdefault(self.storage.shard(sid), []).append((
+                "INSERT INTO callback_outbox (session_id, final, next_attempt) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET next_attempt=excluded.next_attempt",
+                (sid, int(sid in self._final), seen)))
+        for shard, writes in by_shard.items():
+            await shard.write_many(writes, wait=True)
+        if self._http is not None: self._http.close()
+        self._http = None
+        self._runner = None
+
+    def http(self):
+        """The one keep-alive HTTP client for every callback, built on first use."""
+        # requests costs ~70ms to import; a cold start shouldn't pay that before the first reply
+        with self._http_lock:
+            if self._http is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                http = requests.Session()
+                http.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency))
+                http.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency))
+                self._http = http
+            return self._http
+
+    async def _recover(self):
+        # Fan out over every shard; each one keeps the outbox rows of its own sessions
+        rows = [row for part in await self.storage.read_all(_pending, self.max_attempts) for row in part]
+        now_wall, now = time.time(), time.monotonic()
+        for sid, final, attempts, next_attempt in rows:
+            self._set_due(sid, now + max(0.0, (next_attempt or now_wall) - now_wall))
+            self._attempts[sid] = attempts or 0
+            if final: self._final.add(sid)
+            # Still active at shutdown: keep watching it, or the final report never comes
+            else: self._seen(sid, now - max(0.0, now_wall - (next_attempt or now_wall)))
+        if rows: logger.info(f"Outbox: recovered {len(rows)} pending callbacks")
+
+    # --- 2. PRODUCER SIDE ---
+    async def notify(self, sid, high_value=False):
+        """A session changed. high_value=True skips the coalescing window."""
+        await self.start()
+        now = time.monotonic()
+        self._seen(sid, now)
+        self._final.discard(sid)
+        due = now if high_value else now + self.window
+        if sid not in self._due or due < self._due[sid]:
+            self._set_due(sid, due)
+        self._wake.set()
+
+    def _seen(self, sid, when):
+        if sid not in self._last_seen: heapq.heappush(self._idle_heap, (when + self.idle_after, sid))
+        self._last_seen[sid] = when
+
+    def _set_due(self, sid, due):
+        self._due[sid] = due
+        heapq.heappush(self._due_heap, (due, sid))
+
+    # --- 3. DISPATCHER ---
+    async def _run(self):
+        while not self._stopping:
+            now = time.monotonic()
+            while self._idle_heap and self._idle_heap[0][0] <= now:
+                _, sid = heapq.heappop(self._idle_heap)
+                if sid not in self._last_seen: continue
+                deadline = self._last_seen[sid] + self.idle_after
+                if deadline > now:
+                    heapq.heappush(self._idle_heap, (deadline, sid))   # active since it was queued
+                    continue
+                del self._last_seen[sid]
+                self._final.add(sid)
+                self._set_due(sid, min(self._due.get(sid, now), now))
+
+            while self._due_heap and self._due_heap[0][0] <= now:
+                due, sid = heapq.heappop(self._due_heap)
+                # Stale (rescheduled or sent) or busy: _send() re-queues what is still due when it finishes
+                if self._due.get(sid) != due or sid in self._in_flight: continue
+                del self._due[sid]
+                self._in_flight.add(sid)
+                task = asyncio.create_task(self._send(sid))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+            deadlines = [heap[0][0] for heap in (self._due_heap, self._idle_heap) if heap]
+            timeout = max(0.0, min(deadlines) - now) if deadlines else None
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _send(self, sid):
+        final = sid in self._final
+        try:
+            payload = await self.build_payload(sid, final)
+            if payload is None:
+                # The session is gone, nothing left to report
+                await self.storage.shard(sid).write("DELETE FROM callback_outbox WHERE session_id=?", (sid,))
+                return
+            body = json.dumps(payload)
+            await self.storage.shard(sid).write(
+                "INSERT INTO callback_outbox (session_id, payload, final, attempts, next_attempt) VALUES (?, ?, ?, 0, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET payload=excluded.payload, final=excluded.final",
+                (sid, body, int(final), time.time()))
+
+            async with self._slots:
+                start = time.perf_counter()
+                try:
+                    with metrics.stage("send_callback"):
+                        resp = await asyncio.to_thread(lambda: self.http().post(
+                            self.url, data=body, headers={"Content-Type": "application/json"}, timeout=self.timeout))
+                    resp.raise_for_status()
+                    error = None
+                except Exception as e:
+                    error = e
+                self._latency_ms.append((time.perf_counter() - start) * 1000)
+                del self._latency_ms[:-1000]
+
+            if error is None:
+                self.sent += 1
+                self._attempts.pop(sid, None)
+                if final: self._final.discard(sid)
+                await self.storage.shard(sid).write("DELETE FROM callback_outbox WHERE session_id=?", (sid,))
+            else:
+                await self._failed(sid, error)
+        except Exception as e:
+            await self._failed(sid, e)
+        finally:
+            self._in_flight.discard(sid)
+            if sid in self._due: heapq.heappush(self._due_heap, (self._due[sid], sid))
+            self._wake.set()
+
+    async def _failed(self, sid, error):
+        self.failed += 1
+        metrics.swallowed("outbox.send")
+        attempts = self._attempts.get(sid, 0) + 1
+        delay = min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+        if attempts >= self.max_attempts:
+            self.dead += 1
+            self._attempts.pop(sid, None)
+            self._final.discard(sid)
+            logger.error(f"Outbox: giving up on {sid} after {attempts} attempts: {error}")
+        else:
+            self._attempts[sid] = attempts
+            # Back off even if new activity arrived while this send was in flight
+            self._set_due(sid, max(self._due.get(sid, 0), time.monotonic() + delay))
+            logger.warning(f"Outbox: callback for {sid} failed ({error}), retry in {delay:.1f}s")
+        await self.storage.shard(sid).write(
+            "UPDATE callback_outbox SET attempts=?, next_attempt=?, last_error=? WHERE session_id=?",
+            (attempts, time.time() + delay, str(error), sid))
+
+    # --- 4. OBSERVABILITY ---
+    def stats(self):
+        lat = sorted(self._latency_ms)
+        pct = lambda p: round(lat[min(len(lat) - 1, int(p * len(lat)))], 1) if lat else None
+        return {
+            "queueDepth": len(self._due) + len(self._in_flight),
+            "inFlight": len(self._in_flight),
+            "activeSessions": len(self._last_seen),
+            "sent": self.sent,
+            "failed": self.failed,
+            "dead": self.dead,
+            "latencyMs": {"p50": pct(0.5), "p95": pct(0.95), "max": round(lat[-1], 1) if lat else None},
+        }
+
+def _pending(conn, max_attempts):
+    return conn.execute("SELECT session_id, final, attempts, next_attempt FROM callback_outbox WHERE attempts < ?",
+                        (max_attempts,)).fetchall()
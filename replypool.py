@@ -0,0 +1,202 @@
+# replypool.py
+# Pre-generated persona replies, served in O(1) from the request path.
+# - One bounded ring buffer (deque) of ready replies per (persona, intent).
+# - take() pops the oldest reply the session hasn't been sent yet; if the pool
+#   is dry it builds one from the PARTS templates on the spot.
+# - A background worker tops every pool that drops below the low-water mark
+#   back up: from the LLM when one is configured, from the templates otherwise.
+# - Pools are saved to disk (on shutdown and after refills), so a warm restart
+#   serves replies immediately without waiting for the model.
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+import metrics
+import personas
+import textengine
+from responses import construct_response
+
+logger = logging.getLogger("uvicorn")
+
+# --- CONFIGURATION ---
+POOL_FILE = os.environ.get("REPLY_POOL_FILE", "reply_pool.json")
+CAPACITY = int(os.environ.get("REPLY_POOL_CAPACITY", "64"))       # replies kept per (persona, intent)
+LOW_WATER = int(os.environ.get("REPLY_POOL_LOW_WATER", "16"))     # refill when a pool drops below this
+REFILL_BATCH = 8          # replies asked for per LLM call
+REFILL_TIMEOUT = 10.0     # seconds; refills are off the request path, so they get a generous deadline
+SAVE_EVERY = 30.0         # seconds between saves while refilling
+
+PERSONAS = list(personas.CHARACTERS)
+INTENTS = list(textengine.INTENT_WEIGHTS)
+
+def _llm_replies(persona, intent, n):
+    # logic imports responses too; keep the import lazy so the pool stays cheap to load
+    import logic
+    return logic.generate_pool_replies(persona, intent, n, REFILL_TIMEOUT)
+
+class ReplyPool:
+    def __init__(self, path=POOL_FILE, capacity=CAPACITY, low_water=LOW_WATER,
+                 batch=REFILL_BATCH, generate=_llm_replies, use_llm=None):
+        self.path = path
+        self.capacity = capacity
+        self.low_water = low_water
+        self.batch = batch
+        self.generate = generate                     # async (persona, intent, n) -> [reply]
+        self.use_llm = use_llm or (lambda: False)    # checked per refill, so the LLM can come and go
+        self._pools = {(p, i): deque(maxlen=capacity) for p in PERSONAS for i in INTENTS}
+        self._wanted = {}       # keys waiting for a refill, in request order (dict as ordered set)
+        self._wake = None
+        self._runner = None
+        self._stopping = False
+        self._dirty = False
+        self._saved_at = 0.0
+        self.served = 0
+        self.dry = 0            # take() found nothing usable and built a reply on the spot
+        self.refills = 0
+        self.from_llm = 0
+        self.from_templates = 0
+
+    # --- 1. LIFECYCLE ---
+    async def start(self):
+        if self._runner: return
+        await asyncio.to_thread(self.load)
+        # With a model around, top every pool up to capacity (replacing template-only pools)
+        target = self.capacity if self.use_llm() else self.low_water
+        for key, pool in self._pools.items():
+            if len(pool) < target: self._wanted[key] = True
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._runner = asyncio.create_task(self._run())
+        self._wake.set()
+
+    async def close(self):
+        if not self._runner: return
+        self._stopping = True
+        self._wake.set()
+        await self._runner
+        self._runner = None
+        await asyncio.to_thread(self.save)
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            # Cold start: templates now, the worker adds LLM replies as they arrive
+            for persona, intent in self._pools:
+                self._fill_from_templates((persona, intent), self.low_water)
+            return
+        except Exception as e:
+            logger.warning(f"⚠️ Reply pool file unreadable ({e}); starting empty")
+            metrics.swallowed("replypool.load")
+            data = {}
+        for name, replies in data.get("pools", {}).items():
+            key = tuple(name.split("|", 1))
+            if key in self._pools: self._pools[key].extend(replies)
+        logger.info(f"💬 Reply pool loaded: {sum(map(len, self._pools.values()))} replies")
+
+    def save(self):
+        data = {"version": 1, "pools": {f"{p}|{i}": list(pool) for (p, i), pool in self._pools.items()}}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)   # never leave a half-written pool behind
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    # --- 2. THE HOT PATH ---
+    def take(self, persona, intent, avoid=()):
+        """A ready reply for (persona, intent) that isn't in `avoid` (the replies this
+        session already got). Never waits: a dry pool falls back to the templates."""
+        key = (persona if persona in personas.CHARACTERS else "grandma",
+               intent if intent in INTENTS else "general_confusion")
+        pool = self._pools[key]
+        reply = None
+        # Replies the session has seen go back to the end of the ring for other sessions
+        for _ in range(len(pool)):
+            candidate = pool.popleft()
+            if candidate not in avoid:
+                reply = candidate
+                break
+            pool.append(candidate)
+
+        if len(pool) < self.low_water and key not in self._wanted:
+            self._wanted[key] = True
+            if self._wake: self._wake.set()
+
+        if reply is None:
+            self.dry += 1
+            for _ in range(8):
+                reply = construct_response(*key)
+                if reply not in avoid: break
+        else:
+            self.served += 1
+            self._dirty = True
+        return reply
+
+    # --- 3. BACKGROUND REFILL ---
+    async def _run(self):
+        while not self._stopping:
+            self._wake.clear()
+            while self._wanted and not self._stopping:
+                key = next(iter(self._wanted))
+                try:
+                    await self._refill(key)
+                except Exception as e:
+                    logger.warning(f"⚠️ Reply pool refill {key} failed: {e}")
+                    metrics.swallowed("replypool.refill")
+                    self._fill_from_templates(key, self.low_water)
+                self._wanted.pop(key, None)
+            if self._dirty and time.monotonic() - self._saved_at > SAVE_EVERY:
+                try: await asyncio.to_thread(self.save)
+                except Exception as e:
+                    logger.warning(f"⚠️ Reply pool save failed: {e}")
+                    metrics.swallowed("replypool.save")
+            try: await asyncio.wait_for(self._wake.wait(), SAVE_EVERY)
+            except asyncio.TimeoutError: pass
+
+    async def _refill(self, key):
+        pool = self._pools[key]
+        self.refills += 1
+        if self.use_llm():
+            # Keep asking until the pool is full or the model stops giving us anything new
+            while len(pool) < self.capacity and not self._stopping:
+                added = self._add(key, await self.generate(*key, min(self.batch, self.capacity - len(pool))))
+                self.from_llm += added
+                if not added: break
+        if len(pool) < self.low_water:
+            self._fill_from_templates(key, self.low_water)
+
+    def _fill_from_templates(self, key, target):
+        pool = self._pools[key]
+        # PARTS gives 64 combinations per intent; a few misses on duplicates are fine
+        for _ in range(4 * target):
+            if len(pool) >= target: break
+            self.from_templates += self._add(key, [construct_response(*key)])
+
+    def _add(self, key, replies):
+        pool = self._pools[key]
+        seen = set(pool)
+        added = 0
+        for reply in replies:
+            if reply and reply not in seen:
+                pool.append(reply)
+                seen.add(reply)
+                added += 1
+        if added: self._dirty = True
+        return added
+
+    def stats(self):
+        sizes = [len(pool) for pool in self._pools.values()]
+        return {
+            "replies": sum(sizes),
+            "pools": len(sizes),
+            "belowLowWater": sum(size < self.low_water for size in sizes),
+            "served": self.served,
+            "dry": self.dry,
+            "refills": self.refills,
+            "fromLlm": self.from_llm,
+            "fromTemplates": self.from_templates,
+        }
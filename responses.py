@@ -0,0 +1,102 @@
+# responses.py
+import random
+
+# --- DYNAMIC SENTENCE BUILDER ---
+# This creates millions of unique responses by combining parts
+PARTS = {
+    "grandma": {
+        "police_threat": [
+            ["Oh my god,", "Beta,", "Ayyo,", "Please,"],
+            ["why police?", "I am just an old lady.", "don't hurt me.", "I am scared of police."],
+            ["I will call my son.", "I am shaking.", "My BP is high.", "I didn't do anything."]
+        ],
+        "account_lock": [
+            ["Oh no,", "Wait,", "But,", "Listen,"],
+            ["why block my account?", "I have money inside.", "don't lock it please.", "I need that account."],
+            ["I need to buy medicine.", "How will I eat?", "I will go to the branch tomorrow.", "Please keep it open."]
+        ],
+        "money_demand": [
+            ["I don't use apps.", "I have no GPay.", "Listen beta,", "I am confused."],
+            ["Can I give cash?", "I have cash at home.", "I can send by post.", "I don't know how to transfer."],
+            ["Is it safe?", "My grandson said no.", "Who are you again?", "The buttons are confusing."]
+        ],
+        "otp_demand": [
+            ["The code?", "You mean the number?", "Wait,", "Let me check."],
+            ["I can't find it.", "Is it the one on the card?", "My glasses are missing.", "It says 'Don't Share'."],
+            ["Should I tell you?", "I am reading it... wait.", "The screen went black.", "7... 5... 2... wait."]
+        ],
+        "general_confusion": [
+            ["Hello?", "Who is this?", "Can you call?", "I can't read this."],
+            ["The text is small.", "My hearing aid is broken.", "Are you the bank?", "I am tired."],
+            ["Speak louder.", "I want to sleep.", "Call my landline.", "I don't understand."]
+        ]
+    },
+    "student": {
+        "police_threat": [
+            ["Bro wait,", "Sir pls,", "Omg,", "Wait wait,"],
+            ["police for what??", "i didnt do anything fr.", "is this legit?", "my dad will kill me."],
+            ["pls dont call my college.", "can we settle this?", "i have exams tmrw.", "u r scaring me ngl."]
+        ],
+        "account_lock": [
+            ["Bro,", "Wait,", "Sir,", "Noo,"],
+            ["my account has like 200 rs only.", "why block it??", "is this legit tho?", "my scholarship comes there."],
+            ["pls dont block it.", "can u unblock it today?", "network is bad here.", "lemme ask my roommate."]
+        ],
+        "money_demand": [
+            ["Bro I'm broke,", "Sir,", "Lol,", "Wait,"],
+            ["i have like 50 rs.", "can u lend me first?", "my UPI limit is over.", "GPay is showing error."],
+            ["will i get cashback?", "is this legit?", "can i pay next month?", "my dad handles money."]
+        ],
+        "otp_demand": [
+            ["Which OTP?", "Wait,", "Bro,", "Hold on,"],
+            ["i got like 5 OTPs.", "the msg says dont share lol.", "my phone is on 2%.", "network is so slow."],
+            ["which one u want?", "is this legit tho?", "lemme check again.", "it expired i think."]
+        ],
+        "general_confusion": [
+            ["Who dis?", "Hello?", "Bro?", "Huh?"],
+            ["wrong number maybe.", "u from college?", "i dont get it.", "my net is lagging."],
+            ["text me later pls.", "is this legit?", "cant talk, in class.", "explain pls."]
+        ]
+    },
+    "angry_uncle": {
+        "police_threat": [
+            ["Excuse me!", "Listen here,", "How dare you,", "Look mister,"],
+            ["I am a government officer.", "my cousin is the SP.", "which police station are you from?", "show me your badge number."],
+            ["I will file a complaint.", "I know the rules better than you.", "give me your officer ID.", "this is harassment."]
+        ],
+        "account_lock": [
+            ["Nonsense!", "What is this?", "Listen,", "Absolutely not,"],
+            ["who authorised this block?", "I have been with this bank 30 years.", "send me an official letter.", "what is your employee code?"],
+            ["I will speak to your manager.", "this is against RBI rules.", "I will come to the branch.", "I don't trust phone calls."]
+        ],
+        "money_demand": [
+            ["Pay for what?", "Ridiculous!", "Listen here,", "One minute,"],
+            ["I don't pay strangers.", "send me a proper invoice.", "which department is this?", "under which section is this fee?"],
+            ["I want a receipt.", "I will verify with the bank first.", "my son is a lawyer.", "this smells like fraud."]
+        ],
+        "otp_demand": [
+            ["OTP?", "Are you mad?", "Listen carefully,", "See,"],
+            ["banks never ask for OTP.", "I am reading the RBI guidelines.", "why do you need my code?", "first tell me your full name."],
+            ["prove you are from the bank.", "I am noting your number.", "I will call the helpline.", "don't waste my time."]
+        ],
+        "general_confusion": [
+            ["Who is this?", "Hello?", "Speak properly,", "What?"],
+            ["identify yourself first.", "how did you get my number?", "I am a busy man.", "this is not clear."],
+            ["state your business.", "I will report this number.", "call my office.", "be quick."]
+        ]
+    }
+}
+
+def construct_response(persona, intent):
+    # Fallback to grandma if persona missing
+    p_data = PARTS.get(persona, PARTS["grandma"])
+    
+    # Get the parts for the intent
+    options = p_data.get(intent, p_data["general_confusion"])
+    
+    # Pick one from Start, Middle, End
+    part1 = random.choice(options[0])
+    part2 = random.choice(options[1])
+    part3 = random.choice(options[2])
+    
+    return f"{part1} {part2} {part3}"
@@ -0,0 +1,236 @@
+# schema.py
+# The ONE schema for honeypot.db, shared by main.py (API) and database.py (dashboard).
+# Versioned with PRAGMA user_version; migrate() applies every pending forward
+# migration in order. Old databases created by either module are converted in
+# place, moving rows in small batches so a big DB never holds one huge lock.
+#
+#   python schema.py [honeypot.db] [--batch 5000]
+import argparse
+import json
+import logging
+import sqlite3
+import textengine
+
+logger = logging.getLogger("uvicorn")
+
+DB_NAME = "honeypot.db"
+BATCH = 5000
+
+# --- 1. THE CURRENT SCHEMA ---
+# What migrate() ends up with; the migrations below carry their own copies of the DDL
+TABLES = {
+    "sessions": '''CREATE TABLE IF NOT EXISTS sessions
+                   (id TEXT PRIMARY KEY, persona TEXT, is_scam INTEGER DEFAULT 0,
+                    last_intent TEXT, start_time TEXT DEFAULT (datetime('now', 'localtime')))''',
+    # scam_label: the LLM check's verdict on a scammer message (1/0), NULL if it never judged it
+    "messages": '''CREATE TABLE IF NOT EXISTS messages
+                   (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL,
+                    role TEXT, message TEXT, timestamp TEXT DEFAULT (datetime('now', 'localtime')),
+                    scam_label INTEGER)''',
+    # UNIQUE(session_id, value) makes evidence dedupe a plain INSERT OR IGNORE
+    "evidence": '''CREATE TABLE IF NOT EXISTS evidence
+                   (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL,
+                    type TEXT, value TEXT, timestamp TEXT DEFAULT (datetime('now', 'localtime')),
+                    UNIQUE (session_id, value))''',
+    "callback_outbox": '''CREATE TABLE IF NOT EXISTS callback_outbox
+                          (session_id TEXT PRIMARY KEY, payload TEXT, final INTEGER,
+                           attempts INTEGER DEFAULT 0, next_attempt REAL, last_error TEXT)''',
+    # Where archived messages/evidence went (see archive.py); one row per compressed member
+    "archive_index": '''CREATE TABLE IF NOT EXISTS archive_index
+                        (session_id TEXT NOT NULL, segment TEXT NOT NULL, offset INTEGER NOT NULL,
+                         length INTEGER NOT NULL, messages INTEGER, evidence INTEGER, hard_evidence INTEGER,
+                         last_id INTEGER, archived_at TEXT DEFAULT (datetime('now', 'localtime')),
+                         PRIMARY KEY (session_id, segment, offset))''',
+    # Normalized identifier -> sessions that produced it (see campaigns.py)
+    "evidence_index": '''CREATE TABLE IF NOT EXISTS evidence_index
+                         (key TEXT NOT NULL, session_id TEXT NOT NULL, type TEXT, value TEXT,
+                          first_seen TEXT, last_seen TEXT, PRIMARY KEY (key, session_id)) WITHOUT ROWID''',
+}
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)",
+    "CREATE INDEX IF NOT EXISTS idx_evidence_index_session ON evidence_index (session_id)",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_start ON sessions (start_time)",
+]
+
+# --- 2. HELPERS ---
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+def _move_in_batches(conn, src, select_sql, insert_sql, batch):
+    """Move rows out of src in rowid order, one short transaction per batch.
+    Rows are deleted from src as they are copied, so an interrupted run resumes."""
+    moved = 0
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        rows = conn.execute(f"{select_sql} ORDER BY rowid LIMIT ?", (batch,)).fetchall()
+        if not rows:
+            conn.execute(f"DROP TABLE {src}")
+            conn.execute("COMMIT")
+            return moved
+        conn.executemany(insert_sql, [r[1:] for r in rows])
+        conn.execute(f"DELETE FROM {src} WHERE rowid <= ?", (rows[-1][0],))
+        conn.execute("COMMIT")
+        moved += len(rows)
+        logger.info(f"schema: moved {moved} rows out of {src}")
+
+def _intel_rows(rows):
+    # Legacy intelligence blobs -> one evidence row per value
+    for rowid, sid, data in rows:
+        try: intel = json.loads(data or "{}")
+        except ValueError: intel = {}
+        for key, values in intel.items():
+            for value in values or []:
+                yield rowid, sid, textengine.INTEL_TO_LABEL.get(key, key), value
+
+# --- 3. MIGRATIONS ---
+# Migrations spell out their own DDL: TABLES keeps changing, what shipped doesn't
+def _v1_unify(conn, batch):
+    """Merge the main.py and database.py layouts, add indexes and UNIQUE evidence."""
+    tables = [
+        '''CREATE TABLE IF NOT EXISTS sessions
+           (id TEXT PRIMARY KEY, persona TEXT, is_scam INTEGER DEFAULT 0,
+            last_intent TEXT, start_time TEXT DEFAULT (datetime('now', 'localtime')))''',
+        '''CREATE TABLE IF NOT EXISTS messages
+           (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL,
+            role TEXT, message TEXT, timestamp TEXT DEFAULT (datetime('now', 'localtime')))''',
+        '''CREATE TABLE IF NOT EXISTS evidence
+           (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL,
+            type TEXT, value TEXT, timestamp TEXT DEFAULT (datetime('now', 'localtime')),
+            UNIQUE (session_id, value))''',
+        '''CREATE TABLE IF NOT EXISTS callback_outbox
+           (session_id TEXT PRIMARY KEY, payload TEXT, final INTEGER,
+            attempts INTEGER DEFAULT 0, next_attempt REAL, last_error TEXT)''',
+    ]
+    indexes = ["CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)"]
+    conn.execute("BEGIN IMMEDIATE")
+    existing = {r[0]: r[1] or "" for r in conn.execute("SELECT name, sql FROM sqlite_master WHERE type='table'")}
+    def retire(table):
+        # Rename an old-layout table out of the way (unless a previous, interrupted run already did)
+        if "legacy_" + table not in existing:
+            conn.execute(f"ALTER TABLE {table} RENAME TO legacy_{table}")
+
+    # database.py layouts: sessions (session_id, is_scam, msg_count, persona_id),
+    # messages (sender, text) and the intelligence JSON blobs
+    if "sessions" in existing and "session_id" in _columns(conn, "sessions"):
+        retire("sessions")
+    elif "sessions" in existing and "is_scam" not in _columns(conn, "sessions"):
+        conn.execute("ALTER TABLE sessions ADD COLUMN is_scam INTEGER DEFAULT 0")
+    if "messages" in existing and "sender" in _columns(conn, "messages"):
+        retire("messages")
+    if "intelligence" in existing:
+        retire("intelligence")
+    # main.py evidence had no UNIQUE constraint (and duplicates); rebuild it
+    if "evidence" in existing and "UNIQUE" not in existing["evidence"].upper():
+        retire("evidence")
+    for sql in tables: conn.execute(sql)
+    conn.execute("COMMIT")
+
+    existing = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    if "legacy_sessions" in existing:
+        _move_in_batches(conn, "legacy_sessions",
+                         "SELECT rowid, session_id, persona_id, is_scam FROM legacy_sessions",
+                         "INSERT OR IGNORE INTO sessions (id, persona, is_scam) VALUES (?, ?, ?)", batch)
+    if "legacy_messages" in existing:
+        _move_in_batches(conn, "legacy_messages",
+                         "SELECT rowid, session_id, sender, text, timestamp FROM legacy_messages",
+                         "INSERT INTO messages (session_id, role, message, timestamp) VALUES (?, ?, ?, ?)", batch)
+    if "legacy_evidence" in existing:
+        _move_in_batches(conn, "legacy_evidence",
+                         "SELECT rowid, session_id, type, value, timestamp FROM legacy_evidence",
+                         "INSERT OR IGNORE INTO evidence (session_id, type, value, timestamp) VALUES (?, ?, ?, ?)", batch)
+    if "legacy_intelligence" in existing:
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute("SELECT rowid, session_id, data FROM legacy_intelligence ORDER BY rowid LIMIT ?",
+                                (batch,)).fetchall()
+            if not rows:
+                conn.execute("DROP TABLE legacy_intelligence")
+                conn.execute("COMMIT")
+                break
+            conn.executemany("INSERT OR IGNORE INTO evidence (session_id, type, value) VALUES (?, ?, ?)",
+                             [r[1:] for r in _intel_rows(rows)])
+            conn.execute("DELETE FROM legacy_intelligence WHERE rowid <= ?", (rows[-1][0],))
+            conn.execute("COMMIT")
+
+    for sql in indexes: conn.execute(sql)
+
+def _v2_archive(conn, batch):
+    """Archive index table, and incremental auto-vacuum so archiving actually shrinks the file."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS archive_index
+                    (session_id TEXT NOT NULL, segment TEXT NOT NULL, offset INTEGER NOT NULL,
+                     length INTEGER NOT NULL, messages INTEGER, evidence INTEGER, hard_evidence INTEGER,
+                     last_id INTEGER, archived_at TEXT DEFAULT (datetime('now', 'localtime')),
+                     PRIMARY KEY (session_id, segment, offset))''')
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        # auto_vacuum only changes on a VACUUM; a one-off full rewrite of the file
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+
+def _v3_evidence_index(conn, batch):
+    """Cross-session identifier index, backfilled from hot and archived evidence."""
+    import archive, campaigns   # both import this module
+    conn.execute('''CREATE TABLE IF NOT EXISTS evidence_index
+                    (key TEXT NOT NULL, session_id TEXT NOT NULL, type TEXT, value TEXT,
+                     first_seen TEXT, last_seen TEXT, PRIMARY KEY (key, session_id)) WITHOUT ROWID''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_evidence_index_session ON evidence_index (session_id)")
+    last = 0
+    while True:
+        rows = conn.execute("SELECT id, session_id, type, value, timestamp FROM evidence WHERE id > ? ORDER BY id LIMIT ?",
+                            (last, batch)).fetchall()
+        if not rows: break
+        conn.execute("BEGIN IMMEDIATE")
+        for _, sid, type_, value, ts in rows:
+            conn.executemany(campaigns.UPSERT, campaigns.index_rows(sid, [(type_, value)], ts))
+        conn.execute("COMMIT")
+        last = rows[-1][0]
+    archived = [r[0] for r in conn.execute("SELECT DISTINCT session_id FROM archive_index")]
+    for start in range(0, len(archived), batch):
+        conn.execute("BEGIN IMMEDIATE")
+        for sid in archived[start:start + batch]:
+            for r in archive.records(conn, sid):
+                if r["kind"] == "evidence":
+                    conn.executemany(campaigns.UPSERT, campaigns.index_rows(sid, [(r["type"], r["value"])], r["timestamp"]))
+        conn.execute("COMMIT")
+
+def _v4_scam_labels(conn, batch):
+    """Per-message scam label for training the local classifier, apart from the session flag."""
+    if "scam_label" not in _columns(conn, "messages"):
+        conn.execute("ALTER TABLE messages ADD COLUMN scam_label INTEGER")
+
+def _v5_sessions_by_start(conn, batch):
+    """Index for the dashboard's newest-first session list."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_start ON sessions (start_time)")
+
+# (version, migration) in order. Append only - never edit a shipped migration.
+MIGRATIONS = [
+    (1, _v1_unify),
+    (2, _v2_archive),
+    (3, _v3_evidence_index),
+    (4, _v4_scam_labels),
+    (5, _v5_sessions_by_start),
+]
+VERSION = MIGRATIONS[-1][0]
+
+# --- 4. ENTRY POINTS ---
+def migrate(path=DB_NAME, batch=BATCH):
+    """Bring the database at path up to VERSION. Safe to call on every startup."""
+    conn = sqlite3.connect(path, isolation_level=None, timeout=30)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+        for version, step in MIGRATIONS:
+            if version <= current: continue
+            logger.info(f"schema: migrating {path} to v{version} ({step.__name__})")
+            step(conn, batch)
+            conn.execute(f"PRAGMA user_version = {version}")
+        return max(current, VERSION)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    ap = argparse.ArgumentParser(description="Convert a honeypot database to the current schema in place.")
+    ap.add_argument("db", nargs="?", default=DB_NAME)
+    ap.add_argument("--batch", type=int, default=BATCH, help="rows moved per transaction")
+    args = ap.parse_args()
+    print(f"✅ {args.db} is at schema v{migrate(args.db, args.batch)}")
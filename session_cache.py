@@ -0,0 +1,189 @@
+# session_cache.py
+# Bounded in-memory session state in front of SQLite.
+# The hot path answers persona / message count / evidence from here; SQLite is
+# only read on a miss (new session, evicted session, or after a restart) and
+# every change is written through the storage pipeline by the caller.
+# The cache is per process: under `uvicorn --workers N` another worker may have
+# written to a session since it was cached, so anything reported outside (the
+# callback) goes through refresh(): a COUNT and the evidence rows added since.
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import archive
+
+@dataclass
+class SessionState:
+    persona: str
+    message_count: int = 0
+    evidence: dict = field(default_factory=dict)   # value -> evidence type, in insertion order
+    last_intent: str = None
+    replies: set = field(default_factory=set)       # replies already sent, so the pool never repeats one
+    evidence_id: int = 0                            # newest evidence row read from SQLite
+    last_seen: float = field(default_factory=time.monotonic)
+
+class SessionCache:
+    def __init__(self, storage, max_sessions=10000, ttl=1800.0):
+        self.storage = storage
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()   # LRU order: oldest first
+        self._loading = {}            # sid -> future, so concurrent misses share one load
+
+    def __len__(self):
+        return len(self._items)
+
+    # --- 1. LOOKUP ---
+    async def get(self, sid):
+        """Cached state for sid, rebuilt from SQLite on a miss. None if the session doesn't exist."""
+        state = self._items.get(sid)
+        if state is not None:
+            self.hits += 1
+            self._items.move_to_end(sid)
+            return state
+
+        self.misses += 1
+        if sid in self._loading:
+            return await asyncio.shield(self._loading[sid])
+        fut = asyncio.get_running_loop().create_future()
+        self._loading[sid] = fut
+        try:
+            state = await self.storage.shard(sid).read(_load, sid)
+            # A concurrent create() may have beaten the load; it wins
+            if state is not None and sid not in self._items: self._put(sid, state)
+            state = self._items.get(sid, state)
+            fut.set_result(state)
+            return state
+        except Exception as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            del self._loading[sid]
+
+    async def get_many(self, sids):
+        """{sid: state or None} for a batch; the misses are loaded with one read per shard."""
+        out, by_shard = {}, {}
+        for sid in dict.fromkeys(sids):
+            state = self._items.get(sid)
+            if state is not None:
+                self.hits += 1
+                self._items.move_to_end(sid)
+                out[sid] = state
+            else:
+                self.misses += 1
+                by_shard.setdefault(self.storage.shard(sid), []).append(sid)
+        parts = await asyncio.gather(*(shard.read(_load_many, group) for shard, group in by_shard.items()))
+        for loaded in parts:
+            for sid, state in loaded.items():
+                if state is not None and sid not in self._items: self._put(sid, state)
+                out[sid] = self._items.get(sid, state)
+        return out
+
+    async def refresh(self, sid):
+        """State with the message count and evidence as SQLite has them, other workers' writes included."""
+        state = await self.get(sid)
+        if state is None: return None
+        shard = self.storage.shard(sid)
+        await shard.flush()   # our own queued writes first, so the count is the whole session
+        count, rows = await shard.read(_delta, sid, state.evidence_id)
+        state.message_count = count
+        for id_, type_, value in rows:
+            state.evidence.setdefault(value, type_)
+            state.evidence_id = id_
+        return state
+
+    def forget(self, sid):
+        """Drop sid, e.g. after its write failed: the next get() rebuilds it from what SQLite has."""
+        self._items.pop(sid, None)
+
+    def peek(self, sid):
+        """Cached state without touching SQLite or the LRU order."""
+        return self._items.get(sid)
+
+    # --- 2. WRITE-THROUGH UPDATES ---
+    def create(self, sid, persona, intent=None):
+        state = SessionState(persona=persona, last_intent=intent)
+        self._put(sid, state)
+        return state
+
+    def record_message(self, state, intent, count=2):
+        state.message_count += count
+        state.last_intent = intent
+        state.last_seen = time.monotonic()
+
+    def new_evidence(self, state, rows):
+        """Filter (type, value) rows down to the ones this session hasn't seen, and remember them."""
+        new = []
+        for type_, value in rows:
+            if value not in state.evidence:
+                state.evidence[value] = type_
+                new.append((type_, value))
+        return new
+
+    # --- 3. EVICTION ---
+    def _put(self, sid, state):
+        self._items[sid] = state
+        self._items.move_to_end(sid)
+        self._evict()
+
+    def _evict(self):
+        cutoff = time.monotonic() - self.ttl
+        while self._items:
+            sid, state = next(iter(self._items.items()))
+            if len(self._items) <= self.max_sessions and state.last_seen >= cutoff: break
+            del self._items[sid]
+            self.evictions += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hitRate": round(self.hits / total, 3) if total else None,
+        }
+
+def _delta(conn, sid, after_id):
+    # Runs on a pooled read connection: index-only count, then only the evidence rows past after_id
+    count = conn.execute("SELECT (SELECT COUNT(*) FROM messages WHERE session_id=?) + "
+                         "(SELECT COALESCE(SUM(messages), 0) FROM archive_index WHERE session_id=?)", (sid, sid)).fetchone()[0]
+    rows = conn.execute("SELECT id, type, value FROM evidence WHERE session_id=? AND id>? ORDER BY id",
+                        (sid, after_id)).fetchall()
+    return count, rows
+
+def _load(conn, sid):
+    # Runs on a pooled read connection
+    return _load_many(conn, [sid])[sid]
+
+def _load_many(conn, sids):
+    # Runs on a pooled read connection: a handful of IN queries however many sessions there are
+    marks = ",".join("?" * len(sids))
+    states = dict.fromkeys(sids)
+    for sid, persona, last_intent in conn.execute(f"SELECT id, persona, last_intent FROM sessions WHERE id IN ({marks})", sids):
+        states[sid] = SessionState(persona=persona, last_intent=last_intent)
+    found = [sid for sid, state in states.items() if state is not None]
+    if not found: return states
+    marks = ",".join("?" * len(found))
+    # Archived rows first (see archive.py), then whatever is still hot
+    for (sid,) in conn.execute(f"SELECT DISTINCT session_id FROM archive_index WHERE session_id IN ({marks})", found).fetchall():
+        state = states[sid]
+        for _, role, message, _ in archive.load_messages(conn, sid):
+            state.message_count += 1
+            if role == "agent": state.replies.add(message)
+        for type_, value in archive.load_evidence(conn, sid):
+            state.evidence.setdefault(value, type_)
+    for sid, count in conn.execute(f"SELECT session_id, COUNT(*) FROM messages WHERE session_id IN ({marks}) "
+                                   "GROUP BY session_id", found):
+        states[sid].message_count += count
+    for id_, sid, type_, value in conn.execute(f"SELECT id, session_id, type, value FROM evidence WHERE session_id IN ({marks}) "
+                                               "ORDER BY id", found):
+        states[sid].evidence.setdefault(value, type_)
+        states[sid].evidence_id = id_
+    for sid, message in conn.execute(f"SELECT session_id, message FROM messages WHERE session_id IN ({marks}) "
+                                     "AND role='agent'", found):
+        states[sid].replies.add(message)
+    return states
@@ -0,0 +1,168 @@
+# shards.py
+# Session-sharded storage for running several uvicorn workers.
+# - sessionId -> one of N SQLite files through a consistent-hash ring, so every
+#   worker routes a given session to the same file and adding a shard only
+#   moves ~1/N of the sessions.
+# - ShardedStorage is a drop-in for Storage: storage.shard(sid) gives the
+#   owning shard's pipeline, read_all() fans a query out to every shard.
+# - With STORAGE_SHARDS=1 (the default) nothing changes: one honeypot.db.
+#
+#   python shards.py --shards 4        # move sessions to their owners after resharding
+import argparse
+import asyncio
+import bisect
+import hashlib
+import logging
+import os
+import sqlite3
+from storage import Storage
+
+logger = logging.getLogger("uvicorn")
+
+DB_NAME = "honeypot.db"
+SHARDS = int(os.environ.get("STORAGE_SHARDS", "1"))
+VNODES = 64     # points per shard on the ring; more points, more even spread
+
+# --- 1. THE RING ---
+def shard_paths(path=DB_NAME, shards=SHARDS):
+    """honeypot.db for one shard, honeypot.shard0.db ... honeypot.shardN-1.db otherwise."""
+    if shards <= 1: return [path]
+    stem, ext = os.path.splitext(path)
+    return [f"{stem}.shard{i}{ext}" for i in range(shards)]
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+class HashRing:
+    def __init__(self, nodes, vnodes=VNODES):
+        # Points are placed by the node's basename, so moving the data directory keeps the mapping
+        points = sorted((_hash(f"{os.path.basename(node)}#{i}"), node) for node in nodes for i in range(vnodes))
+        self._keys = [h for h, _ in points]
+        self._nodes = [n for _, n in points]
+        self.nodes = list(nodes)
+
+    def node_for(self, key):
+        if len(self.nodes) == 1: return self.nodes[0]
+        i = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._nodes[i]
+
+# --- 2. THE SHARDED PIPELINE ---
+class ShardedStorage:
+    def __init__(self, paths, **storage_args):
+        self.paths = list(paths)
+        self.ring = HashRing(self.paths)
+        self.shards = {path: Storage(path, **storage_args) for path in self.paths}
+
+    def shard(self, sid):
+        """The Storage that owns session sid."""
+        return self.shards[self.ring.node_for(sid)]
+
+    @property
+    def started(self):
+        return all(s.started for s in self.shards.values())
+
+    @property
+    def depth(self):
+        return sum(s.depth for s in self.shards.values())
+
+    @property
+    def pressure(self):
+        # The fullest shard decides; sessions can't spill over to another one
+        return max(s.pressure for s in self.shards.values())
+
+    @property
+    def stats(self):
+        total = {}
+        for s in self.shards.values():
+            for key, value in s.stats.items(): total[key] = total.get(key, 0) + value
+        return total
+
+    async def start(self):
+        await asyncio.gather(*(s.start() for s in self.shards.values()))
+
+    async def close(self):
+        await asyncio.gather(*(s.close() for s in self.shards.values()))
+
+    async def flush(self):
+        await asyncio.gather(*(s.flush() for s in self.shards.values()))
+
+    async def read_all(self, fn, *args):
+        """fn(conn, *args) on every shard at once; one result per shard."""
+        return await asyncio.gather(*(s.read(fn, *args) for s in self.shards.values()))
+
+def open_storage(path=DB_NAME, shards=SHARDS, **storage_args):
+    """A plain Storage for one shard, a ShardedStorage otherwise (same interface)."""
+    paths = shard_paths(path, shards)
+    if len(paths) == 1: return Storage(paths[0], **storage_args)
+    return ShardedStorage(paths, **storage_args)
+
+# --- 3. RESHARDING ---
+# Tables that hold per-session rows; messages/evidence ids are re-assigned on the new shard
+_MOVES = [
+    # Columns by name: a migrated old main.py file has is_scam last, fresh shards have it third
+    ("sessions", "INSERT OR IGNORE INTO dst.sessions (id, persona, is_scam, last_intent, start_time) "
+                 "SELECT id, persona, is_scam, last_intent, start_time FROM main.sessions WHERE id=?"),
+    ("messages", "INSERT INTO dst.messages (session_id, role, message, timestamp, scam_label) "
+                 "SELECT session_id, role, message, timestamp, scam_label FROM main.messages WHERE session_id=? ORDER BY id"),
+    ("evidence", "INSERT OR IGNORE INTO dst.evidence (session_id, type, value, timestamp) "
+                 "SELECT session_id, type, value, timestamp FROM main.evidence WHERE session_id=? ORDER BY id"),
+    ("callback_outbox", "INSERT OR REPLACE INTO dst.callback_outbox (session_id, payload, final, attempts, next_attempt, last_error) "
+                        "SELECT session_id, payload, final, attempts, next_attempt, last_error FROM main.callback_outbox WHERE session_id=?"),
+    # Segment paths are relative to the archive next to the database files, so they resolve from any shard
+    ("archive_index", "INSERT OR IGNORE INTO dst.archive_index (session_id, segment, offset, length, messages, evidence, "
+                      "hard_evidence, last_id, archived_at) SELECT session_id, segment, offset, length, messages, evidence, "
+                      "hard_evidence, last_id, archived_at FROM main.archive_index WHERE session_id=? ORDER BY rowid"),
+    # The cross-session index (see campaigns.py): also_seen and campaigns only count sessions whose rows are here
+    ("evidence_index", "INSERT INTO dst.evidence_index (key, session_id, type, value, first_seen, last_seen) "
+                       "SELECT key, session_id, type, value, first_seen, last_seen FROM main.evidence_index WHERE session_id=? "
+                       "ON CONFLICT(key, session_id) DO UPDATE SET first_seen=MIN(first_seen, excluded.first_seen), "
+                       "last_seen=MAX(last_seen, excluded.last_seen)"),
+]
+
+def rebalance(paths, sources=None):
+    """Move every session in `sources` (default: the shards themselves) that doesn't
+    live on its owner shard. Run with the API stopped."""
+    import schema
+    ring = HashRing(paths)
+    sources = sources or paths
+    for path in set(paths) | set(sources): schema.migrate(path)
+    moved = 0
+    for path in sources:
+        conn = sqlite3.connect(path, isolation_level=None, timeout=30)
+        try:
+            sids = [r[0] for r in conn.execute("SELECT id FROM sessions UNION SELECT session_id FROM messages "
+                                                "UNION SELECT session_id FROM archive_index UNION SELECT session_id FROM evidence_index")]
+            for sid in sids:
+                owner = ring.node_for(sid)
+                if owner == path: continue
+                conn.execute("ATTACH DATABASE ? AS dst", (owner,))
+                try:
+                    # One transaction per session: it is either fully here or fully there
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        for table, copy_sql in _MOVES:
+                            conn.execute(copy_sql, (sid,))
+                            key = "id" if table == "sessions" else "session_id"
+                            conn.execute(f"DELETE FROM main.{table} WHERE {key}=?", (sid,))
+                        conn.execute("COMMIT")
+                    except Exception:
+                        conn.execute("ROLLBACK")
+                        raise
+                finally:
+                    conn.execute("DETACH DATABASE dst")
+                moved += 1
+        finally:
+            conn.close()
+        logger.info(f"shards: {path} done, {moved} sessions moved so far")
+    return moved
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    ap = argparse.ArgumentParser(description="Move sessions to their owner shard after changing the shard count.")
+    ap.add_argument("--db", default=DB_NAME)
+    ap.add_argument("--shards", type=int, default=SHARDS)
+    args = ap.parse_args()
+    paths = shard_paths(args.db, args.shards)
+    # Going from one file to N: the old honeypot.db is drained into the shards too
+    sources = paths + ([args.db] if args.shards > 1 and os.path.exists(args.db) else [])
+    print(f"✅ moved {rebalance(paths, sources)} sessions across {len(paths)} shards")
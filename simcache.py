@@ -0,0 +1,137 @@
+# simcache.py
+# Near-duplicate message cache: earlier LLM verdicts for templated scam texts.
+# - normalize() lowercases and masks what campaigns vary between sends
+#   (links, UPI IDs, numbers and amounts), so "Pay Rs 4,999 to ab12@ybl" and
+#   "pay rs 500 to zz9@okaxis" become the same words.
+# - fingerprint() is a 64-bit SimHash over those words; a changed name or
+#   greeting moves a template variant a few bits, a different text ~30. The
+#   bit counting is bit-sliced (one short carry chain per word instead of 64
+#   additions), so fingerprint + lookup take tens of microseconds.
+# - LSH: the fingerprint is cut into up to 8 bands; two fingerprints within
+#   max_distance bits agree on at least one band when max_distance < bands
+#   (pigeonhole), and almost always a little beyond. Only fingerprints sharing
+#   a band bucket are compared.
+# - Bounded LRU: the least recently used verdict is evicted with its buckets.
+import hashlib
+import os
+import re
+from collections import OrderedDict
+from functools import lru_cache
+
+SIZE = int(os.environ.get("SIMCACHE_SIZE", "10000"))
+THRESHOLD = float(os.environ.get("SIMCACHE_THRESHOLD", "0.86"))  # 1 - differing bits / 64; 0.86 = 9 bits
+MIN_TOKENS = 4            # shorter texts ("ok", "who is this") are too generic to reuse a verdict for
+BITS = 64
+MAX_BANDS = 8             # narrower bands would fill every bucket with unrelated fingerprints
+_MASK = (1 << BITS) - 1
+
+# --- 1. NORMALIZATION ---
+_WORD = re.compile(r"[a-z]+")
+_DIGIT = re.compile(r"\d")
+_DOMAIN = re.compile(r"[a-z0-9-]\.[a-z]{2,}(?:/|$)")
+
+def normalize(text):
+    """Lowercased words of text, with links, UPI IDs and numbers masked."""
+    words = []
+    for token in str(text).lower().split():
+        if token.isalpha(): words.append(token)   # most tokens; skips the checks below
+        elif "@" in token: words.append("upi")
+        elif "://" in token or token.startswith("www.") or _DOMAIN.search(token): words.append("url")
+        elif _DIGIT.search(token): words.append("num")
+        else: words += _WORD.findall(token)
+    return words
+
+# --- 2. SIMHASH ---
+@lru_cache(maxsize=65536)
+def _hash(feature):
+    # Stable across processes (unlike hash()), and cached: campaign vocabulary repeats a lot
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+
+def fingerprint(text):
+    """64-bit SimHash of text, or None if it is too short to compare."""
+    features = normalize(text)
+    if len(features) < MIN_TOKENS: return None
+    # Bit-sliced counters: planes[k] holds bit k of all 64 per-position counts
+    planes = []
+    for feature in features:
+        carry = _hash(feature)
+        for k, plane in enumerate(planes):
+            planes[k] = plane ^ carry
+            carry &= plane
+            if not carry: break
+        if carry: planes.append(carry)
+    # Position i is set when its count >= half the features (compared bit-parallel, high bit first)
+    need = (len(features) + 1) // 2
+    greater, equal = 0, _MASK
+    for k in range(max(len(planes), need.bit_length()) - 1, -1, -1):
+        plane = planes[k] if k < len(planes) else 0
+        want = _MASK if need >> k & 1 else 0
+        greater |= equal & plane & ~want
+        equal &= ~(plane ^ want) & _MASK
+    return greater | equal
+
+# --- 3. THE CACHE ---
+class SimCache:
+    def __init__(self, size=SIZE, threshold=THRESHOLD):
+        self.size = size
+        self.max_distance = max(0, min(BITS - 1, int(round((1 - threshold) * BITS))))
+        bands = min(self.max_distance + 1, MAX_BANDS)
+        # Band b covers bits [edges[b], edges[b + 1]); widths differ by at most one bit
+        edges = [BITS * b // bands for b in range(bands + 1)]
+        self._bands = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(edges, edges[1:])]
+        self._entries = OrderedDict()   # fingerprint -> verdict, least recently used first
+        self._buckets = [{} for _ in self._bands]   # band value -> set of fingerprints
+        self.exact = 0
+        self.near = 0
+        self.misses = 0
+        self.skipped = 0
+
+    def _keys(self, fp):
+        return [(fp >> lo) & mask for lo, mask in self._bands]
+
+    def get(self, fp):
+        """Verdict of the closest cached fingerprint within the threshold, or None."""
+        if fp is None:
+            self.skipped += 1
+            return None
+        verdict = self._entries.get(fp)
+        if verdict is not None:
+            self._entries.move_to_end(fp)
+            self.exact += 1
+            return verdict
+        best, best_distance = None, self.max_distance + 1
+        for buckets, key in zip(self._buckets, self._keys(fp)):
+            for other in buckets.get(key, ()):
+                distance = (fp ^ other).bit_count()
+                if distance < best_distance: best, best_distance = other, distance
+        if best is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(best)
+        self.near += 1
+        return self._entries[best]
+
+    def put(self, fp, verdict):
+        if fp is None: return
+        if fp in self._entries:
+            self._entries[fp] = verdict
+            self._entries.move_to_end(fp)
+            return
+        self._entries[fp] = verdict
+        for buckets, key in zip(self._buckets, self._keys(fp)):
+            buckets.setdefault(key, set()).add(fp)
+        while len(self._entries) > self.size:
+            old, _ = self._entries.popitem(last=False)
+            for buckets, key in zip(self._buckets, self._keys(old)):
+                bucket = buckets[key]
+                bucket.discard(old)
+                if not bucket: del buckets[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.exact + self.near + self.misses
+        return {"size": len(self._entries), "maxDistance": self.max_distance, "exactHits": self.exact,
+                "nearHits": self.near, "misses": self.misses, "skipped": self.skipped,
+                "hitRate": round((self.exact + self.near) / lookups, 4) if lookups else None}
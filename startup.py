@@ -0,0 +1,117 @@
+# startup.py
+# Cold-start support for scale-to-zero deployments.
+# - step(name) times each one-time init step of the lifespan hook; ready()
+#   logs the total and report() returns it (also under /dashboard stats).
+# - prewarm(warmups) runs warm-ups (deferred imports, HTTP/LLM clients, read
+#   connections, hot sessions) once the server is already accepting traffic,
+#   so the first scammer only waits for what their own request needs.
+# - python startup.py is the profiler: import time per module (from
+#   python -X importtime) plus every init step and the first replies.
+#
+#   python startup.py [--top 15]
+import asyncio
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("uvicorn")
+
+PREWARM = os.environ.get("SENTINEL_PREWARM", "1") != "0"
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+_t0 = time.perf_counter()   # main imports this first, so this is where our imports start
+_steps = {}                 # name -> seconds, in order
+_ready_at = None
+
+# --- 1. TIMING THE INIT ---
+@contextmanager
+def step(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _steps[name] = time.perf_counter() - start
+
+def ready():
+    global _ready_at
+    _ready_at = time.perf_counter()
+    init = sum(_steps.values())
+    logger.info(f"🚀 Ready in {_ready_at - _t0:.3f}s (init {init:.3f}s: "
+                + ", ".join(f"{name} {sec * 1000:.0f}ms" for name, sec in _steps.items()) + ")")
+
+def report():
+    return {"readySeconds": round(_ready_at - _t0, 4) if _ready_at else None,
+            "stepsMs": {name: round(sec * 1000, 2) for name, sec in _steps.items()}}
+
+# --- 2. BACKGROUND PREWARM ---
+async def prewarm(warmups):
+    """Run (name, fn) warm-ups one by one; sync ones in a thread. Failures only cost the warm-up."""
+    if not PREWARM: return
+    for name, fn in warmups:
+        with step(f"prewarm.{name}"):
+            try:
+                if asyncio.iscoroutinefunction(fn): await fn()
+                else: await asyncio.to_thread(fn)
+            except Exception as e:
+                logger.warning(f"Prewarm {name} failed: {e}")
+
+# --- 3. THE PROFILER ---
+def import_profile(module="main"):
+    """[(module, cumulative seconds)] of everything `module` imports directly, slowest first, and the total."""
+    import subprocess
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=HERE,
+                         capture_output=True, text=True).stderr
+    children = []
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "|" not in line: continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit(): continue   # the header line
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        seconds = int(cumulative) / 1e6
+        # A module is printed after everything it imported, one level deeper
+        if depth == 1: children.append((name.strip(), seconds))
+        elif depth == 0:
+            if name.strip() == module: return sorted(children, key=lambda r: -r[1]), seconds
+            children = []
+    return [], 0.0
+
+async def _lifespan_profile():
+    import httpx
+    start = time.perf_counter()
+    import main
+    imported = time.perf_counter() - start
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://profile") as client:
+            first = []
+            for text in ("Your account is blocked, share OTP now", "Pay 500 to verify@ybl"):
+                start = time.perf_counter()
+                await client.post("/api/chat", json={"sessionId": "startup-profile", "message": {"text": text}})
+                first.append(time.perf_counter() - start)
+        await main.warmup
+    return imported, first, main.startup.report()   # this file runs as __main__, main has its own copy
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+    ap = argparse.ArgumentParser(description="Where the honeypot's cold start goes.")
+    ap.add_argument("--top", type=int, default=15, help="modules to list")
+    args = ap.parse_args()
+
+    rows, total = import_profile()
+    print(f"📦 import main: {total * 1000:.0f}ms (fresh interpreter)")
+    for name, sec in rows[:args.top]:
+        print(f"   {name:<28}{sec * 1000:>9.1f}ms")
+
+    logging.basicConfig(level=logging.ERROR)
+    os.environ.setdefault("SENTINEL_LLM_BACKEND", "off")
+    os.environ.setdefault("CALLBACK_WINDOW", "3600")   # no GUVI callback during the run
+    sys.path.insert(0, HERE)
+    os.chdir(tempfile.mkdtemp(prefix="sentinel-startup-"))   # cold database, nothing cached
+    imported, first, result = asyncio.run(_lifespan_profile())
+    print(f"⚙️  init (lifespan), after import {imported * 1000:.0f}ms in this process:")
+    for name, ms in result["stepsMs"].items():
+        print(f"   {name:<28}{ms:>9.1f}ms")
+    print(f"💬 first reply {first[0] * 1000:.1f}ms, second {first[1] * 1000:.1f}ms")
@@ -0,0 +1,204 @@
+# storage.py
+# Single-writer SQLite pipeline.
+# All writes go through ONE long-lived WAL connection owned by a dedicated thread.
+# Requests are fed through a bounded asyncio queue and group-committed
+# (many requests per transaction). Reads use a small pool of read-only connections.
+# Nothing here ever runs disk I/O on the event loop.
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+
+logger = logging.getLogger("uvicorn")
+
+DB_NAME = "honeypot.db"
+
+# --- 1. CONNECTIONS ---
+def connect(path, readonly=False):
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=5, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    if readonly:
+        conn.execute("PRAGMA query_only=1")
+    return conn
+
+# --- 2. THE WRITER PIPELINE ---
+class Storage:
+    def __init__(self, path=DB_NAME, readers=4, queue_size=10000, max_batch=256):
+        self.path = path
+        self.readers = readers
+        self.queue_size = queue_size
+        self.max_batch = max_batch
+        self.stats = {"ops": 0, "batches": 0, "errors": 0, "rows": 0}
+        self.label = os.path.basename(path)   # metrics label, one series per shard
+        self._queue = None
+        self._writer_task = None
+        self._writer_pool = None
+        self._reader_pool = None
+        self._writer_conn = None
+        self._local = threading.local()
+        self._reader_conns = []
+        self._lock = threading.Lock()
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def started(self):
+        return self._writer_task is not None and not self._writer_task.done()
+
+    @property
+    def depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def pressure(self):
+        # Queue fill, 0..1; admission.py degrades before write_many starts blocking
+        return self.depth / self.queue_size
+
+    def shard(self, sid):
+        # Same interface as shards.ShardedStorage; a single file owns every session
+        return self
+
+    async def start(self):
+        if self.started: return
+        async with self._start_lock:
+            if self.started: return
+            loop = asyncio.get_running_loop()
+            self._writer_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+            self._reader_pool = ThreadPoolExecutor(max_workers=self.readers, thread_name_prefix="sqlite-reader")
+            self._writer_conn = await loop.run_in_executor(self._writer_pool, connect, self.path)
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._writer_task = asyncio.create_task(self._run_writer())
+
+    async def close(self):
+        if not self.started: return
+        await self._queue.put(None)
+        await self._writer_task
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._writer_pool, self._writer_conn.close)
+        self._writer_pool.shutdown(wait=True)
+        self._reader_pool.shutdown(wait=True)
+        with self._lock:
+            for conn in self._reader_conns: conn.close()
+            self._reader_conns.clear()
+        self._local = threading.local()
+        self._writer_task = None
+
+    async def _run_writer(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            op = await self._queue.get()
+            if op is None: return
+            batch = [op]
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    nxt = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+
+            started = time.perf_counter()
+            for _, _, queued in batch:
+                metrics.DB_QUEUE_WAIT.observe(started - queued, self.label)
+            try:
+                results = await loop.run_in_executor(self._writer_pool, self._commit, [fn for fn, _, _ in batch])
+            except Exception as e:
+                # The whole transaction failed (disk full, db locked past busy_timeout ...)
+                logger.error(f"Storage commit failed: {e}")
+                metrics.swallowed("storage.commit")
+                self.stats["errors"] += len(batch)
+                results = [e] * len(batch)
+
+            for (_, fut, _), res in zip(batch, results):
+                if fut is None or fut.done(): continue
+                if isinstance(res, Exception): fut.set_exception(res)
+                else: fut.set_result(res)
+            if stop: return
+
+    def _commit(self, fns):
+        # Runs on the writer thread. Each request gets its own SAVEPOINT so one
+        # bad statement can't roll back the rest of the group.
+        conn = self._writer_conn
+        results = []
+        start = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        metrics.DB_LOCK_WAIT.observe(time.perf_counter() - start, self.label)
+        try:
+            for fn in fns:
+                conn.execute("SAVEPOINT op")
+                try:
+                    results.append(fn(conn))
+                    conn.execute("RELEASE op")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO op")
+                    conn.execute("RELEASE op")
+                    logger.error(f"Storage write failed: {e}")
+                    metrics.swallowed("storage.write")
+                    self.stats["errors"] += 1
+                    results.append(e)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        metrics.DB_COMMIT.observe(time.perf_counter() - start, self.label)
+        self.stats["rows"] = conn.total_changes   # rows inserted/updated/deleted so far
+        self.stats["ops"] += len(fns)
+        self.stats["batches"] += 1
+        return results
+
+    async def submit(self, fn, wait=False, then=None):
+        """Queue fn(conn) for the writer. With wait=True, returns fn's result after commit.
+        then(result) runs on the event loop once fn is committed, without making the caller wait."""
+        await self.start()
+        fut = asyncio.get_running_loop().create_future() if wait or then else None
+        if then is not None:
+            fut.add_done_callback(lambda f: f.cancelled() or f.exception() or then(f.result()))
+        await self._queue.put((fn, fut, time.perf_counter()))
+        if wait:
+            return await fut
+
+    async def write(self, sql, params=(), wait=False):
+        return await self.submit(lambda conn: conn.execute(sql, params).rowcount, wait=wait)
+
+    async def write_many(self, statements, wait=False, then=None):
+        """Run several (sql, params) pairs in the same transaction. The result is each statement's lastrowid."""
+        def run(conn):
+            return [conn.execute(sql, params).lastrowid for sql, params in statements]
+        return await self.submit(run, wait=wait, then=then)
+
+    async def flush(self):
+        """Wait until everything queued so far is committed."""
+        await self.submit(lambda conn: None, wait=True)
+
+    # --- 3. THE READ POOL ---
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.path, readonly=True)
+            self._local.conn = conn
+            with self._lock: self._reader_conns.append(conn)
+        return conn
+
+    async def read(self, fn, *args):
+        """Run fn(conn, *args) on a pooled read connection."""
+        await self.start()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._reader_pool, lambda: fn(self._reader(), *args))
+
+    async def read_all(self, fn, *args):
+        """fn(conn, *args) on every shard; here that's just this one."""
+        return [await self.read(fn, *args)]
+
+    async def fetchone(self, sql, params=()):
+        return await self.read(lambda conn: conn.execute(sql, params).fetchone())
+
+    async def fetchall(self, sql, params=()):
+        return await self.read(lambda conn: conn.execute(sql, params).fetchall())
@@ -0,0 +1,15 @@
+# tests/conftest.py
+import asyncio
+import pytest
+import schema
+
+@pytest.fixture
+def db(tmp_path):
+    """A fresh honeypot database at the current schema."""
+    path = str(tmp_path / "honeypot.db")
+    schema.migrate(path)
+    return path
+
+@pytest.fixture
+def run():
+    return asyncio.run
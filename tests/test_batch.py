@@ -0,0 +1,43 @@
+# tests/test_batch.py
+# POST /api/batch: results come back in order and a bad item fails alone,
+# whether it is malformed or its write fails.
+import sqlite3
+import httpx
+import llm
+from llm import FakeBackend, LLMClient
+
+def test_bad_items_fail_alone(tmp_path, monkeypatch, run):
+    monkeypatch.chdir(tmp_path)
+    import main
+    monkeypatch.setattr(llm, "_client", LLMClient(FakeBackend(latency=0)))
+    checked = []
+    monkeypatch.setattr(main, "confirm_later", lambda sid, text, *args: checked.append((sid, text)))
+    insert_evidence = main._insert_evidence
+    def failing_for_bad(sid, extracted, indexed, timestamp):
+        run_ = insert_evidence(sid, extracted, indexed, timestamp)
+        def run_or_fail(conn):
+            run_(conn)
+            if sid == "bad": raise sqlite3.IntegrityError("constraint failed")
+        return run_or_fail
+    monkeypatch.setattr(main, "_insert_evidence", failing_for_bad)
+
+    items = [{"sessionId": "good", "message": {"text": "pay 500 to boss@ybl"}},
+             {"message": {"text": "no session"}},
+             {"sessionId": "bad", "message": {"text": "pay 500 to other@ybl"}},
+             {"sessionId": "good", "message": {"text": 12345}}]
+    async def batch():
+        async with main.lifespan(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                resp = await client.post("/api/batch", json=items)
+                assert main.sessions.peek("bad") is None   # no in-memory turn the database doesn't have
+                return resp.json()["results"]
+    results = run(batch())
+    assert [r["status"] for r in results] == ["success", "error", "error", "success"]
+    assert results[1]["error"] == "missing sessionId" and results[2]["error"] == "storage unavailable"
+    assert checked == [("good", "pay 500 to boss@ybl"), ("good", "12345")]
+
+    conn = sqlite3.connect(str(tmp_path / "honeypot.db"))
+    assert conn.execute("SELECT session_id, message FROM messages WHERE role='scammer' ORDER BY id").fetchall() == [
+        ("good", "pay 500 to boss@ybl"), ("good", "12345")]
+    assert conn.execute("SELECT session_id, value FROM evidence").fetchall() == [("good", "boss@ybl")]
@@ -0,0 +1,60 @@
+# tests/test_classifier.py
+# The classifier learns from the LLM check's per-message labels, not from the
+# session flag the keywords and the classifier itself raise.
+import sqlite3
+import httpx
+import archive
+import classifier
+import llm
+from llm import FakeBackend, LLMClient
+
+def test_only_llm_labelled_messages_are_examples(db):
+    conn = sqlite3.connect(db)
+    conn.execute("INSERT INTO sessions (id, persona, is_scam) VALUES ('s1', 'grandma', 1)")
+    conn.executemany("INSERT INTO messages (session_id, role, message, timestamp, scam_label) VALUES ('s1', ?, ?, '2026-01-01 10:00:00', ?)",
+                     [("scammer", "hello madam", None), ("agent", "who is this", None),
+                      ("scammer", "send otp now", 1), ("scammer", "ok bye", 0)])
+    conn.commit()
+    conn.close()
+    assert classifier.load_examples(db) == [("s1", "send otp now", True), ("s1", "ok bye", False)]
+
+    archive.compact(db, idle_hours=1)
+    assert sqlite3.connect(db).execute("SELECT COUNT(*) FROM messages").fetchone()[0] == 0
+    assert classifier.load_examples(db) == [("s1", "send otp now", True), ("s1", "ok bye", False)]
+
+def test_llm_check_labels_the_message(tmp_path, monkeypatch, run):
+    monkeypatch.chdir(tmp_path)
+    import main
+    answer = lambda prompt: "SCAM" if "zebra" in prompt.splitlines()[0] else "SAFE"   # the judged message only
+    monkeypatch.setattr(llm, "_client", LLMClient(FakeBackend(latency=0, handler=answer)))
+
+    async def chat():
+        async with main.lifespan(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                for text in ("the zebra crossing is near", "lovely weather in the hills"):
+                    await client.post("/api/chat", json={"sessionId": "s1", "message": {"text": text}})
+                    await main.work.close()   # let this turn's check run before the next turn
+                    await main.work.start()
+    run(chat())
+    conn = sqlite3.connect(str(tmp_path / "honeypot.db"))
+    assert conn.execute("SELECT message, scam_label FROM messages WHERE role='scammer' ORDER BY id").fetchall() == [
+        ("the zebra crossing is near", 1), ("lovely weather in the hills", 0)]
+
+def test_audit_sample_labels_messages_the_keywords_settled(tmp_path, monkeypatch, run):
+    monkeypatch.chdir(tmp_path)
+    import main
+    monkeypatch.setattr(llm, "_client", LLMClient(FakeBackend(latency=0, handler=lambda prompt: "SAFE")))
+    monkeypatch.setattr(classifier, "LABEL_SAMPLE", 1)   # every message is in the sample
+
+    async def chat():
+        async with main.lifespan(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                await client.post("/api/chat", json={"sessionId": "audit", "message": {"text": "urgent: share otp or account blocked"}})
+                await main.work.close()
+    run(chat())
+    conn = sqlite3.connect(str(tmp_path / "honeypot.db"))
+    # The keywords flagged it; the model's answer is still the label
+    assert conn.execute("SELECT scam_label FROM messages WHERE role='scammer'").fetchall() == [(0,)]
+    assert conn.execute("SELECT is_scam FROM sessions").fetchall() == [(1,)]
@@ -0,0 +1,52 @@
+# tests/test_context.py
+# The rolling context stays within its token budget, and the LLM scam check's
+# prompt stays bounded however long the conversation gets.
+import random
+import string
+import httpx
+import llm
+from context import ConversationContext, estimate_tokens
+from llm import FakeBackend, LLMClient
+
+def test_window_stays_within_budget_and_summarizes_the_rest():
+    ctx = ConversationContext(token_budget=50)
+    for i in range(1, 41):
+        ctx.add(i, "scammer" if i % 2 else "agent", f"message {i}: pay to fraud{i}@ybl for the police case")
+    assert ctx.tokens <= 50 and ctx.window
+    assert ctx.older == 40 - len(ctx.window)
+    summary = ctx.history()[0]
+    assert summary["sender"] == "earlier" and "police_threat" in summary["text"] and "fraud1@ybl" in summary["text"]
+
+def test_newest_message_is_kept_even_over_budget():
+    ctx = ConversationContext(token_budget=5)
+    ctx.add(1, "scammer", "x" * 400)
+    assert len(ctx.window) == 1
+
+def test_scam_check_prompt_is_bounded(tmp_path, monkeypatch, run):
+    monkeypatch.chdir(tmp_path)
+    import main
+    prompts = []
+    def answer(prompt):
+        if prompt.startswith("Analyze intent"): prompts.append(prompt)
+        return "SAFE"
+    monkeypatch.setattr(llm, "_client", LLMClient(FakeBackend(latency=0, handler=answer)))
+
+    async def chat():
+        async with main.lifespan(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                for i in range(15):
+                    # Different words every turn, so the verdict cache doesn't answer for the model
+                    rng = random.Random(i)
+                    text = " ".join("".join(rng.choice(string.ascii_lowercase) for _ in range(5)) for _ in range(120))
+                    resp = await client.post("/api/chat", json={"sessionId": "long", "message": {"text": text}})
+                    assert resp.status_code == 200
+                    await main.work.close()   # let this turn's check run before the next turn
+                    await main.work.start()
+    run(chat())
+    assert len(prompts) == 15
+    assert "Earlier in the chat" not in prompts[0]
+    budget = main.contexts.token_budget
+    # The judged message + the bounded window (one message may overshoot) + a one-line summary
+    assert all(estimate_tokens(p) < budget + 3 * 200 for p in prompts)
+    assert "earlier messages" in prompts[-1]
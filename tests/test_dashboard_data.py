@@ -0,0 +1,38 @@
+# tests/test_dashboard_data.py
+# Whole-table aggregates are recomputed on a timer, not on every commit the API
+# makes; the session list reads an index instead of sorting the table.
+import sqlite3
+import campaigns
+from dashboard_data import DashboardData
+
+def link(db, sid, upi):
+    conn = sqlite3.connect(db)
+    conn.executemany(campaigns.UPSERT, campaigns.index_rows(sid, [("UPI ID", upi)], "2026-01-01 10:00:00"))
+    conn.commit()
+    conn.close()
+
+def test_campaigns_refresh_on_a_timer(db):
+    link(db, "s1", "boss@ybl")
+    link(db, "s2", "boss@ybl")
+    data = DashboardData(db, campaign_refresh=3600)
+    assert [c["sessions"] for c in data.campaigns()] == [["s1", "s2"]]
+
+    link(db, "s3", "boss@ybl")   # a commit between dashboard reruns
+    assert [c["sessions"] for c in data.campaigns()] == [["s1", "s2"]]
+    data.campaign_refresh = 0
+    assert [c["sessions"] for c in data.campaigns()] == [["s1", "s2", "s3"]]
+
+def test_metrics_refresh_on_a_timer(db):
+    data = DashboardData(db, aggregate_refresh=3600)
+    assert data.metrics()["sessions"] == 0
+    conn = sqlite3.connect(db)
+    conn.execute("INSERT INTO sessions (id, persona) VALUES ('s1', 'grandma')")
+    conn.commit()
+    assert data.metrics()["sessions"] == 0 and data.sessions_page()[0][0] == "s1"
+    data.aggregate_refresh = 0
+    assert data.metrics()["sessions"] == 1
+
+def test_session_page_does_not_sort_the_table(db):
+    plan = sqlite3.connect(db).execute("EXPLAIN QUERY PLAN SELECT id, persona, last_intent, start_time FROM sessions "
+                                       "ORDER BY start_time DESC, rowid DESC LIMIT 50").fetchall()
+    assert [row[3] for row in plan] == ["SCAN sessions USING INDEX idx_sessions_start"]
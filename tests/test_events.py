@@ -0,0 +1,50 @@
+# tests/test_events.py
+# The dashboard's LiveFeed keeps a bounded number of sessions, and never vouches
+# for events of a session it dropped. EventBus.close() ends open streams.
+import asyncio
+import signal
+from events import EventBus, LiveFeed
+
+def feed(monkeypatch, **kwargs):
+    monkeypatch.setattr(LiveFeed, "_run", lambda self: None)   # no stream; events are applied by hand
+    f = LiveFeed("http://api.test/events", **kwargs)
+    f.connected = True
+    f._apply(0, "reset", {})
+    return f
+
+def test_least_recently_active_sessions_are_dropped(monkeypatch):
+    f = feed(monkeypatch, per_session=10, max_sessions=3)
+    for i, sid in enumerate(["a", "b", "c", "a", "d"], start=1):
+        f._apply(i, "message", {"sessionId": sid})
+    assert list(f._events) == ["c", "a", "d"]
+    assert [e[0] for e in f.since("a", 0)] == [1, 4]
+    assert f.since("b", 0) is None   # dropped: reload from the database
+    assert f.since("b", 2) == []     # nothing it had was newer than the cursor
+
+def test_dropped_session_coming_back_reloads(monkeypatch):
+    f = feed(monkeypatch, max_sessions=1)
+    f._apply(1, "message", {"sessionId": "a"})
+    f._apply(2, "message", {"sessionId": "b"})
+    f._apply(3, "message", {"sessionId": "a"})
+    assert f.since("a", 0) is None
+    assert [e[0] for e in f.since("a", 2)] == [3]
+    assert len(f._events) == 1
+
+def test_close_ends_open_streams_without_touching_signals(run):
+    handlers = signal.getsignal(signal.SIGINT), signal.getsignal(signal.SIGTERM)
+    async def scenario():
+        bus = EventBus()
+        stream = bus.stream()
+        chunks = [await stream.__anext__(), await stream.__anext__()]   # retry, then reset (no Last-Event-ID)
+        reader = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.01)
+        bus.publish("message", "s1", message="hi")
+        chunks.append(await reader)
+        bus.close()
+        rest = [chunk async for chunk in stream]
+        return chunks, rest, bus.stats()["subscribers"]
+    chunks, rest, subscribers = run(scenario())
+    assert chunks[0].startswith("retry:") and "event: reset" in chunks[1] and '"message": "hi"' in chunks[2]
+    assert rest == []
+    assert subscribers == 0
+    assert (signal.getsignal(signal.SIGINT), signal.getsignal(signal.SIGTERM)) == handlers
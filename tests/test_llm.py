@@ -0,0 +1,99 @@
+# tests/test_llm.py
+# The shared LLM client against the local FakeBackend: deadlines, the
+# concurrency cap, error handling, and logic.py's fallbacks through set_llm().
+import asyncio
+import pytest
+import llm
+import logic
+from llm import FakeBackend, LLMClient
+
+@pytest.fixture(autouse=True)
+def restore_client():
+    saved = llm._client, llm._broken
+    yield
+    llm._client, llm._broken = saved
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_generate_returns_the_backend_text():
+    client = LLMClient(FakeBackend(latency=0, handler=lambda prompt: f"echo {prompt}"))
+    assert run(client.generate("hi")) == "echo hi"
+    assert client.stats()["calls"] == 1
+
+def test_timeout_falls_back_to_none():
+    client = LLMClient(FakeBackend(latency=0.5), budget=0.02)
+    assert run(client.generate("slow")) is None
+    assert client.timeouts == 1 and client.errors == 0
+
+def test_explicit_timeout_overrides_budget():
+    client = LLMClient(FakeBackend(latency=0.05, handler=lambda p: "ok"), budget=0.01)
+    assert run(client.generate("x", timeout=1.0)) == "ok"
+
+def test_backend_error_returns_none():
+    def boom(prompt): raise RuntimeError("quota exceeded")
+    client = LLMClient(FakeBackend(latency=0, handler=boom))
+    assert run(client.generate("x")) is None
+    assert client.errors == 1 and client.in_flight == 0
+
+def test_concurrency_cap():
+    peak = []
+    client = LLMClient(FakeBackend(latency=0.02, handler=lambda p: peak.append(client.in_flight) or "ok"),
+                       max_concurrency=2)
+    async def burst():
+        return await asyncio.gather(*(client.generate(str(i), timeout=5) for i in range(8)))
+    assert run(burst()) == ["ok"] * 8
+    assert max(peak) == 2 and client.in_flight == 0
+
+def test_waiting_for_a_slot_counts_against_the_deadline():
+    client = LLMClient(FakeBackend(latency=0.2, handler=lambda p: "ok"), max_concurrency=1)
+    async def two():
+        return await asyncio.gather(client.generate("a", timeout=0.3), client.generate("b", timeout=0.3))
+    assert run(two()) == ["ok", None]   # the second waited 0.2s for the slot
+    assert client.timeouts == 1
+
+def test_detect_scam_uses_the_installed_client():
+    backend = FakeBackend(latency=0)
+    llm.set_llm(LLMClient(backend))
+    assert run(logic.detect_scam("Your card is blocked, pay the release fee now please")) is True
+    assert run(logic.detect_scam("See you at the family dinner on sunday evening then")) is False
+    assert backend.calls == 2
+
+def test_detect_scam_failure_defaults_to_scam_and_is_not_cached():
+    def boom(prompt): raise RuntimeError("down")
+    backend = FakeBackend(latency=0, handler=boom)
+    llm.set_llm(LLMClient(backend))
+    text = "hello grandma it is me your favourite grandson calling"
+    assert run(logic.detect_scam(text)) is True
+    assert run(logic.detect_scam(text)) is True
+    assert backend.calls == 2
+
+def test_failed_backend_build_is_not_retried(monkeypatch):
+    built = []
+    class Broken:
+        def __init__(self, key):
+            built.append(key)
+            raise ImportError("No module named 'google.genai'")
+    monkeypatch.setattr(llm, "BACKEND", "gemini")
+    monkeypatch.setattr(llm, "API_KEY", "key")
+    monkeypatch.setattr(llm, "GeminiBackend", Broken)
+    llm._client, llm._broken = None, False
+    assert llm.get_llm() is None and llm.get_llm() is None
+    assert built == ["key"]
+    assert not llm.configured()
+
+def test_client_is_built_off_the_event_loop(monkeypatch):
+    import threading
+    built = []
+    class Slow:
+        def __init__(self, key):
+            built.append(threading.current_thread())   # stands in for the google-genai import
+        async def generate(self, prompt):
+            return "SAFE"
+    monkeypatch.setattr(llm, "BACKEND", "gemini")
+    monkeypatch.setattr(llm, "API_KEY", "key")
+    monkeypatch.setattr(llm, "GeminiBackend", Slow)
+    llm._client, llm._broken = None, False
+    assert llm.configured() and llm.current() is None and not built
+    assert run(logic.detect_scam("hello there", classify=False)) is False
+    assert len(built) == 1 and built[0] is not threading.main_thread()
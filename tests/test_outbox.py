@@ -0,0 +1,103 @@
+# tests/test_outbox.py
+# Callback coalescing, idle final reports, and pending callbacks surviving a restart.
+import asyncio
+from outbox import Outbox
+from storage import Storage
+
+class FakeHTTP:
+    def __init__(self):
+        self.bodies = []
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        self.bodies.append(data)
+        return self
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+def make_outbox(storage, sent, **kwargs):
+    async def build_payload(sid, final):
+        sent.append((sid, final))
+        return {"sessionId": sid, "final": final}
+    outbox = Outbox(storage, build_payload, url="http://callback.test", **kwargs)
+    outbox._http = FakeHTTP()   # http() hands this out instead of a requests session
+    return outbox
+
+def test_notifies_coalesce_into_one_callback(db, run):
+    sent = []
+    async def scenario():
+        storage = Storage(db)
+        await storage.start()
+        outbox = make_outbox(storage, sent, window=0.05, idle_after=60)
+        for _ in range(5): await outbox.notify("s1")
+        await asyncio.sleep(0.3)
+        await outbox.close()
+        await storage.close()
+    run(scenario())
+    assert sent == [("s1", False)]
+
+def test_session_active_at_shutdown_still_gets_its_final_report(db, run):
+    sent = []
+    async def first_run():
+        storage = Storage(db)
+        await storage.start()
+        outbox = make_outbox(storage, sent, window=60, idle_after=60)
+        await outbox.notify("s1")
+        await outbox.close()   # nothing sent yet; the session is persisted as pending
+        await storage.close()
+
+    async def after_restart():
+        storage = Storage(db)
+        await storage.start()
+        outbox = make_outbox(storage, sent, window=0.01, idle_after=0.2)
+        await outbox.start()
+        assert outbox.stats()["activeSessions"] == 1
+        await asyncio.sleep(0.6)
+        await outbox.close()
+        rows = await storage.fetchall("SELECT session_id FROM callback_outbox")
+        await storage.close()
+        return rows
+
+    run(first_run())
+    assert sent == []
+    assert run(after_restart()) == []
+    assert sent == [("s1", False), ("s1", True)]
+
+def test_active_session_is_reported_once_it_goes_idle(db, run):
+    sent = []
+    async def scenario():
+        storage = Storage(db)
+        await storage.start()
+        outbox = make_outbox(storage, sent, window=0.01, idle_after=0.3)
+        for sid in ("s1", "s2"): await outbox.notify(sid)
+        for _ in range(4):   # s1 keeps talking, so its idle deadline moves
+            await asyncio.sleep(0.1)
+            await outbox.notify("s1")
+        done_early = sorted(sid for sid, final in sent if final)
+        await asyncio.sleep(0.6)
+        await outbox.close()
+        await storage.close()
+        return done_early
+    assert run(scenario()) == ["s2"]
+    assert sorted(sid for sid, final in sent if final) == ["s1", "s2"]
+
+def test_wake_up_does_not_scan_every_active_session(db, run):
+    async def scenario():
+        storage = Storage(db)
+        await storage.start()
+        outbox = make_outbox(storage, [], window=60, idle_after=60)
+        for i in range(20000): await outbox.notify(f"s{i}")
+        await asyncio.sleep(0)
+        heaps = len(outbox._due_heap), len(outbox._idle_heap)
+        for _ in range(1000): await outbox.notify("s0")   # a busy session doesn't grow the heaps
+        await asyncio.sleep(0)
+        grown = len(outbox._due_heap) - heaps[0], len(outbox._idle_heap) - heaps[1]
+        outbox._stopping = True
+        outbox._wake.set()
+        await outbox._runner
+        await storage.close()
+        return heaps, grown
+    assert run(scenario()) == ((20000, 20000), (0, 0))
@@ -0,0 +1,61 @@
+# tests/test_schema.py
+# Versioned migrations: a fresh file, and the two layouts the old code created.
+import sqlite3
+import schema
+
+def columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+def test_fresh_database_matches_the_current_schema(db):
+    expected = sqlite3.connect(":memory:")
+    for sql in schema.TABLES.values(): expected.execute(sql)
+    conn = sqlite3.connect(db)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == schema.VERSION
+    for table in schema.TABLES:
+        assert columns(conn, table) == columns(expected, table), table
+    indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index' AND name LIKE 'idx_%'")}
+    assert indexes == {"idx_messages_session", "idx_evidence_index_session", "idx_sessions_start"}
+
+def test_v1_creates_what_it_shipped_with():
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    schema._v1_unify(conn, schema.BATCH)
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    assert tables == {"sessions", "messages", "evidence", "callback_outbox", "sqlite_sequence"}
+
+def test_old_main_py_layout(tmp_path):
+    path = str(tmp_path / "honeypot.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE sessions (id TEXT PRIMARY KEY, persona TEXT, last_intent TEXT, start_time TEXT)")
+    conn.execute("CREATE TABLE messages (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT, role TEXT, message TEXT, timestamp TEXT)")
+    conn.execute("CREATE TABLE evidence (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT, type TEXT, value TEXT, timestamp TEXT)")
+    conn.execute("INSERT INTO sessions VALUES ('s1', 'grandma', 'otp_demand', 't0')")
+    conn.execute("INSERT INTO messages (session_id, role, message, timestamp) VALUES ('s1', 'scammer', 'otp?', 't1')")
+    conn.executemany("INSERT INTO evidence (session_id, type, value, timestamp) VALUES ('s1', 'UPI ID', 'a@ybl', ?)",
+                     [("t1",), ("t2",)])
+    conn.commit()
+    conn.close()
+
+    assert schema.migrate(path) == schema.VERSION
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT id, persona, is_scam, last_intent FROM sessions").fetchall() == [("s1", "grandma", 0, "otp_demand")]
+    assert conn.execute("SELECT session_id, type, value FROM evidence").fetchall() == [("s1", "UPI ID", "a@ybl")]
+    assert conn.execute("SELECT key, session_id FROM evidence_index").fetchall() == [("upi:a@ybl", "s1")]
+
+def test_old_database_py_layout(tmp_path):
+    path = str(tmp_path / "honeypot.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE sessions (session_id TEXT PRIMARY KEY, is_scam BOOLEAN, msg_count INTEGER, persona_id TEXT)")
+    conn.execute("CREATE TABLE messages (session_id TEXT, sender TEXT, text TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)")
+    conn.execute("CREATE TABLE intelligence (session_id TEXT PRIMARY KEY, data TEXT)")
+    conn.execute("INSERT INTO sessions VALUES ('s1', 1, 2, 'grandma')")
+    conn.execute("INSERT INTO messages VALUES ('s1', 'scammer', 'pay now', 't1')")
+    conn.execute("""INSERT INTO intelligence VALUES ('s1', '{"upiIds": ["a@ybl"]}')""")
+    conn.commit()
+    conn.close()
+
+    schema.migrate(path, batch=1)
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT id, persona, is_scam FROM sessions").fetchall() == [("s1", "grandma", 1)]
+    assert conn.execute("SELECT session_id, role, message FROM messages").fetchall() == [("s1", "scammer", "pay now")]
+    assert conn.execute("SELECT type, value FROM evidence").fetchall() == [("UPI ID", "a@ybl")]
+    assert not [r for r in conn.execute("SELECT name FROM sqlite_master WHERE name LIKE 'legacy_%'")]
@@ -0,0 +1,33 @@
+# tests/test_session_cache.py
+# refresh() picks up what another worker wrote to the same session.
+import sqlite3
+from session_cache import SessionCache
+from storage import Storage
+
+def test_refresh_counts_every_workers_writes(db, run):
+    async def scenario():
+        storage = Storage(db)
+        await storage.start()
+        sessions = SessionCache(storage)
+        await storage.write("INSERT INTO sessions (id, persona) VALUES ('s1', 'grandma')", wait=True)
+        state = sessions.create("s1", "grandma")
+        sessions.record_message(state, "otp_demand")   # our turn, still queued
+        await storage.write_many([
+            ("INSERT INTO messages (session_id, role, message, timestamp) VALUES ('s1', 'scammer', 'hello', 't')", ()),
+            ("INSERT INTO messages (session_id, role, message, timestamp) VALUES ('s1', 'agent', 'hi dear', 't')", ()),
+            ("INSERT INTO evidence (session_id, type, value, timestamp) VALUES ('s1', 'Phone Number', '9876543210', 't')", ())])
+
+        other = sqlite3.connect(db)   # another worker's turns
+        other.executemany("INSERT INTO messages (session_id, role, message, timestamp) VALUES ('s1', ?, ?, 't')",
+                          [("scammer", "pay now"), ("agent", "who is this"), ("scammer", "send otp"), ("agent", "what otp")])
+        other.execute("INSERT INTO evidence (session_id, type, value, timestamp) VALUES ('s1', 'UPI ID', 'boss@ybl', 't')")
+        other.commit()
+        other.close()
+
+        assert (await sessions.get("s1")).message_count == 2
+        state = await sessions.refresh("s1")
+        await storage.close()
+        return state
+    state = run(scenario())
+    assert state.message_count == 6
+    assert state.evidence == {"9876543210": "Phone Number", "boss@ybl": "UPI ID"}
@@ -0,0 +1,81 @@
+# tests/test_shards.py
+# Resharding: every per-session row ends up on the session's owner shard, intact.
+import sqlite3
+import schema
+import shards
+
+def old_main_py_database(path):
+    # sessions as the old main.py created it; the migration appends is_scam as the last column
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE sessions (id TEXT PRIMARY KEY, persona TEXT, last_intent TEXT, start_time TEXT)")
+    conn.execute("CREATE TABLE messages (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT, role TEXT, message TEXT, timestamp TEXT)")
+    for i in range(20):
+        conn.execute("INSERT INTO sessions VALUES (?, 'grandma', 'otp_demand', '2026-01-01 10:00:00')", (f"s{i}",))
+        conn.execute("INSERT INTO messages (session_id, role, message, timestamp) VALUES (?, 'scammer', 'otp?', 't')", (f"s{i}",))
+    conn.commit()
+    conn.close()
+    schema.migrate(path)
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE sessions SET is_scam=1")
+    conn.commit()
+    conn.close()
+
+def rows(paths, sql):
+    return sorted(row for path in paths for row in sqlite3.connect(path).execute(sql))
+
+def test_reshard_from_one_old_file(tmp_path):
+    db = str(tmp_path / "honeypot.db")
+    old_main_py_database(db)
+    paths = shards.shard_paths(db, 2)
+    assert shards.rebalance(paths, paths + [db]) == 20
+
+    moved = rows(paths, "SELECT id, persona, is_scam, last_intent, start_time FROM sessions")
+    assert moved == sorted((f"s{i}", "grandma", 1, "otp_demand", "2026-01-01 10:00:00") for i in range(20))
+    ring = shards.HashRing(paths)
+    for path in paths:
+        for (sid,) in sqlite3.connect(path).execute("SELECT id FROM sessions"):
+            assert ring.node_for(sid) == path
+    assert rows([db], "SELECT id FROM sessions") == []
+    assert len(rows(paths, "SELECT session_id FROM messages")) == 20
+
+def test_archived_history_follows_the_session(tmp_path):
+    import archive
+    db = str(tmp_path / "honeypot.db")
+    schema.migrate(db)
+    conn = sqlite3.connect(db)
+    for i in range(10):
+        conn.execute("INSERT INTO sessions (id, persona) VALUES (?, 'grandma')", (f"s{i}",))
+        conn.execute("INSERT INTO messages (session_id, role, message, timestamp) VALUES (?, 'scammer', ?, '2026-01-01 10:00:00')",
+                     (f"s{i}", f"pay {i}"))
+        conn.execute("INSERT INTO evidence (session_id, type, value, timestamp) VALUES (?, 'UPI ID', ?, '2026-01-01 10:00:00')",
+                     (f"s{i}", f"a{i}@ybl"))
+    conn.commit()
+    conn.close()
+    assert archive.compact(db, idle_hours=1)[0] == 10
+
+    paths = shards.shard_paths(db, 2)
+    shards.rebalance(paths, paths + [db])
+    ring = shards.HashRing(paths)
+    for i in range(10):
+        conn = sqlite3.connect(ring.node_for(f"s{i}"))
+        assert [m[1:3] for m in archive.load_messages(conn, f"s{i}")] == [("scammer", f"pay {i}")]
+        assert archive.load_evidence(conn, f"s{i}") == [("UPI ID", f"a{i}@ybl")]
+
+def test_evidence_index_follows_the_session(tmp_path):
+    import campaigns
+    db = str(tmp_path / "honeypot.db")
+    schema.migrate(db)
+    conn = sqlite3.connect(db)
+    for i in range(10):
+        conn.execute("INSERT INTO sessions (id, persona) VALUES (?, 'grandma')", (f"s{i}",))
+        conn.executemany(campaigns.UPSERT, campaigns.index_rows(f"s{i}", [("UPI ID", "boss@ybl")], "2026-01-01 10:00:00"))
+    conn.commit()
+    conn.close()
+
+    paths = shards.shard_paths(db, 2)
+    shards.rebalance(paths, paths + [db])
+    ring = shards.HashRing(paths)
+    for i in range(10):
+        conn = sqlite3.connect(ring.node_for(f"s{i}"))
+        assert campaigns.session_keys(conn, f"s{i}") == {"upi:boss@ybl": "boss@ybl"}
+    assert rows([db], "SELECT session_id FROM evidence_index") == []
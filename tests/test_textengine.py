@@ -0,0 +1,34 @@
+# tests/test_textengine.py
+# The single-pass scanner: intents, typed evidence, and the values it slices
+# back out of the original text.
+import textengine
+
+def evidence(text):
+    return textengine.analyze(text).evidence
+
+def test_intent_and_keywords():
+    analysis = textengine.analyze("URGENT: your SBI account is blocked, share the OTP")
+    assert analysis.intent == "account_lock"
+    assert ("keyword", "OTP") in analysis.evidence and ("keyword", "SBI") in analysis.evidence
+    assert textengine.is_scam(analysis)
+    assert not textengine.is_scam(textengine.analyze("see you at dinner"))
+
+def test_phones_and_accounts():
+    assert evidence("call +919876543210 or 09876543210") == [("phone", "9876543210")]
+    assert evidence("A/C 123456789012") == [("account", "123456789012")]
+
+def test_values_keep_their_case():
+    assert evidence("Pay Rahul.K@okaxis via https://Evil.com/kyc") == [
+        ("upi", "Rahul.K@okaxis"), ("link", "https://Evil.com")]
+
+def test_length_changing_lowercase_keeps_values_intact():
+    # "İ".lower() is two characters; the values must still come from the original text
+    assert evidence("İİ pay to ABC@ybl now") == [("upi", "ABC@ybl")]
+    assert evidence("İ https://Bad.in İ") == [("link", "https://Bad.in")]
+
+def test_link_does_not_swallow_a_glued_upi():
+    assert evidence("https://x.com9876543210@ybl") == [
+        ("link", "https://x.com"), ("upi", "9876543210@ybl"), ("phone", "9876543210")]
+
+def test_link_with_digits_in_host():
+    assert evidence("http://192.168.1.10 now") == [("link", "http://192.168.1.10")]
@@ -0,0 +1,166 @@
+# textengine.py
+# The Local Neural Engine: one compiled scanner, built once at import.
+# A single pass over each message yields the intent scores AND every typed
+# evidence hit (UPI IDs, links, phone numbers, bank accounts, keywords).
+# Used by main.py (intent + evidence) and logic.py (extract_intel).
+import re
+import string
+from collections import namedtuple
+
+# --- 1. VOCABULARY ---
+# intent -> (trigger words, weight). Matching is substring based, like the
+# original `any(w in text ...)` scoring.
+INTENT_WEIGHTS = {
+    "police_threat": (["police", "jail", "arrest", "court", "lawyer", "case"], 5),
+    "account_lock": (["block", "lock", "suspend", "close", "deactivate"], 5),
+    "money_demand": (["money", "transfer", "pay", "rupee", "amount", "charge"], 4),
+    "otp_demand": (["otp", "code", "pin", "verify", "number"], 4),
+    "general_confusion": ([], 0),
+}
+# "urgent" boosts several intents at once (urgency usually implies locking)
+URGENCY_BONUS = {"account_lock": 2, "police_threat": 1}
+
+# Keywords reported as "Suspicious Keyword" evidence
+EVIDENCE_KEYWORDS = ["urgent", "blocked", "sbi", "hdfc", "otp", "police", "jail", "verify"]
+
+# Evidence kind -> label stored in the evidence table / key in the intel payload
+EVIDENCE_LABELS = {
+    "upi": "UPI ID",
+    "link": "Phishing Link",
+    "phone": "Phone Number",
+    "account": "Bank Account",
+    "keyword": "Suspicious Keyword",
+}
+INTEL_KEYS = {
+    "upi": "upiIds",
+    "link": "phishingLinks",
+    "phone": "phoneNumbers",
+    "account": "bankAccounts",
+    "keyword": "suspiciousKeywords",
+}
+LABEL_TO_INTEL = {EVIDENCE_LABELS[k]: INTEL_KEYS[k] for k in EVIDENCE_LABELS}
+INTEL_TO_LABEL = {v: k for k, v in LABEL_TO_INTEL.items()}
+
+ALL_KEYWORDS = sorted({w for words, _ in INTENT_WEIGHTS.values() for w in words}
+                      | set(EVIDENCE_KEYWORDS) | {"urgent"}, key=len, reverse=True)
+
+# Keywords are consumed by the scanner, longest first. A hit on "blocked"
+# also proves "block" and "lock" occur (_CONTAINS), and a hit on "otp" may be
+# the start of an overlapping "pin" in "otpin" (_OVERLAPS: offset -> keywords
+# that start inside the hit and run past its end). Together they give exactly
+# the same answers as testing `k in text` for every keyword.
+_CONTAINS = {k: frozenset(w for w in ALL_KEYWORDS if w in k) for k in ALL_KEYWORDS}
+_OVERLAPS = {
+    k: [(i, w) for i in range(1, len(k)) for w in ALL_KEYWORDS if len(w) > len(k) - i and w.startswith(k[i:])]
+    for k in ALL_KEYWORDS
+}
+
+# --- 2. THE COMPILED SCANNER ---
+# Runs over the lowercased text (much cheaper than re.IGNORECASE); values are
+# sliced back out of the original so UPI IDs and links keep their case.
+_KW = "|".join(map(re.escape, ALL_KEYWORDS))
+# A link ends where a UPI handle starting with a digit is glued to its domain
+# (https://x.com9876543210@ybl), so the handle isn't swallowed into the link.
+_TOKEN = (r"(?P<link>https?://(?:(?!(?<=[a-z])\d[\w.\-]*@)[-\w.]|%[\da-f]{2})+)"
+          r"|(?P<upi>[a-z0-9.\-_]+@[a-z]+)")
+_DIGITS = r"(?P<digits>\+?\d{9,})"
+_SCAN = re.compile(_TOKEN + "|" + _DIGITS + "|(?P<kw>" + _KW + ")")
+# Links and UPI handles are consumed whole, so numbers and keywords inside
+# them (e.g. 9876543210@ybl, sbi-verify.com) get a second look at the token only.
+_INNER = re.compile(_DIGITS + "|(?P<kw>" + _KW + ")")
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+Analysis = namedtuple("Analysis", ["intent", "scores", "evidence", "keywords"])
+
+def _digits(run, out):
+    # +91XXXXXXXXXX / 0XXXXXXXXXX / XXXXXXXXXX mobile numbers, everything else is an account
+    plus = run.startswith("+")
+    run = run.lstrip("+")
+    if len(run) == 10 and run[0] in "6789":
+        out.append(("phone", run))
+    elif plus and len(run) == 12 and run.startswith("91") and run[2] in "6789":
+        out.append(("phone", run[2:]))
+    elif len(run) == 11 and run[0] == "0" and run[1] in "6789":
+        out.append(("phone", run[1:]))
+    else:
+        # Same chunking as re.findall(r'\d{9,18}')
+        for i in range(0, len(run), 18):
+            chunk = run[i:i + 18]
+            if len(chunk) >= 9: out.append(("account", chunk))
+
+def _keyword(low, m, keywords):
+    kw = m.group("kw")
+    keywords |= _CONTAINS[kw]
+    start = m.start()
+    for offset, other in _OVERLAPS[kw]:
+        if low.startswith(other, start + offset): keywords |= _CONTAINS[other]
+
+def _inner(token, hits, keywords):
+    for m in _INNER.finditer(token):
+        if m.lastgroup == "digits": _digits(m.group("digits"), hits)
+        else: _keyword(token, m, keywords)
+
+def scan(text):
+    """One pass over text. Returns (evidence hits in order, matched keyword set)."""
+    hits, keywords = [], set()
+    low = text.lower()
+    if len(low) != len(text):
+        # A few non-ASCII characters change length when lowercased ("İ" -> "i̇"); the
+        # patterns are ASCII, so lowercasing ASCII only keeps offsets on the original
+        low = text.translate(_ASCII_LOWER)
+    for m in _SCAN.finditer(low):
+        kind = m.lastgroup
+        if kind == "kw":
+            _keyword(low, m, keywords)
+        elif kind == "digits":
+            _digits(m.group("digits"), hits)
+        else:
+            hits.append((kind, text[m.start():m.end()]))
+            _inner(m.group(kind), hits, keywords)
+    return hits, keywords
+
+def score(keywords):
+    scores = {}
+    for intent, (words, weight) in INTENT_WEIGHTS.items():
+        scores[intent] = weight if keywords.intersection(words) else 0
+    if "urgent" in keywords:
+        for intent, bonus in URGENCY_BONUS.items(): scores[intent] += bonus
+    return scores
+
+def best_intent(scores):
+    best = max(scores, key=scores.get)
+    return best if scores[best] else "general_confusion"
+
+def analyze(text):
+    hits, keywords = scan(text)
+    scores = score(keywords)
+
+    evidence, seen = [], set()
+    for kind, value in hits:
+        if (kind, value) not in seen:
+            seen.add((kind, value))
+            evidence.append((kind, value))
+    for k in EVIDENCE_KEYWORDS:
+        if k in keywords: evidence.append(("keyword", k.upper()))
+
+    return Analysis(best_intent(scores), scores, evidence, keywords)
+
+def is_scam(analysis):
+    """The keyword verdict: any scam intent or any evidence."""
+    return analysis.intent != "general_confusion" or bool(analysis.evidence)
+
+def analyze_many(texts):
+    return [analyze(t) for t in texts]
+
+# --- 3. OUTPUT SHAPES ---
+def as_rows(analysis):
+    """[(label, value)] rows for the evidence table."""
+    return [(EVIDENCE_LABELS[kind], value) for kind, value in analysis.evidence]
+
+def as_intel(analysis):
+    """The extractedIntelligence dict used by the callback payload."""
+    data = {key: [] for key in INTEL_KEYS.values()}
+    for kind, value in analysis.evidence:
+        data[INTEL_KEYS[kind]].append(value)
+    return data